@@ -0,0 +1,319 @@
+# admission.py
+"""
+Admission control in front of the LLM client.
+
+At most LLM_MAX_INFLIGHT requests run against the inference nodes at once
+(default: OLLAMA_NUM_PARALLEL per node). Everything else waits in a bounded
+queue per priority class:
+
+    INTERACTIVE  interview turns          (served first)
+    REPORT       reports, single ATS      (next)
+    BATCH        batch resume scoring     (last; never takes the
+                                            LLM_RESERVED_INTERACTIVE slots)
+    SPECULATIVE  replies generated ahead  (never queues: runs only if a
+                 of the turn               non-reserved slot is free now;
+                                            cancelled when a real request
+                                            has to queue, see `on_contention`)
+
+A full queue raises `Overloaded` (-> 429 with Retry-After). Each request
+carries a deadline; a request whose deadline passes while it is queued is
+dropped with `DeadlineExceeded` before inference starts.
+
+Priority and deadline travel with the request through context variables:
+
+    with admission.using(admission.INTERACTIVE):
+        await ask_ollama(...)
+"""
+import asyncio
+import math
+import os
+import threading
+import time
+from collections import Counter, deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+
+import metrics
+from llm_router import OLLAMA_URLS
+
+INTERACTIVE, REPORT, BATCH, SPECULATIVE = 0, 1, 2, 3
+PRIORITY_NAMES = {INTERACTIVE: "interactive", REPORT: "report", BATCH: "batch", SPECULATIVE: "speculative"}
+
+LLM_MAX_INFLIGHT = int(os.getenv("LLM_MAX_INFLIGHT", str(int(os.getenv("OLLAMA_NUM_PARALLEL", "4")) * len(OLLAMA_URLS))))
+RESERVED_INTERACTIVE = int(os.getenv("LLM_RESERVED_INTERACTIVE", "1"))
+QUEUE_LIMITS = {
+    INTERACTIVE: int(os.getenv("LLM_QUEUE_INTERACTIVE", "64")),
+    REPORT: int(os.getenv("LLM_QUEUE_REPORT", "32")),
+    BATCH: int(os.getenv("LLM_QUEUE_BATCH", "1000")),
+    SPECULATIVE: 0,
+}
+# Seconds a request may wait before it is no longer worth starting (0 = no deadline)
+DEADLINES = {
+    INTERACTIVE: float(os.getenv("LLM_DEADLINE_INTERACTIVE", "30")),
+    REPORT: float(os.getenv("LLM_DEADLINE_REPORT", "120")),
+    BATCH: float(os.getenv("LLM_DEADLINE_BATCH", "0")),
+    SPECULATIVE: 0,
+}
+
+_priority = ContextVar("llm_priority", default=INTERACTIVE)
+_deadline = ContextVar("llm_deadline", default=None)
+
+_DEFAULT = object()
+
+
+class Overloaded(Exception):
+    """The queue for this priority is full."""
+
+    def __init__(self, priority, retry_after):
+        super().__init__(f"LLM queue full ({PRIORITY_NAMES[priority]}), retry in {retry_after}s")
+        self.priority = priority
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(Exception):
+    """The request's deadline passed before inference could start."""
+
+    def __init__(self, retry_after=1):
+        super().__init__("Request deadline passed while waiting for the LLM")
+        self.retry_after = retry_after
+
+
+@contextmanager
+def using(priority, timeout=_DEFAULT):
+    """
+    Runs the block at `priority` with a deadline `timeout` seconds from now
+    (default per priority; None/0 = none). An enclosing, earlier deadline wins.
+    """
+    timeout = DEADLINES[priority] if timeout is _DEFAULT else timeout
+    deadline = time.monotonic() + timeout if timeout else None
+    outer = _deadline.get()
+    if outer is not None and (deadline is None or outer < deadline):
+        deadline = outer
+    p_token = _priority.set(priority)
+    d_token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(d_token)
+        _priority.reset(p_token)
+
+
+def current():
+    return _priority.get(), _deadline.get()
+
+
+def _time_left(deadline):
+    return None if deadline is None else deadline - time.monotonic()
+
+
+class _Waiter:
+    __slots__ = ("priority", "deadline", "granted", "expired", "_event", "_future", "_loop")
+
+    def __init__(self, priority, deadline, loop=None):
+        self.priority = priority
+        self.deadline = deadline
+        self.granted = False
+        self.expired = False
+        self._loop = loop
+        self._future = loop.create_future() if loop else None
+        self._event = None if loop else threading.Event()
+
+    def wake(self):
+        if self._future is None:
+            self._event.set()
+            return
+        try:
+            self._loop.call_soon_threadsafe(lambda: self._future.done() or self._future.set_result(None))
+        except RuntimeError:
+            pass    # loop already closed; the waiter is gone
+
+
+class AdmissionController:
+    def __init__(self, max_inflight=LLM_MAX_INFLIGHT, queue_limits=QUEUE_LIMITS, reserved=RESERVED_INTERACTIVE):
+        self.max_inflight = max(1, max_inflight)
+        self.queue_limits = dict(queue_limits)
+        self.reserved = min(max(reserved, 0), self.max_inflight - 1)
+        self._queues = {p: deque() for p in self.queue_limits}
+        self._lock = threading.Lock()
+        self.inflight = 0
+        self.avg_service = 5.0      # EWMA of seconds per admitted request
+        self.admitted = Counter()
+        self.rejected = Counter()
+        self.expired = Counter()
+        self._contention_hooks = []
+
+    # ---------- helpers (call with the lock held) ----------
+    def _can_run(self, priority):
+        limit = self.max_inflight - (self.reserved if priority >= BATCH else 0)
+        return self.inflight < limit
+
+    def _queued_ahead(self, priority):
+        return sum(len(q) for p, q in self._queues.items() if p <= priority)
+
+    def _retry_after(self, priority):
+        ahead = self._queued_ahead(priority) + 1
+        return max(1, math.ceil(ahead * self.avg_service / self.max_inflight))
+
+    def _expire(self, waiter):
+        waiter.expired = True
+        self.expired[waiter.priority] += 1
+        waiter.wake()
+
+    def _dispatch(self):
+        """Grants free slots to queued waiters, highest priority first."""
+        now = time.monotonic()
+        for priority in sorted(self._queues):
+            queue = self._queues[priority]
+            while queue:
+                head = queue[0]
+                if head.deadline is not None and head.deadline <= now:
+                    queue.popleft()
+                    self._expire(head)
+                    continue
+                if not self._can_run(priority):
+                    # Lower priorities have stricter limits -> nothing else can run either
+                    return
+                queue.popleft()
+                self.inflight += 1
+                self.admitted[priority] += 1
+                head.granted = True
+                head.wake()
+
+    def _try_admit(self, priority, deadline, loop):
+        """Admits immediately (returns None) or enqueues and returns the waiter."""
+        with self._lock:
+            if deadline is not None and deadline <= time.monotonic():
+                self.expired[priority] += 1
+                raise DeadlineExceeded(self._retry_after(priority))
+            if self._queued_ahead(priority) == 0 and self._can_run(priority):
+                self.inflight += 1
+                self.admitted[priority] += 1
+                return None
+            if len(self._queues[priority]) >= self.queue_limits[priority]:
+                self.rejected[priority] += 1
+                raise Overloaded(priority, self._retry_after(priority))
+            waiter = _Waiter(priority, deadline, loop)
+            self._queues[priority].append(waiter)
+            return waiter
+
+    def _abandon(self, waiter):
+        """Waiter gave up (deadline/cancel): leave the queue or hand back a slot granted meanwhile."""
+        with self._lock:
+            if waiter.granted:
+                self._release_locked(None)
+                return
+            try:
+                self._queues[waiter.priority].remove(waiter)
+            except ValueError:
+                pass
+            if not waiter.expired:
+                self.expired[waiter.priority] += 1
+
+    def _contended(self, priority):
+        """A request had to queue: lets speculative work give its slots back."""
+        if priority < BATCH:
+            for hook in list(self._contention_hooks):
+                hook()
+
+    def _release_locked(self, seconds):
+        self.inflight -= 1
+        if seconds is not None:
+            self.avg_service = 0.8 * self.avg_service + 0.2 * seconds
+        self._dispatch()
+
+    # ---------- public API ----------
+    def on_contention(self, hook):
+        """`hook()` runs (in the caller's thread) whenever an interactive or report request has to queue."""
+        self._contention_hooks.append(hook)
+
+    def check(self, priority):
+        """Raises Overloaded if a new request at `priority` would be rejected right now."""
+        with self._lock:
+            if len(self._queues[priority]) >= self.queue_limits[priority]:
+                self.rejected[priority] += 1
+                raise Overloaded(priority, self._retry_after(priority))
+
+    async def acquire(self, priority, deadline=None):
+        waiter = self._try_admit(priority, deadline, asyncio.get_running_loop())
+        if waiter is None:
+            return
+        self._contended(priority)
+        try:
+            await asyncio.wait_for(waiter._future, _time_left(deadline))
+        except asyncio.TimeoutError:
+            self._abandon(waiter)
+            raise DeadlineExceeded(self._retry_after(priority)) from None
+        except BaseException:
+            self._abandon(waiter)
+            raise
+        if waiter.expired:
+            raise DeadlineExceeded(self._retry_after(priority))
+
+    def acquire_sync(self, priority, deadline=None):
+        waiter = self._try_admit(priority, deadline, None)
+        if waiter is None:
+            return
+        self._contended(priority)
+        if not waiter._event.wait(_time_left(deadline)):
+            self._abandon(waiter)
+            raise DeadlineExceeded(self._retry_after(priority))
+        if waiter.expired:
+            raise DeadlineExceeded(self._retry_after(priority))
+
+    def release(self, seconds=None):
+        with self._lock:
+            self._release_locked(seconds)
+
+    @asynccontextmanager
+    async def slot(self):
+        """Holds one LLM slot at the current context's priority/deadline."""
+        priority, deadline = current()
+        queued = time.monotonic()
+        await self.acquire(priority, deadline)
+        started = time.monotonic()
+        metrics.record("llm_queue", started - queued, priority=PRIORITY_NAMES[priority])
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - started)
+
+    @contextmanager
+    def slot_sync(self):
+        priority, deadline = current()
+        queued = time.monotonic()
+        self.acquire_sync(priority, deadline)
+        started = time.monotonic()
+        metrics.record("llm_queue", started - queued, priority=PRIORITY_NAMES[priority])
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - started)
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "max_inflight": self.max_inflight,
+                "inflight": self.inflight,
+                "queued": {PRIORITY_NAMES[p]: len(q) for p, q in self._queues.items()},
+                "admitted": {PRIORITY_NAMES[p]: n for p, n in self.admitted.items()},
+                "rejected": {PRIORITY_NAMES[p]: n for p, n in self.rejected.items()},
+                "expired": {PRIORITY_NAMES[p]: n for p, n in self.expired.items()},
+            }
+
+
+controller = AdmissionController()
+
+
+def _gauges(field):
+    def collect():
+        status = controller.status()
+        return [({"priority": name}, n) for name, n in status[field].items()]
+    return collect
+
+
+metrics.collector("llm_inflight", "LLM requests holding an admission slot.", "gauge",
+                  lambda: [({}, controller.status()["inflight"])])
+metrics.collector("llm_queued", "LLM requests waiting for a slot.", "gauge", _gauges("queued"))
+metrics.collector("llm_admitted_total", "LLM requests admitted.", "counter", _gauges("admitted"))
+metrics.collector("llm_rejected_total", "LLM requests rejected with 429.", "counter", _gauges("rejected"))
+metrics.collector("llm_expired_total", "LLM requests dropped at their deadline.", "counter", _gauges("expired"))
@@ -0,0 +1,148 @@
+# batch_engine.py
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+# Text extraction (pdfplumber) is CPU-bound -> one process per core.
+# LLM scoring is I/O-bound and limited by the Ollama server's parallel slots
+# (OLLAMA_NUM_PARALLEL on the server side), so match that here.
+EXTRACT_WORKERS = int(os.getenv("BATCH_EXTRACT_WORKERS", os.cpu_count() or 1))
+LLM_CONCURRENCY = int(os.getenv("OLLAMA_NUM_PARALLEL", "4"))
+
+_extract_pool = None
+
+
+def get_extract_pool():
+    """Shared process pool, created on first batch and reused afterwards."""
+    global _extract_pool
+    if _extract_pool is None:
+        _extract_pool = ProcessPoolExecutor(max_workers=max(1, EXTRACT_WORKERS))
+    return _extract_pool
+
+
+def _reset_extract_pool():
+    global _extract_pool
+    if _extract_pool is not None:
+        _extract_pool.shutdown(wait=False, cancel_futures=True)
+    _extract_pool = None
+
+
+def iter_extracted(items, extract_fn, preextracted=None, on_extracted=None):
+    """
+    Yields (index, doc) as soon as each item's document is ready.
+
+    items        -> list of (name, source) pairs; `source` is passed to extract_fn
+    extract_fn   -> picklable callable(source) -> doc (runs in a process pool), e.g.
+                    document_text.extract_document: {"text", "engine", "seconds"}.
+                    doc is None if extraction raised.
+    preextracted -> optional {index: doc} for items whose document is already known
+                    (e.g. cache hits, resume_analysis.cached_doc); those skip
+                    extraction entirely
+    on_extracted -> optional callback(doc) for each freshly extracted item,
+                    called in this process (e.g. to record timings)
+    """
+    preextracted = preextracted or {}
+    pending = [i for i in range(len(items)) if i not in preextracted]
+
+    # Known documents first
+    for i, doc in preextracted.items():
+        yield i, doc
+
+    if not pending:
+        return
+
+    try:
+        pool = get_extract_pool()
+        extract_futures = {pool.submit(extract_fn, items[i][1]): i for i in pending}
+    except (BrokenProcessPool, RuntimeError):
+        # Process pool unavailable -> extract inline
+        _reset_extract_pool()
+        for i in pending:
+            yield i, _notify(on_extracted, _safe_extract(extract_fn, items[i][1]))
+        return
+
+    for fut in as_completed(extract_futures):
+        i = extract_futures[fut]
+        try:
+            doc = fut.result()
+        except BrokenProcessPool:
+            _reset_extract_pool()
+            doc = _safe_extract(extract_fn, items[i][1])
+        except Exception:
+            doc = None
+        yield i, _notify(on_extracted, doc)
+
+
+def extract_all(items, extract_fn, preextracted=None, on_extracted=None):
+    """All documents, in the same order as `items` (extraction still runs in parallel)."""
+    docs = [None] * len(items)
+    for i, doc in iter_extracted(items, extract_fn, preextracted, on_extracted):
+        docs[i] = doc
+    return docs
+
+
+def score_all(names, docs, score_fn, llm_concurrency=None):
+    """score_fn(name, doc) for every pair with bounded concurrency, order preserved."""
+    concurrency = max(1, llm_concurrency or LLM_CONCURRENCY)
+    results = [None] * len(names)
+    with ThreadPoolExecutor(max_workers=concurrency) as llm_pool:
+        futures = {llm_pool.submit(score_fn, name, doc): i for i, (name, doc) in enumerate(zip(names, docs))}
+        for fut in as_completed(futures):
+            results[futures[fut]] = fut.result()
+    return results
+
+
+def run_batch(items, extract_fn, score_fn, llm_concurrency=None, preextracted=None, on_extracted=None):
+    """
+    Pipelined batch execution.
+
+    items / extract_fn / preextracted / on_extracted -> see iter_extracted
+    score_fn -> callable(name, doc) -> result dict (runs in a bounded thread pool);
+                doc is the extract_fn / preextracted document, or None
+
+    Scoring of a file starts as soon as its document is ready, so extraction and
+    LLM calls overlap. Results are returned in the same order as `items`.
+    """
+    if not items:
+        return []
+
+    concurrency = max(1, llm_concurrency or LLM_CONCURRENCY)
+    results = [None] * len(items)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as llm_pool:
+        score_futures = {}
+        for i, doc in iter_extracted(items, extract_fn, preextracted, on_extracted):
+            score_futures[llm_pool.submit(score_fn, items[i][0], doc)] = i
+
+        for fut in as_completed(score_futures):
+            results[score_futures[fut]] = fut.result()
+
+    return results
+
+
+def _safe_extract(extract_fn, source):
+    try:
+        return extract_fn(source)
+    except Exception:
+        return None
+
+
+def _notify(on_extracted, doc):
+    if on_extracted is not None and doc is not None:
+        try:
+            on_extracted(doc)
+        except Exception:
+            pass
+    return doc
+
+
+async def extract_async(extract_fn, source):
+    """One extraction in the process pool, awaited without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(get_extract_pool(), extract_fn, source)
+    except (BrokenProcessPool, RuntimeError):
+        # Process pool unavailable -> extract in a thread instead
+        _reset_extract_pool()
+        return await loop.run_in_executor(None, _safe_extract, extract_fn, source)
@@ -0,0 +1,210 @@
+# batch_jobs.py
+"""
+Background batch jobs for resume ranking.
+
+Submitting a batch persists every upload under JOB_DIR/<job_id>/ and the job
+row in SQLite, then returns immediately. Worker threads score the resumes and
+save each per-file result as soon as it is ready, so a job interrupted by a
+crash or restart resumes where it stopped: a sweeper thread re-claims jobs
+whose owner stopped heartbeating and already-scored files are not re-sent to
+the LLM.
+"""
+import logging
+import os
+import shutil
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.utils import secure_filename
+
+import storage
+from document_text import allowed_file, file_extension, release
+from resume_analysis import batch_options, cached_doc, finish_batch, rank_key, rank_resumes
+from resume_cache import text_cache
+
+logger = logging.getLogger(__name__)
+
+JOB_DIR = os.getenv("BATCH_JOB_DIR", "jobs")
+JOB_WORKERS = int(os.getenv("BATCH_JOB_WORKERS", "2"))
+JOB_HEARTBEAT_SECONDS = float(os.getenv("BATCH_JOB_HEARTBEAT_SECONDS", "30"))
+JOB_STALE_SECONDS = float(os.getenv("BATCH_JOB_STALE_SECONDS", "120"))
+
+FINISHED = ("done", "failed")
+
+_executor = None
+_running = set()
+_lock = threading.Lock()
+_sweeper = None
+
+
+def worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _owner_is_dead(owner):
+    """True if `owner` was a process on this host that no longer exists."""
+    host, _, pid = (owner or "").rpartition(":")
+    if host != socket.gethostname() or not pid.isdigit() or int(pid) == os.getpid():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except OSError:
+        return False
+    return False
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max(1, JOB_WORKERS), thread_name_prefix="batch-job")
+    return _executor
+
+
+# --------------------------------------------------
+# SUBMIT
+# --------------------------------------------------
+def submit_job(files, form):
+    """Persists received uploads (uploads.Upload) and queues the job. Returns the job id."""
+    opts = batch_options(form)
+    job_id = uuid.uuid4().hex
+    job_dir = os.path.join(JOB_DIR, job_id)
+    os.makedirs(job_dir, exist_ok=True)
+
+    records = []
+    rejected = []
+    for file in files:
+        if not (file and allowed_file(file.filename)):
+            continue
+        filename = secure_filename(file.filename)
+        if file.error:
+            rejected.append({"filename": filename, "score": 0, "summary": f"Error: {file.error}"})
+            continue
+        digest, source = file.digest, file.source
+
+        # Keep the upload until the job finishes so it can be resumed
+        path = os.path.join(job_dir, f"{len(records)}.{file_extension(file.filename)}")
+        ext, payload = source
+        if isinstance(payload, bytes):
+            with open(path, "wb") as f:
+                f.write(payload)
+        else:
+            shutil.move(payload, path)
+        release(source)
+        records.append((filename, digest, path))
+
+    storage.create_job(job_id, opts, records, rejected)
+    start_job(job_id)
+    return job_id
+
+
+def start_job(job_id, expected_owner=None):
+    with _lock:
+        if job_id in _running:
+            return
+        _running.add(job_id)
+    _get_executor().submit(_run_job, job_id, expected_owner)
+
+
+# --------------------------------------------------
+# WORKER
+# --------------------------------------------------
+def _run_job(job_id, expected_owner=None):
+    owner = worker_id()
+    try:
+        if not storage.claim_job(job_id, owner, JOB_STALE_SECONDS, expected_owner):
+            return
+        job = storage.get_job(job_id)
+        opts = job["options"]
+
+        items = []
+        preextracted = {}
+        completed = {}
+        for f in job["files"]:
+            text = text_cache.get(f["digest"])
+            if text is not None:
+                preextracted[f["idx"]] = cached_doc(text)
+            items.append(((f["filename"], f["digest"], text is None), (file_extension(f["path"] or ""), f["path"])))
+            if f["result"] is not None:
+                completed[f["idx"]] = f["result"]
+
+        if completed:
+            logger.info(f"Job {job_id}: resuming, {len(completed)} of {len(items)} files already scored")
+
+        def on_result(index, result):
+            storage.save_job_result(job_id, index, result)
+            completed[index] = result
+
+        results = rank_resumes(items, preextracted, opts, completed, on_result)
+
+        # Prefilter-only results are final now as well
+        for index, result in enumerate(results):
+            if index not in completed:
+                storage.save_job_result(job_id, index, result)
+
+        results.extend(job["rejected"])
+        finish_batch(results, len(job["files"]) + len(job["rejected"]), opts)
+        storage.finish_job(job_id, "done")
+        shutil.rmtree(os.path.join(JOB_DIR, job_id), ignore_errors=True)
+    except Exception as e:
+        logger.exception(f"Job {job_id} failed")
+        storage.finish_job(job_id, "failed", str(e))
+    finally:
+        with _lock:
+            _running.discard(job_id)
+
+
+def _sweep_forever():
+    owner = worker_id()
+    while True:
+        try:
+            for job_id in list(_running):
+                storage.job_heartbeat(job_id, owner)
+            for job_id, job_owner in storage.unfinished_jobs():
+                if job_id in _running:
+                    continue
+                if job_owner is None or _owner_is_dead(job_owner):
+                    start_job(job_id, job_owner)
+            for job_id in storage.stale_jobs(JOB_STALE_SECONDS):
+                start_job(job_id)
+        except Exception:
+            logger.exception("Job sweeper error")
+        time.sleep(JOB_HEARTBEAT_SECONDS)
+
+
+def start_background():
+    """Starts the heartbeat/resume thread once per process."""
+    global _sweeper
+    with _lock:
+        if _sweeper is not None and _sweeper.is_alive():
+            return
+        _sweeper = threading.Thread(target=_sweep_forever, name="batch-job-sweeper", daemon=True)
+        _sweeper.start()
+
+
+# --------------------------------------------------
+# STATUS
+# --------------------------------------------------
+def job_status(job_id):
+    """Progress plus the ranked results finished so far (None if unknown)."""
+    job = storage.get_job(job_id)
+    if job is None:
+        return None
+    results = [f["result"] for f in job["files"] if f["result"] is not None]
+    done = len(results)
+    if job["status"] == "done":
+        results = results + job["rejected"]
+    results.sort(key=rank_key, reverse=True)
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "total": job["total"],
+        "completed": done,
+        "error": job["error"],
+        "results": results,
+    }
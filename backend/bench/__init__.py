@@ -0,0 +1,2 @@
+# bench/__init__.py
+"""Offline benchmarks: mock Ollama server, synthetic resumes, load runner."""
@@ -0,0 +1,162 @@
+# bench/corpus.py
+"""
+Synthetic resume corpus for the benchmarks.
+
+`build_corpus(count, seed)` returns (filename, bytes) pairs: PDF, DOCX and
+TXT resumes with varied roles, skills, experience and length. Files are
+written with the standard library only (hand-built PDF objects, DOCX as a
+zipped WordprocessingML document), so the same seed always gives the same
+bytes and no document tooling is needed.
+
+    python -m bench.corpus --count 50 --out /tmp/resumes
+"""
+import argparse
+import io
+import os
+import random
+import zipfile
+from xml.sax.saxutils import escape
+
+FIRST_NAMES = ["Asha", "Rahul", "Maria", "Chen", "Fatima", "Lukas", "Priya", "Diego", "Aiko", "Samuel", "Noor", "Elena"]
+LAST_NAMES = ["Sharma", "Garcia", "Wang", "Khan", "Muller", "Iyer", "Rossi", "Sato", "Okafor", "Novak", "Haddad", "Silva"]
+
+ROLES = {
+    "Backend Engineer": ["Python", "Java", "Go", "SQL", "PostgreSQL", "Redis", "Kafka", "Docker", "REST APIs", "Microservices"],
+    "Frontend Developer": ["JavaScript", "TypeScript", "React", "Vue", "CSS", "HTML", "Webpack", "Jest", "Accessibility"],
+    "Data Scientist": ["Python", "Pandas", "NumPy", "scikit-learn", "PyTorch", "SQL", "Statistics", "A/B testing", "Spark"],
+    "DevOps Engineer": ["Kubernetes", "Docker", "Terraform", "AWS", "CI/CD", "Linux", "Prometheus", "Ansible", "Bash"],
+    "Full Stack Developer": ["JavaScript", "Node.js", "React", "Python", "Django", "PostgreSQL", "Docker", "GraphQL"],
+    "Mobile Developer": ["Kotlin", "Swift", "Android", "iOS", "Flutter", "Firebase", "REST APIs", "Jetpack Compose"],
+}
+COMPANIES = ["Acme Corp", "Globex", "Initech", "Umbrella Labs", "Hooli", "Stark Industries", "Wayne Tech", "Cyberdyne"]
+VERBS = ["Built", "Designed", "Led", "Optimised", "Migrated", "Automated", "Shipped", "Scaled", "Refactored", "Maintained"]
+OBJECTS = ["a payment service", "the search pipeline", "an internal dashboard", "the release process",
+           "a recommendation model", "the mobile checkout flow", "a metrics platform", "the auth system"]
+OUTCOMES = ["cutting latency by {n}%", "serving {n}k daily users", "reducing costs by {n}%",
+            "raising test coverage to {n}%", "removing {n} hours of manual work per week"]
+SCHOOLS = ["State University", "Institute of Technology", "City College", "Technical University"]
+
+FORMATS = ("pdf", "docx", "txt")
+
+
+def resume_text(rng: random.Random) -> str:
+    role = rng.choice(list(ROLES))
+    skills = rng.sample(ROLES[role], k=min(len(ROLES[role]), rng.randint(4, 8)))
+    years = rng.randint(0, 12)
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+    lines = [name, f"{role} - {years} years of experience", f"{name.split()[0].lower()}@example.com", "",
+             "SUMMARY",
+             f"{role} focused on {', '.join(skills[:3])}. Enjoys shipping reliable software with small teams.", "",
+             "SKILLS", ", ".join(skills), "", "EXPERIENCE"]
+    for job in range(max(1, min(years // 3 + 1, 4))):
+        lines.append(f"{rng.choice(COMPANIES)} - {role} ({2024 - 3 * (job + 1)} - {2024 - 3 * job})")
+        for _ in range(rng.randint(3, 7)):
+            outcome = rng.choice(OUTCOMES).format(n=rng.randint(10, 90))
+            lines.append(f"- {rng.choice(VERBS)} {rng.choice(OBJECTS)} using {rng.choice(skills)}, {outcome}.")
+        lines.append("")
+    lines.append("PROJECTS")
+    for _ in range(rng.randint(1, 4)):
+        lines.append(f"- {rng.choice(VERBS)} {rng.choice(OBJECTS)} as a side project ({rng.choice(skills)}).")
+    lines += ["", "EDUCATION", f"B.Sc. Computer Science, {rng.choice(SCHOOLS)}"]
+    return "\n".join(lines)
+
+
+# --------------------------------------------------
+# FILE FORMATS
+# --------------------------------------------------
+def _pdf_string(line):
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)").encode("latin-1", "replace")
+
+
+def to_pdf(text: str, lines_per_page=48) -> bytes:
+    """Text-only PDF (Helvetica, one text object per page) with a valid xref table."""
+    lines = text.splitlines() or [""]
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)]
+
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for page in pages:
+        stream = b"BT /F1 10 Tf 14 TL 50 800 Td " + b" ".join(b"(" + _pdf_string(l) + b") Tj T*" for l in page) + b" ET"
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_id = len(objects)
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id)
+        page_ids.append(len(objects))
+    kids = b" ".join(b"%d 0 R" % i for i in page_ids)
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+
+_CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>
+</Types>"""
+
+_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="word/document.xml"/>
+</Relationships>"""
+
+
+def to_docx(text: str) -> bytes:
+    """Minimal WordprocessingML package: one paragraph per line."""
+    paragraphs = "".join(f'<w:p><w:r><w:t xml:space="preserve">{escape(line)}</w:t></w:r></w:p>' for line in text.splitlines())
+    document = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+                f'<w:body>{paragraphs}</w:body></w:document>')
+    out = io.BytesIO()
+    with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as z:
+        # Fixed timestamps keep the bytes identical across runs
+        for name, data in (("[Content_Types].xml", _CONTENT_TYPES), ("_rels/.rels", _RELS), ("word/document.xml", document)):
+            z.writestr(zipfile.ZipInfo(name, date_time=(2024, 1, 1, 0, 0, 0)), data)
+    return out.getvalue()
+
+
+def build_corpus(count=20, seed=0, formats=FORMATS):
+    """[(filename, bytes)] cycling through `formats`; deterministic for a given seed."""
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(count):
+        text = resume_text(rng)
+        ext = formats[i % len(formats)]
+        if ext == "pdf":
+            data = to_pdf(text)
+        elif ext == "docx":
+            data = to_docx(text)
+        else:
+            data = text.encode("utf-8")
+        corpus.append((f"resume_{i:03d}.{ext}", data))
+    return corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write the synthetic resume corpus to a folder")
+    parser.add_argument("--count", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="bench_corpus")
+    args = parser.parse_args()
+    os.makedirs(args.out, exist_ok=True)
+    for filename, data in build_corpus(args.count, args.seed):
+        with open(os.path.join(args.out, filename), "wb") as f:
+            f.write(data)
+    print(f"Wrote {args.count} resumes to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
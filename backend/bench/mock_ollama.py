@@ -0,0 +1,303 @@
+# bench/mock_ollama.py
+"""
+Stand-in for Ollama used by the benchmarks (no model, no GPU).
+
+Serves /api/generate, /api/chat (streaming and not), /api/tags, /api/ps and
+/api/embeddings with tunable behaviour:
+
+    --latency S            delay before the first token (prompt eval), seconds
+    --tokens-per-second N  decode speed; replies are paced to it
+    --reply-tokens N       length of free-text replies (capped by num_predict)
+    --parallel N           generations served at once, like OLLAMA_NUM_PARALLEL;
+                           the rest wait, as they would on a real node
+    --malformed P          fraction of JSON replies that come back broken
+                           (cut off, or missing a required field)
+    --seed N               same replies and same injected faults every run
+
+JSON-mode requests (`format` = "json" or a JSON schema) get an object that
+fits the schema; everything else gets filler text. Models count as loaded
+for their `keep_alive` after each request (/api/ps); an empty prompt only
+loads the model, like Ollama's warm-up call.
+
+    python -m bench.mock_ollama --port 11500 --latency 0.2 --tokens-per-second 40
+"""
+import argparse
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = ("the candidate explained trade offs clearly and walked through a design that "
+         "handles load with caching queues retries and careful data modelling while "
+         "keeping the api simple testable and observable under failure").split()
+
+# Fields the app's prompts ask for when they only say "JSON"
+DEFAULT_PROPERTIES = {
+    "score": {"type": "integer"},
+    "ats_score": {"type": "integer"},
+    "verdict": {"type": "string"},
+    "summary": {"type": "string"},
+    "skills": {"type": "array"},
+    "improvements": {"type": "array"},
+}
+EMBEDDING_DIM = 64
+CHARS_PER_TOKEN = 4
+DEFAULT_KEEP_ALIVE = 300
+DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def keep_alive_seconds(value):
+    """Ollama keep_alive ("30m", "1h", 600, -1) in seconds; negative = forever."""
+    if value is None or value == "":
+        return DEFAULT_KEEP_ALIVE
+    if isinstance(value, (int, float)):
+        return math.inf if value < 0 else value
+    match = re.fullmatch(r"(-?[\d.]+)(ms|s|m|h)?", str(value).strip())
+    if not match:
+        return DEFAULT_KEEP_ALIVE
+    seconds = float(match.group(1)) * DURATION_UNITS[match.group(2) or "s"]
+    return math.inf if seconds < 0 else seconds
+
+
+class MockConfig:
+    def __init__(self, latency=0.1, tokens_per_second=100.0, reply_tokens=30, parallel=4,
+                 malformed=0.0, seed=0, models=("mistral", "llama3")):
+        self.latency = latency
+        self.tokens_per_second = max(tokens_per_second, 0.1)
+        self.reply_tokens = reply_tokens
+        self.parallel = max(parallel, 1)
+        self.malformed = malformed
+        self.seed = seed
+        self.models = models
+
+
+class MockModel:
+    """Builds replies; one seeded RNG shared by all request threads."""
+
+    def __init__(self, config: MockConfig):
+        self.config = config
+        self._rng = random.Random(config.seed)
+        self._lock = threading.Lock()
+        self.slots = threading.BoundedSemaphore(config.parallel)
+        self._loaded = {}            # model -> time.time() it unloads
+
+    def load(self, request: dict):
+        model = request.get("model")
+        if model:
+            with self._lock:
+                self._loaded[model] = time.time() + keep_alive_seconds(request.get("keep_alive"))
+
+    def running(self):
+        now = time.time()
+        with self._lock:
+            self._loaded = {m: until for m, until in self._loaded.items() if until > now}
+            loaded = dict(self._loaded)
+        return [{"name": m if ":" in m else f"{m}:latest", "model": m,
+                 "expires_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(min(until, 4102444800)))}
+                for m, until in loaded.items()]
+
+    def _sentence(self, rng, words):
+        return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+    def _value(self, spec, rng):
+        kind = spec.get("type")
+        if kind in ("integer", "number"):
+            return rng.randint(35, 95)
+        if kind == "boolean":
+            return rng.random() < 0.5
+        if kind == "array":
+            return [self._sentence(rng, 5) for _ in range(rng.randint(2, 4))]
+        if kind == "object":
+            return self._object(spec, rng)
+        return self._sentence(rng, 14)
+
+    def _object(self, schema, rng):
+        properties = schema.get("properties") or DEFAULT_PROPERTIES
+        return {key: self._value(spec, rng) for key, spec in properties.items()}
+
+    def _corrupt(self, obj, schema, rng):
+        required = schema.get("required") or []
+        if required and rng.random() < 0.5:
+            broken = dict(obj)
+            broken.pop(rng.choice(required), None)
+            return json.dumps(broken)
+        text = json.dumps(obj)
+        return text[:rng.randint(1, max(len(text) - 2, 1))]
+
+    def reply(self, request: dict) -> str:
+        fmt = request.get("format")
+        with self._lock:
+            rng = random.Random(self._rng.random())
+            broken = self.config.malformed > 0 and self._rng.random() < self.config.malformed
+        if fmt:
+            schema = fmt if isinstance(fmt, dict) else {}
+            obj = self._object(schema, rng)
+            return self._corrupt(obj, schema, rng) if broken else json.dumps(obj)
+        limit = (request.get("options") or {}).get("num_predict") or self.config.reply_tokens
+        words = max(1, min(self.config.reply_tokens, limit))
+        return self._sentence(rng, words)
+
+    def prompt_tokens(self, request: dict) -> int:
+        text = request.get("prompt") or ""
+        for message in request.get("messages") or []:
+            text += message.get("content") or ""
+        return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def tokens_of(text):
+    return [text[i:i + CHARS_PER_TOKEN] for i in range(0, len(text), CHARS_PER_TOKEN)] or [""]
+
+
+def embedding(text):
+    """Hashed bag of words: texts sharing words get similar unit vectors."""
+    vector = [0.0] * EMBEDDING_DIM
+    for word in (text or "").lower().split():
+        digest = hashlib.md5(word.encode("utf-8")).digest()
+        vector[digest[0] % EMBEDDING_DIM] += 1.0 if digest[1] % 2 else -1.0
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    model: MockModel = None
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, data, status=200):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self._send_json({"models": [{"name": f"{m}:latest"} for m in self.model.config.models]})
+        elif self.path == "/api/ps":
+            self._send_json({"models": self.model.running()})
+        elif self.path in ("/", "/api/version"):
+            self._send_json({"version": "mock"})
+        else:
+            self._send_json({"error": "not found"}, 404)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            return self._send_json({"error": "invalid JSON"}, 400)
+
+        self.model.load(request)
+        if self.path in ("/api/embeddings", "/api/embed"):
+            texts = request.get("input", request.get("prompt", ""))
+            texts = texts if isinstance(texts, list) else [texts]
+            vectors = [embedding(t) for t in texts]
+            return self._send_json({"embedding": vectors[0], "embeddings": vectors})
+        if self.path not in ("/api/generate", "/api/chat"):
+            return self._send_json({"error": "not found"}, 404)
+        if self.path == "/api/generate" and not request.get("prompt"):
+            return self._send_json({"model": request.get("model"), "response": "", "done": True, "done_reason": "load"})
+
+        with self.model.slots:
+            try:
+                self._generate(request, chat=self.path == "/api/chat")
+            except (BrokenPipeError, ConnectionResetError):
+                pass    # client went away mid-stream, like a cancelled request
+
+    def _chunk(self, request, text, chat, done):
+        chunk = {"model": request.get("model"), "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ"), "done": done}
+        if chat:
+            chunk["message"] = {"role": "assistant", "content": text}
+        else:
+            chunk["response"] = text
+        return chunk
+
+    def _generate(self, request, chat):
+        config = self.model.config
+        started = time.monotonic()
+        text = self.model.reply(request)
+        tokens = tokens_of(text)
+        prompt_tokens = self.model.prompt_tokens(request)
+        stats = {
+            "prompt_eval_count": prompt_tokens,
+            "prompt_eval_duration": int(config.latency * 1e9),
+            "eval_count": len(tokens),
+            "eval_duration": int(len(tokens) / config.tokens_per_second * 1e9),
+        }
+        time.sleep(config.latency)
+
+        if not request.get("stream", True):
+            time.sleep(len(tokens) / config.tokens_per_second)
+            final = self._chunk(request, text, chat, True)
+            final.update(stats, total_duration=int((time.monotonic() - started) * 1e9))
+            if not chat:
+                final["context"] = list(range(prompt_tokens + len(tokens)))[:8]
+            return self._send_json(final)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        decode_start = time.monotonic()
+        for i, token in enumerate(tokens):
+            delay = decode_start + (i + 1) / config.tokens_per_second - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self._write_chunk(self._chunk(request, token, chat, False))
+        final = self._chunk(request, "", chat, True)
+        final.update(stats, total_duration=int((time.monotonic() - started) * 1e9))
+        self._write_chunk(final)
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _write_chunk(self, data):
+        line = (json.dumps(data) + "\n").encode("utf-8")
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+        self.wfile.flush()
+
+
+def make_server(config: MockConfig, host="127.0.0.1", port=11434):
+    handler = type("MockHandler", (Handler,), {"model": MockModel(config)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def add_arguments(parser):
+    parser.add_argument("--latency", type=float, default=0.1, help="seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=100.0)
+    parser.add_argument("--reply-tokens", type=int, default=30, help="words in free-text replies")
+    parser.add_argument("--parallel", type=int, default=4, help="concurrent generations (OLLAMA_NUM_PARALLEL)")
+    parser.add_argument("--malformed", type=float, default=0.0, help="fraction of JSON replies to break")
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def config_from(args) -> MockConfig:
+    return MockConfig(latency=args.latency, tokens_per_second=args.tokens_per_second,
+                      reply_tokens=args.reply_tokens, parallel=args.parallel,
+                      malformed=args.malformed, seed=args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock Ollama server for benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    add_arguments(parser)
+    args = parser.parse_args()
+    server = make_server(config_from(args), args.host, args.port)
+    print(f"Mock Ollama on http://{args.host}:{args.port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,413 @@
+# bench/run.py
+"""
+Offline load benchmarks for the backend.
+
+Starts the mock Ollama (bench/mock_ollama.py) and the FastAPI server as
+subprocesses against a scratch database and cold caches, drives it with
+concurrent clients and reports p50/p95/p99 latency, throughput and server
+RSS per scenario:
+
+    interview  multi-turn sessions: /interview/start, then --turns x /interview/ask
+    report     /interview/analyze on a synthetic transcript
+    single     /analyze, one corpus resume per request
+    batch      /analyze_batch with the whole synthetic corpus per request
+
+    python -m bench.run                                  # every scenario
+    python -m bench.run -s interview -c 16 --turns 8 --tokens-per-second 30
+    python -m bench.run --out before.json
+    python -m bench.run --out after.json --compare before.json
+
+Run from the backend folder. Apart from timing, runs are repeatable for a
+given --seed (same corpus, same replies, same injected JSON faults).
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import httpx
+
+from bench import mock_ollama
+from bench.corpus import build_corpus
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCENARIOS = ("interview", "report", "single", "batch")
+STARTUP_TIMEOUT = 60
+
+CONTEXT = {"company": "Google", "role": "Backend Engineer", "round": "technical", "difficulty": "medium"}
+ANSWERS = [
+    "I would start by clarifying the requirements and the expected traffic.",
+    "We used a queue to absorb bursts and idempotent consumers to make retries safe.",
+    "The main trade-off was consistency against latency, so we cached reads for a few seconds.",
+    "I profiled the endpoint first and found most of the time went into serialisation.",
+    "In that project I owned the data model and the migration plan.",
+    "I would add metrics on queue depth and alert when the backlog keeps growing.",
+]
+
+
+# --------------------------------------------------
+# PROCESSES
+# --------------------------------------------------
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def rss_mb(pid):
+    """Resident memory of `pid` and its children in MB (Linux /proc; None elsewhere)."""
+    total, stack = 0, [pid]
+    try:
+        while stack:
+            current = stack.pop()
+            with open(f"/proc/{current}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1])
+            for task in os.listdir(f"/proc/{current}/task"):
+                with open(f"/proc/{current}/task/{task}/children") as f:
+                    stack.extend(int(c) for c in f.read().split())
+    except (FileNotFoundError, ProcessLookupError, PermissionError):
+        if total == 0:
+            return None
+    return round(total / 1024, 1)
+
+
+class Service:
+    def __init__(self, name, args, port, ready_path, env):
+        self.name = name
+        self.url = f"http://127.0.0.1:{port}"
+        self.ready_path = ready_path
+        self.log = tempfile.TemporaryFile()
+        self.proc = subprocess.Popen(args, cwd=BACKEND_DIR, env=env, stdout=self.log, stderr=subprocess.STDOUT)
+        self.peak_rss = 0.0
+
+    def wait_ready(self):
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while time.monotonic() < deadline:
+            if self.proc.poll() is not None:
+                break
+            try:
+                if httpx.get(self.url + self.ready_path, timeout=1).status_code < 500:
+                    return
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.2)
+        self.log.seek(0)
+        raise RuntimeError(f"{self.name} did not start:\n{self.log.read().decode(errors='replace')[-2000:]}")
+
+    def rss(self):
+        return rss_mb(self.proc.pid)
+
+    def stop(self):
+        self.proc.terminate()
+        try:
+            self.proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+        self.log.close()
+
+
+class RssSampler:
+    """Samples the services' RSS in the background to catch the peak of a scenario."""
+
+    def __init__(self, services, interval=0.25):
+        self.services = services
+        self.interval = interval
+        self.peak = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            for service in self.services:
+                value = service.rss()
+                if value is not None:
+                    self.peak[service.name] = max(self.peak.get(service.name, 0.0), value)
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def start_services(args, workdir):
+    env = {k: v for k, v in os.environ.items() if k != "OLLAMA_URLS"}
+    ollama_port, api_port = free_port(), free_port()
+    env.update({
+        "OLLAMA_URL": f"http://127.0.0.1:{ollama_port}",
+        "MOCKIFY_DB": os.path.join(workdir, "bench.db"),
+        "RESUME_CACHE_DIR": os.path.join(workdir, "cache"),
+        "BATCH_JOB_DIR": os.path.join(workdir, "jobs"),
+        "PYTHONUNBUFFERED": "1",
+    })
+    mock_args = [sys.executable, "-m", "bench.mock_ollama", "--port", str(ollama_port),
+                 "--latency", str(args.latency), "--tokens-per-second", str(args.tokens_per_second),
+                 "--reply-tokens", str(args.reply_tokens), "--parallel", str(args.parallel),
+                 "--malformed", str(args.malformed), "--seed", str(args.seed)]
+    services = [
+        Service("ollama", mock_args, ollama_port, "/api/tags", env),
+        Service("api", [sys.executable, "-m", "uvicorn", "main:app", "--port", str(api_port),
+                        "--log-level", "warning"], api_port, "/health", env),
+    ]
+    try:
+        for service in services:
+            service.wait_ready()
+    except Exception:
+        for service in services:
+            service.stop()
+        raise
+    return {s.name: s for s in services}
+
+
+# --------------------------------------------------
+# STATS
+# --------------------------------------------------
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = []
+        self.first_byte = []
+        self.errors = 0
+        self.items = 0
+        self.statuses = {}
+
+    def add(self, seconds, status, items=1, first_byte=None):
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if status >= 400:
+            self.errors += 1
+            return
+        self.latencies.append(seconds)
+        self.items += items
+        if first_byte is not None:
+            self.first_byte.append(first_byte)
+
+    def summary(self, wall):
+        ms = lambda v: None if v is None else round(v * 1000, 1)
+        result = {
+            "requests": sum(self.statuses.values()),
+            "errors": self.errors,
+            "statuses": {str(k): v for k, v in sorted(self.statuses.items())},
+            "p50_ms": ms(percentile(self.latencies, 0.50)),
+            "p95_ms": ms(percentile(self.latencies, 0.95)),
+            "p99_ms": ms(percentile(self.latencies, 0.99)),
+            "max_ms": ms(max(self.latencies, default=None)),
+            "throughput_rps": round(len(self.latencies) / wall, 2) if wall else None,
+            "items_per_s": round(self.items / wall, 2) if wall else None,
+            "wall_s": round(wall, 2),
+        }
+        if self.first_byte:
+            result["ttfb_p50_ms"] = ms(percentile(self.first_byte, 0.50))
+            result["ttfb_p95_ms"] = ms(percentile(self.first_byte, 0.95))
+        return result
+
+
+# --------------------------------------------------
+# SCENARIOS
+# --------------------------------------------------
+async def timed_post(client, recorder, url, items=1, stream=False, **kwargs):
+    started = time.perf_counter()
+    try:
+        if not stream:
+            res = await client.post(url, **kwargs)
+            recorder.add(time.perf_counter() - started, res.status_code, items)
+            return res
+        async with client.stream("POST", url, **kwargs) as res:
+            first = None
+            async for line in res.aiter_lines():
+                if first is None and line:
+                    first = time.perf_counter() - started
+            recorder.add(time.perf_counter() - started, res.status_code, items, first)
+            return res
+    except httpx.HTTPError:
+        recorder.add(time.perf_counter() - started, 599, items)
+        return None
+
+
+async def run_pool(jobs, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def guarded(job):
+        async with semaphore:
+            await job()
+
+    await asyncio.gather(*(guarded(job) for job in jobs))
+
+
+async def interview_scenario(client, services, args, recorder):
+    api = services["api"].url
+
+    async def session(index):
+        rng = random.Random(args.seed * 1000 + index)
+        res = await client.post(api + "/interview/start", json={"context": CONTEXT})
+        session_id = res.json()["session_id"]
+        for _ in range(args.turns):
+            payload = {"prompt": rng.choice(ANSWERS), "type": "chat", "context": CONTEXT,
+                       "session_id": session_id, "stream": args.stream}
+            await timed_post(client, recorder, api + "/interview/ask", stream=args.stream, json=payload)
+
+    await run_pool([lambda i=i: session(i) for i in range(args.sessions)], args.concurrency)
+
+
+def transcript(rng, turns):
+    lines = []
+    for _ in range(turns):
+        lines.append("AI: Can you walk me through how you would approach this?")
+        lines.append(f"User: {rng.choice(ANSWERS)}")
+    return "\n".join(lines)
+
+
+async def report_scenario(client, services, args, recorder):
+    api = services["api"].url
+    rng = random.Random(args.seed)
+    payloads = [{"transcript": transcript(rng, args.turns), "context": CONTEXT, "stream": args.stream}
+                for _ in range(args.requests)]
+    await run_pool([lambda p=p: timed_post(client, recorder, api + "/interview/analyze", stream=args.stream, json=p)
+                    for p in payloads], args.concurrency)
+
+
+async def single_scenario(client, services, args, recorder, corpus):
+    api = services["api"].url
+
+    def upload(i):
+        filename, data = corpus[i % len(corpus)]
+        return timed_post(client, recorder, api + "/analyze", files={"resume": (filename, data)})
+
+    await run_pool([lambda i=i: upload(i) for i in range(args.requests)], args.concurrency)
+
+
+async def batch_scenario(client, services, args, recorder, corpus):
+    api = services["api"].url
+    form = {"role": CONTEXT["role"], "top_n": str(len(corpus)), "prefilter": "no"}
+
+    def submit(i):
+        # A different seed per request keeps later requests from hitting the verdict cache
+        files = build_corpus(len(corpus), args.seed + i) if i else corpus
+        return timed_post(client, recorder, api + "/analyze_batch", items=len(files), data=form,
+                          files=[("resumes", (name, data)) for name, data in files])
+
+    await run_pool([lambda i=i: submit(i) for i in range(args.batch_requests)], 1)
+
+
+async def run_scenario(name, services, args, corpus):
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=max(args.concurrency, 1) * 2)
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        started = time.perf_counter()
+        if name == "interview":
+            await interview_scenario(client, services, args, recorder)
+        elif name == "report":
+            await report_scenario(client, services, args, recorder)
+        elif name == "single":
+            await single_scenario(client, services, args, recorder, corpus)
+        else:
+            await batch_scenario(client, services, args, recorder, corpus)
+        return recorder.summary(time.perf_counter() - started)
+
+
+# --------------------------------------------------
+# REPORTING
+# --------------------------------------------------
+COLUMNS = ("requests", "errors", "p50_ms", "p95_ms", "p99_ms", "throughput_rps", "items_per_s", "rss_mb", "peak_rss_mb")
+LOWER_IS_BETTER = {"p50_ms", "p95_ms", "p99_ms", "rss_mb", "peak_rss_mb", "errors"}
+
+
+def _fmt(value):
+    return "-" if value is None else f"{value:g}" if isinstance(value, (int, float)) else str(value)
+
+
+def print_table(results, previous=None):
+    header = f"{'scenario':<10}" + "".join(f"{c:>16}" for c in COLUMNS)
+    print(header)
+    print("-" * len(header))
+    for name, row in results.items():
+        cells = []
+        for column in COLUMNS:
+            value = row.get(column)
+            before = (previous or {}).get(name, {}).get(column)
+            cell = _fmt(value)
+            if isinstance(value, (int, float)) and isinstance(before, (int, float)) and before:
+                change = (value - before) / before * 100
+                cell += f" ({change:+.0f}%)"
+            cells.append(f"{cell:>16}")
+        print(f"{name:<10}" + "".join(cells))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline load benchmarks against a mock Ollama")
+    parser.add_argument("-s", "--scenario", action="append", choices=SCENARIOS,
+                        help="scenario to run (repeatable; default: all)")
+    parser.add_argument("-c", "--concurrency", type=int, default=8, help="concurrent clients")
+    parser.add_argument("--sessions", type=int, default=16, help="interview sessions")
+    parser.add_argument("--turns", type=int, default=6, help="turns per interview session / transcript")
+    parser.add_argument("--requests", type=int, default=24, help="requests for the report and single scenarios")
+    parser.add_argument("--corpus", type=int, default=20, help="resumes per batch")
+    parser.add_argument("--batch-requests", type=int, default=2, help="batch uploads (sent one after another)")
+    parser.add_argument("--stream", action="store_true", help="use the streaming interview endpoints")
+    parser.add_argument("--timeout", type=float, default=300.0, help="client timeout per request, seconds")
+    parser.add_argument("--out", help="write the results as JSON")
+    parser.add_argument("--compare", help="earlier --out file to show changes against")
+    mock_ollama.add_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    scenarios = args.scenario or list(SCENARIOS)
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f).get("results")
+
+    corpus = build_corpus(args.corpus, args.seed)
+    workdir = tempfile.mkdtemp(prefix="mockify-bench-")
+    services = start_services(args, workdir)
+    results = {}
+    try:
+        for name in scenarios:
+            print(f"Running {name}...", flush=True)
+            targets = [services["api"]]
+            with RssSampler(targets) as sampler:
+                row = asyncio.run(run_scenario(name, services, args, corpus))
+            row["rss_mb"] = targets[0].rss()
+            row["peak_rss_mb"] = sampler.peak.get(targets[0].name)
+            results[name] = row
+    finally:
+        for service in services.values():
+            service.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print()
+    print_table(results, previous)
+    if args.out:
+        settings = {k: v for k, v in vars(args).items() if k not in ("out", "compare")}
+        with open(args.out, "w") as f:
+            json.dump({"settings": settings, "python": platform.python_version(),
+                       "created": time.strftime("%Y-%m-%d %H:%M:%S"), "results": results}, f, indent=2)
+        print(f"\nSaved to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+# build_assets.py
+"""
+Static asset build for the frontend (served by static_files.py).
+
+    python build_assets.py
+
+serve.py runs it before starting the workers whenever the sources are newer
+than the build, so the API processes never process assets themselves.
+
+- Every file under FRONTEND_DIR, plus the copies in backend/assets, is
+  stored once per content as files/<name>.<hash>.<ext>; the same image
+  copied under several paths becomes one file.
+- Images wider than IMAGE_MAX_WIDTH are scaled down, and a WebP copy is
+  written when it is smaller (needs Pillow).
+- References to local files in HTML (src/href) and CSS (url()) are
+  rewritten to the hashed names under static/, whose content never changes
+  and can be cached forever. Pages keep their names.
+- Text files (HTML, JS, CSS, SVG, JSON) get .gz and .br (needs brotli)
+  copies when those are smaller.
+- manifest.json maps every URL to its stored file, type and variants.
+"""
+import gzip
+import hashlib
+import io
+import json
+import mimetypes
+import os
+import posixpath
+import re
+import shutil
+import time
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+    print("Warning: 'Pillow' not found, images are copied as they are. Install it: pip install Pillow")
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+FRONTEND_DIR = os.getenv("FRONTEND_DIR", os.path.join(BASE_DIR, "..", "frontend"))
+# Older copies of the frontend images; served as assets/<name> when the frontend has no such file
+EXTRA_SOURCES = {"assets": os.path.join(BASE_DIR, "assets")}
+BUILD_DIR = os.getenv("STATIC_BUILD_DIR", os.path.join(BASE_DIR, "static_build"))
+MANIFEST = "manifest.json"
+
+IMAGE_MAX_WIDTH = int(os.getenv("IMAGE_MAX_WIDTH", "1280"))
+JPEG_QUALITY = 85
+WEBP_QUALITY = 80
+WEBP_METHOD = 4                      # 6 is ~20x slower for ~5% smaller files
+HASH_LENGTH = 12
+# A compressed or converted copy is only kept below this fraction of the original size
+MIN_SAVING = 0.9
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png"}
+TEXT_EXTENSIONS = {".html", ".js", ".css", ".svg", ".json", ".txt"}
+# Build order: a file's references must already be hashed when it is rewritten
+ORDER = {".css": 1, ".js": 2, ".html": 3}
+
+HTML_REF = re.compile(r'''(\b(?:src|href)\s*=\s*)(["'])([^"']+)\2''', re.IGNORECASE)
+CSS_REF = re.compile(r'''(url\(\s*)(["']?)([^)"']+)\2(\s*\))''', re.IGNORECASE)
+
+
+def sources():
+    """{url: path} of every source file; the frontend wins over the extra copies."""
+    found = {}
+    for prefix, directory in [("", FRONTEND_DIR)] + sorted(EXTRA_SOURCES.items()):
+        if not os.path.isdir(directory):
+            continue
+        for root, dirs, files in os.walk(directory):
+            dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+            for name in sorted(files):
+                if name.startswith("."):
+                    continue
+                path = os.path.join(root, name)
+                url = posixpath.join(prefix, os.path.relpath(path, directory).replace(os.sep, "/"))
+                found.setdefault(url, path)
+    return found
+
+
+def is_stale(directory=BUILD_DIR):
+    """True when there is no build or a source file changed after it."""
+    manifest = os.path.join(directory, MANIFEST)
+    if not os.path.exists(manifest):
+        return True
+    built = os.path.getmtime(manifest)
+    return any(os.path.getmtime(path) > built for path in sources().values())
+
+
+def content_type(url):
+    kind = mimetypes.guess_type(url)[0] or "application/octet-stream"
+    return f"{kind}; charset=utf-8" if os.path.splitext(url)[1].lower() in TEXT_EXTENSIONS else kind
+
+
+def optimize_image(data, ext):
+    """(image bytes scaled down to IMAGE_MAX_WIDTH, WebP bytes or None)."""
+    if Image is None:
+        return data, None
+    try:
+        image = Image.open(io.BytesIO(data))
+        image.load()
+    except Exception:
+        return data, None
+    if image.mode not in ("RGB", "RGBA", "L"):
+        image = image.convert("RGBA")
+    jpeg = ext in (".jpg", ".jpeg")
+    if image.width > IMAGE_MAX_WIDTH:
+        image = image.resize((IMAGE_MAX_WIDTH, round(image.height * IMAGE_MAX_WIDTH / image.width)), Image.LANCZOS)
+        out = io.BytesIO()
+        if jpeg:
+            image.convert("RGB").save(out, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+        else:
+            image.save(out, "PNG", optimize=True)
+        if out.tell() < len(data):
+            data = out.getvalue()
+    webp = io.BytesIO()
+    image.save(webp, "WEBP", quality=WEBP_QUALITY, method=WEBP_METHOD)
+    return data, webp.getvalue() if webp.tell() < len(data) * MIN_SAVING else None
+
+
+def compressed(data):
+    """{encoding: bytes} of the precompressed copies worth keeping."""
+    copies = {"gzip": gzip.compress(data, 9, mtime=0)}
+    if brotli is not None:
+        copies["br"] = brotli.compress(data, quality=11)
+    return {name: body for name, body in copies.items() if len(body) < len(data) * MIN_SAVING}
+
+
+class Build:
+    def __init__(self, directory):
+        self.directory = directory
+        self.files = {}              # stored name -> manifest entry
+        self.urls = {}               # source url -> stored name
+        self._by_digest = {}
+        self._images = {}            # source digest -> optimize_image result (copies are converted once)
+
+    def _write(self, name, data):
+        with open(os.path.join(self.directory, "files", name), "wb") as f:
+            f.write(data)
+
+    def store(self, url, data, webp=None):
+        """Stores `data` (and its WebP copy) once per content; returns the stored name."""
+        digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+        name = self._by_digest.get(digest)
+        if name is None:
+            stem, ext = posixpath.splitext(posixpath.basename(url))
+            ext = ext.lower()
+            name = f"{stem}.{digest}{ext}"
+            entry = {"type": content_type(url), "etag": digest, "size": len(data), "encodings": {}, "webp": None}
+            self._write(name, data)
+            if webp:
+                entry["webp"] = {"file": f"{stem}.{digest}.webp", "size": len(webp)}
+                self._write(entry["webp"]["file"], webp)
+            if ext in TEXT_EXTENSIONS:
+                for encoding, body in compressed(data).items():
+                    suffix = ".br" if encoding == "br" else ".gz"
+                    entry["encodings"][encoding] = {"file": name + suffix, "size": len(body)}
+                    self._write(name + suffix, body)
+            self.files[name] = entry
+            self._by_digest[digest] = name
+        self.urls[url] = name
+        return name
+
+    def _rewrite(self, url, text, pattern):
+        base = posixpath.dirname(url)
+
+        def replace(match):
+            ref = match.group(3)
+            if re.match(r"^([a-z][a-z0-9+.-]*:|//|#|\$\{)", ref, re.IGNORECASE):
+                return match.group(0)
+            target = posixpath.normpath(posixpath.join(base, ref.split("#")[0].split("?")[0]))
+            name = self.urls.get(target)
+            if name is None or target.endswith(".html"):
+                return match.group(0)
+            hashed = posixpath.relpath(posixpath.join("static", name), base or ".")
+            return match.group(0).replace(ref, hashed, 1)
+
+        return pattern.sub(replace, text)
+
+    def add(self, url, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        ext = posixpath.splitext(url)[1].lower()
+        webp = None
+        if ext in IMAGE_EXTENSIONS:
+            source = hashlib.sha256(data).digest()
+            if source not in self._images:
+                self._images[source] = optimize_image(data, ext)
+            data, webp = self._images[source]
+        elif ext in (".html", ".css"):
+            text = data.decode("utf-8", errors="replace")
+            text = self._rewrite(url, text, HTML_REF if ext == ".html" else CSS_REF)
+            data = text.encode("utf-8")
+        return self.store(url, data, webp)
+
+    def manifest(self):
+        return {"built": time.time(), "files": self.files, "urls": self.urls}
+
+
+def build(directory=BUILD_DIR):
+    """Builds into a fresh directory and swaps it in; returns the manifest."""
+    staging = directory + ".tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(os.path.join(staging, "files"))
+    result = Build(staging)
+    found = sources()
+    for url in sorted(found, key=lambda u: (ORDER.get(posixpath.splitext(u)[1].lower(), 0), u)):
+        result.add(url, found[url])
+    manifest = result.manifest()
+    with open(os.path.join(staging, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(staging, directory)
+    return manifest
+
+
+def main():
+    started = time.monotonic()
+    manifest = build()
+    files = manifest["files"]
+    stored = sum(e["size"] for e in files.values())
+    print(f"Built {len(manifest['urls'])} assets into {len(files)} files "
+          f"({stored // 1024} KB) in {time.monotonic() - started:.1f}s -> {BUILD_DIR}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+# digests.py
+"""
+Map-reduce condensing of long resumes and interview transcripts.
+
+Inputs that fit their prompt budget pass through unchanged. Sizes are
+counted with prompt_budget's calibrated per-model estimate: chunks for the
+model that condenses them, the budget for the model that reads the digest. Longer ones
+are split into token-budgeted chunks on line boundaries, each chunk is
+condensed to plain facts by a small-context call (map; chunks run in
+parallel), and the notes are joined into a digest for the final scoring or
+report prompt (reduce; notes that still do not fit are condensed again).
+The whole document is read instead of only its first few thousand
+characters.
+
+Chunking is greedy from the start, so text appended later (a growing
+transcript) only changes the last chunk. Chunk notes are cached on disk by
+(chunk hash, model, prompt), so later turns, re-scoring under other rules
+and repeated batches only pay for chunks they have not seen.
+"""
+import asyncio
+import contextvars
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi.concurrency import run_in_threadpool
+
+import metrics
+from admission import DeadlineExceeded, Overloaded
+from llm_client import generate, generate_sync
+from llm_router import model_for
+import prompt_budget
+from resume_cache import digest_cache, make_key, sha256
+
+logger = logging.getLogger(__name__)
+
+CHUNK_TOKENS = int(os.getenv("DIGEST_CHUNK_TOKENS", "700"))
+NOTE_TOKENS = int(os.getenv("DIGEST_NOTE_TOKENS", "200"))       # num_predict per chunk
+MAX_ROUNDS = int(os.getenv("DIGEST_MAX_ROUNDS", "3"))
+MAP_CONCURRENCY = int(os.getenv("DIGEST_MAP_CONCURRENCY", "4"))  # sync callers only
+# Chunk sizes are rounded down to this many characters, so small shifts in
+# the calibration do not move every chunk boundary (and miss the note cache)
+CHUNK_CHAR_STEP = 256
+
+RESUME_PROMPT = """Extract the facts from this part of a resume as short bullet points:
+skills and technologies, job titles with employers and dates, years of experience,
+projects, education and certifications. Copy names and numbers exactly.
+Do not judge the candidate and do not add anything that is not in the text.
+
+{text}
+"""
+
+TRANSCRIPT_PROMPT = """Condense this part of an interview transcript into short bullet points.
+For every question the interviewer (AI) asked, note the question and what the
+candidate (User) actually answered, including wrong, vague or missing answers,
+code and technologies they mentioned. Do not judge the candidate and do not
+add anything that is not in the text.
+
+{text}
+"""
+
+# kind -> how its digest is built, the route of the prompt that reads it and
+# how much of that prompt it may use
+PROFILES = {
+    "resume": {
+        "prompt": RESUME_PROMPT,
+        "route": "resume",
+        "reader": "resume",
+        "budget": int(os.getenv("RESUME_DIGEST_TOKENS", "1000")),
+        "header": "",
+    },
+    "transcript": {
+        "prompt": TRANSCRIPT_PROMPT,
+        "route": "summary",
+        "reader": "report",
+        "budget": int(os.getenv("TRANSCRIPT_DIGEST_TOKENS", "2000")),
+        "header": "(Long interview: notes condensed from the full transcript, in order.)\n",
+    },
+}
+
+
+def _pieces(text, limit):
+    """Non-empty lines, with lines longer than `limit` chars cut at a space."""
+    for line in (text or "").splitlines():
+        line = line.strip()
+        while len(line) > limit:
+            cut = line.rfind(" ", 0, limit)
+            cut = cut if cut > limit // 2 else limit
+            yield line[:cut]
+            line = line[cut:].lstrip()
+        if line:
+            yield line
+
+
+def split_chunks(text: str, model: str, max_tokens: int = CHUNK_TOKENS) -> list:
+    """Greedy line packing into chunks of at most `max_tokens` (estimated for `model`)."""
+    chars = prompt_budget.chars_for(max(1, max_tokens), model)
+    limit = max(1, chars // CHUNK_CHAR_STEP * CHUNK_CHAR_STEP or chars)
+    chunks, current, size = [], [], 0
+    for line in _pieces(text, limit):
+        if current and size + len(line) > limit:
+            chunks.append("\n".join(current))
+            current, size = [], 0
+        current.append(line)
+        size += len(line) + 1
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def _request(chunk, profile):
+    """(prompt, model, options) for one chunk; num_ctx is sized to the chunk."""
+    prompt = profile["prompt"].format(text=chunk)
+    model = model_for(profile["route"])
+    options = prompt_budget.options_for(model, prompt, NOTE_TOKENS, {"temperature": 0, "num_predict": NOTE_TOKENS})
+    return prompt, model, options
+
+
+def _cache_key(chunk, profile):
+    return make_key(sha256(chunk), model_for(profile["route"]), sha256(profile["prompt"]))
+
+
+def _note_sync(chunk, profile):
+    key = _cache_key(chunk, profile)
+    note = digest_cache.get(key)
+    if note is not None:
+        return note
+    try:
+        prompt, model, options = _request(chunk, profile)
+        data = generate_sync(prompt, model, options=options, cache=True)
+    except (Overloaded, DeadlineExceeded):
+        raise
+    except Exception as e:
+        logger.warning(f"Digest of a chunk failed, keeping it verbatim: {e}")
+        return chunk
+    note = data.get("response", "").strip() or chunk
+    digest_cache.put(key, note)
+    return note
+
+
+async def _note_async(chunk, profile):
+    key = _cache_key(chunk, profile)
+    note = await run_in_threadpool(digest_cache.get, key)
+    if note is not None:
+        return note
+    try:
+        prompt, model, options = _request(chunk, profile)
+        data = await generate(prompt, model, options=options, cache=True)
+    except (Overloaded, DeadlineExceeded):
+        raise
+    except Exception as e:
+        logger.warning(f"Digest of a chunk failed, keeping it verbatim: {e}")
+        return chunk
+    note = data.get("response", "").strip() or chunk
+    await run_in_threadpool(digest_cache.put, key, note)
+    return note
+
+
+def _map_sync(chunks, profile):
+    if len(chunks) == 1:
+        return [_note_sync(chunks[0], profile)]
+    # Each call carries the caller's admission priority and deadline
+    with ThreadPoolExecutor(max_workers=max(1, min(MAP_CONCURRENCY, len(chunks)))) as pool:
+        futures = [pool.submit(contextvars.copy_context().run, _note_sync, chunk, profile) for chunk in chunks]
+        return [f.result() for f in futures]
+
+
+def condense(text: str, kind: str) -> str:
+    """`text` itself if it fits the `kind` budget, otherwise its digest."""
+    profile = PROFILES[kind]
+    model, reader = model_for(profile["route"]), model_for(profile["reader"])
+    if prompt_budget.count(text, reader) <= profile["budget"]:
+        return text
+    started = time.perf_counter()
+    notes = text
+    for _ in range(MAX_ROUNDS):
+        notes = "\n".join(_map_sync(split_chunks(notes, model), profile))
+        if prompt_budget.count(notes, reader) <= profile["budget"]:
+            break
+    metrics.record("digest", time.perf_counter() - started, kind=kind)
+    # Last resort when the notes refuse to shrink: cut the tail
+    return profile["header"] + prompt_budget.truncate(notes, profile["budget"], reader)
+
+
+async def condense_async(text: str, kind: str) -> str:
+    """condense for the event loop: chunk calls are awaited concurrently."""
+    profile = PROFILES[kind]
+    model, reader = model_for(profile["route"]), model_for(profile["reader"])
+    if prompt_budget.count(text, reader) <= profile["budget"]:
+        return text
+    started = time.perf_counter()
+    notes = text
+    for _ in range(MAX_ROUNDS):
+        notes = "\n".join(await asyncio.gather(*(_note_async(c, profile) for c in split_chunks(notes, model))))
+        if prompt_budget.count(notes, reader) <= profile["budget"]:
+            break
+    metrics.record("digest", time.perf_counter() - started, kind=kind)
+    return profile["header"] + prompt_budget.truncate(notes, profile["budget"], reader)
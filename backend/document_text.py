@@ -0,0 +1,229 @@
+# document_text.py
+"""
+In-memory resume ingestion and text extraction.
+
+Uploads are fed chunk by chunk into an UploadBuffer as the request streams
+in (see uploads.py). Small files stay in memory and are parsed from a
+BytesIO; files above SPILL_THRESHOLD_MB are spilled to a private temp file
+(unique name, so concurrent uploads never collide). Files above
+MAX_UPLOAD_MB are rejected.
+
+A "source" is a picklable (ext, payload) pair where payload is either the
+file bytes or the path of a spilled temp file, so it can be sent to the
+batch extraction process pool.
+
+PDF extraction stops as soon as it has enough characters for the prompt
+budget. It tries the cheap pypdfium2 text layer first and only falls back
+to pdfplumber's layout analysis (then pypdf) when that yields too little
+text, all within a per-document time budget.
+
+The extraction engines are imported on first use (`_engine`), so the API
+starts without loading them; a process that never parses a document never
+pays for them.
+"""
+import hashlib
+import importlib
+import io
+import logging
+import os
+import tempfile
+import time
+from functools import lru_cache
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+ALLOWED_EXTENSIONS = {'txt', 'pdf', 'docx'}
+MAX_UPLOAD_MB = float(os.getenv("MAX_UPLOAD_MB", "10"))
+SPILL_THRESHOLD_MB = float(os.getenv("SPILL_THRESHOLD_MB", "2"))
+
+# Long resumes are condensed chunk by chunk before scoring (digests.py),
+# so this only bounds pathological documents
+EXTRACT_MAX_CHARS = int(os.getenv("EXTRACT_MAX_CHARS", "24000"))
+EXTRACT_MAX_PAGES = int(os.getenv("EXTRACT_MAX_PAGES", "15"))
+EXTRACT_TIME_BUDGET = float(os.getenv("EXTRACT_TIME_BUDGET", "5"))
+# Below this many characters per page the text layer is considered missing
+# or broken and the layout engine is tried
+MIN_CHARS_PER_PAGE = int(os.getenv("EXTRACT_MIN_CHARS_PER_PAGE", "100"))
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+def file_extension(filename):
+    return filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
+
+
+def allowed_file(filename):
+    return file_extension(filename) in ALLOWED_EXTENSIONS
+
+
+class UploadBuffer:
+    """
+    Receives an upload chunk by chunk, hashing it on the way. Small files
+    stay in memory; past SPILL_THRESHOLD_MB the data moves to a private temp
+    file. `write` raises UploadTooLarge past MAX_UPLOAD_MB.
+    """
+
+    def __init__(self, filename):
+        self.ext = file_extension(filename)
+        self.size = 0
+        self._max_bytes = int(MAX_UPLOAD_MB * 1024 * 1024)
+        self._spill_bytes = int(SPILL_THRESHOLD_MB * 1024 * 1024)
+        self._digest = hashlib.sha256()
+        self._buffer = io.BytesIO()
+        self._spill = None
+
+    def write(self, chunk):
+        self.size += len(chunk)
+        if self.size > self._max_bytes:
+            self.discard()
+            raise UploadTooLarge(f"File exceeds {MAX_UPLOAD_MB:g} MB")
+        self._digest.update(chunk)
+        if self._spill is None and self.size > self._spill_bytes:
+            fd, path = tempfile.mkstemp(suffix='.' + self.ext)
+            self._spill = (os.fdopen(fd, 'wb'), path)
+            self._spill[0].write(self._buffer.getvalue())
+            self._buffer = None
+        if self._spill is not None:
+            self._spill[0].write(chunk)
+        else:
+            self._buffer.write(chunk)
+
+    def finish(self):
+        """Returns (sha256 hex digest, source)."""
+        if self._spill is not None:
+            self._spill[0].close()
+            return self._digest.hexdigest(), (self.ext, self._spill[1])
+        return self._digest.hexdigest(), (self.ext, self._buffer.getvalue())
+
+    def discard(self):
+        if self._spill is not None:
+            self._spill[0].close()
+            if os.path.exists(self._spill[1]):
+                os.remove(self._spill[1])
+            self._spill = None
+        self._buffer = io.BytesIO()
+
+
+def release(source):
+    """Deletes the spilled temp file of a source, if any."""
+    if source and isinstance(source[1], str) and os.path.exists(source[1]):
+        os.remove(source[1])
+
+
+def _open(payload):
+    return io.BytesIO(payload) if isinstance(payload, bytes) else payload
+
+
+@lru_cache(maxsize=None)
+def _engine(name):
+    """The extraction module `name`, imported on first use (None if not installed)."""
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        logger.warning(f"'{name}' not found. Install it: pip install {name}")
+        return None
+
+
+def _pdfium_pages(payload):
+    pdf = _engine("pypdfium2").PdfDocument(payload)
+    try:
+        for i in range(len(pdf)):
+            page = pdf[i]
+            textpage = page.get_textpage()
+            try:
+                yield textpage.get_text_range()
+            finally:
+                textpage.close()
+                page.close()
+    finally:
+        pdf.close()
+
+
+def _pdfplumber_pages(payload):
+    with _engine("pdfplumber").open(_open(payload)) as pdf:
+        for page in pdf.pages:
+            yield page.extract_text()
+            page.close()
+
+
+def _pypdf_pages(payload):
+    for page in _engine("pypdf").PdfReader(_open(payload)).pages:
+        yield page.extract_text()
+
+
+def _read_pages(pages, max_chars, deadline):
+    """Collects page text until the char budget, page cap or deadline is hit."""
+    parts, size, count = [], 0, 0
+    for extracted in pages:
+        count += 1
+        if extracted:
+            parts.append(extracted + "\n")
+            size += len(extracted) + 1
+        if (max_chars and size >= max_chars) or count >= EXTRACT_MAX_PAGES or time.monotonic() >= deadline:
+            break
+    if hasattr(pages, "close"):
+        pages.close()
+    return "".join(parts), count
+
+
+def _extract_pdf(payload, max_chars, deadline):
+    engines = [(name, pages) for name, pages in
+               (("pypdfium2", _pdfium_pages), ("pdfplumber", _pdfplumber_pages), ("pypdf", _pypdf_pages))
+               if _engine(name)]
+
+    best = ("", "none")
+    for engine, pages in engines:
+        try:
+            text, count = _read_pages(pages(payload), max_chars, deadline)
+        except Exception:
+            continue
+        if len(text.strip()) > len(best[0].strip()):
+            best = (text, engine)
+        # Good enough text layer -> no need for the slower engines
+        if len(text.strip()) >= MIN_CHARS_PER_PAGE * max(count, 1) or (max_chars and len(text) >= max_chars):
+            break
+        if time.monotonic() >= deadline:
+            break
+    return best
+
+
+def extract_document(source, max_chars=EXTRACT_MAX_CHARS, time_budget=EXTRACT_TIME_BUDGET):
+    """
+    Extracts up to ~max_chars characters (None = whole document).
+    Returns {"text": str or None, "engine": str, "seconds": float}.
+    """
+    ext, payload = source
+    started = time.monotonic()
+    deadline = started + time_budget if time_budget else float("inf")
+    text, engine = "", ext
+    try:
+        if ext == 'pdf':
+            text, engine = _extract_pdf(payload, max_chars, deadline)
+        elif ext == 'docx':
+            text, engine = _engine("docx2txt").process(_open(payload)), "docx2txt"
+        elif ext == 'txt':
+            if isinstance(payload, bytes):
+                text = payload.decode('utf-8', errors='ignore')
+            else:
+                with open(payload, 'r', encoding='utf-8', errors='ignore') as f:
+                    text = f.read()
+    except Exception:
+        text = None
+    return {
+        "text": text if text and text.strip() else None,
+        "engine": engine,
+        "seconds": round(time.monotonic() - started, 4),
+    }
+
+
+def record_extraction(doc):
+    """Adds an extract_document() result to the per-engine timing histogram."""
+    metrics.record("extract", doc["seconds"], engine=doc["engine"])
+
+
+def extract_text(source, max_chars=EXTRACT_MAX_CHARS):
+    return extract_document(source, max_chars)["text"]
@@ -0,0 +1,163 @@
+# interview_sessions.py
+"""
+Server-side interview sessions.
+
+The client sends only the new utterance per turn. The session keeps the
+turn history and replays it as /api/chat messages behind the same memoized
+system prompt, so every turn extends the previous one and Ollama reuses the
+cached prefix instead of re-evaluating the whole conversation. When the
+conversation approaches `num_ctx`, older turns are rolled into a short
+summary and only the most recent turns are replayed.
+
+Sessions are written through to SQLite after every change, so any worker
+process can serve the next turn (and sessions survive a restart). Each
+worker keeps the objects it has seen in memory and reloads one only when
+another worker has written a newer version.
+"""
+import asyncio
+import os
+import threading
+import time
+import uuid
+
+import storage
+
+SESSION_TTL = int(os.getenv("SESSION_TTL", "7200"))      # seconds of inactivity
+MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", "1000"))
+ROLL_RATIO = float(os.getenv("SESSION_ROLL_RATIO", "0.75"))  # fraction of num_ctx
+KEEP_RECENT_TURNS = int(os.getenv("SESSION_KEEP_TURNS", "4"))
+
+
+class InterviewSession:
+    def __init__(self, context: dict, session_id: str = None):
+        self.id = session_id or uuid.uuid4().hex
+        self.context = context or {}
+        self.turns = []              # [(speaker, text)]
+        self.summary = ""            # rolled-up older turns
+        self.summarized_upto = 0     # turns[:summarized_upto] live only in `summary`
+        self.tokens = None           # context tokens used after the last reply
+        self.lock = asyncio.Lock()   # one turn at a time per session (per worker)
+        self.touched = time.time()
+        self.version = 0             # storage version this object reflects
+
+    def state(self) -> dict:
+        return {"context": self.context, "turns": self.turns, "summary": self.summary,
+                "summarized_upto": self.summarized_upto, "tokens": self.tokens}
+
+    def load_state(self, state: dict):
+        self.context = state.get("context") or {}
+        self.turns = [tuple(turn) for turn in state.get("turns", [])]
+        self.summary = state.get("summary", "")
+        self.summarized_upto = state.get("summarized_upto", 0)
+        self.tokens = state.get("tokens")
+
+    def add_turn(self, speaker: str, text: str):
+        self.turns.append((speaker, text))
+        self.touched = time.time()
+
+    def transcript(self) -> str:
+        return format_turns(self.turns)
+
+    def pending_turns(self) -> list:
+        """Turns not yet folded into the summary."""
+        return self.turns[self.summarized_upto:]
+
+    def history_messages(self) -> list:
+        """Summary plus pending turns as /api/chat messages (after the system prompt)."""
+        messages = []
+        if self.summary:
+            messages.append({"role": "system", "content": f"Summary of the interview so far:\n{self.summary}"})
+        for speaker, text in self.pending_turns():
+            messages.append({"role": "assistant" if speaker == "AI" else "user", "content": text})
+        return messages
+
+    def context_tokens(self) -> int:
+        if self.tokens is not None:
+            return self.tokens
+        # No server count yet -> rough 4 chars/token estimate of the history
+        return sum(len(m["content"]) for m in self.history_messages()) // 4
+
+    def needs_roll(self, num_ctx: int) -> bool:
+        return (len(self.pending_turns()) > KEEP_RECENT_TURNS
+                and self.context_tokens() >= int(num_ctx * ROLL_RATIO))
+
+    def turns_to_roll(self) -> list:
+        return self.turns[self.summarized_upto:len(self.turns) - KEEP_RECENT_TURNS]
+
+    def apply_roll(self, summary: str):
+        """Fold `turns_to_roll()` into `summary`; later turns replay only the rest."""
+        self.summary = summary
+        self.summarized_upto = len(self.turns) - KEEP_RECENT_TURNS
+        self.tokens = None
+
+
+def format_turns(turns: list) -> str:
+    return "\n".join(f"{speaker}: {text}" for speaker, text in turns)
+
+
+class SessionStore:
+    """
+    Called from the threadpool (the storage calls block), so the in-memory
+    map is only touched under `_lock`; storage calls run outside it.
+    """
+
+    def __init__(self):
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def create(self, context: dict) -> InterviewSession:
+        self._evict()
+        session = InterviewSession(context)
+        self.save(session)
+        with self._lock:
+            self._sessions[session.id] = session
+        return session
+
+    def get(self, session_id: str):
+        stored = storage.session_version(session_id)
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if stored is None:
+                self._sessions.pop(session_id, None)
+        if stored is None:
+            return None
+        version, written = stored
+        if time.time() - max(written, session.touched if session else 0) > SESSION_TTL:
+            self.drop(session_id)
+            return None
+        if session is None or session.version != version:
+            loaded = storage.load_session(session_id)
+            if loaded is None:
+                return None
+            if session is None:
+                self._evict()
+                with self._lock:
+                    session = self._sessions.setdefault(session_id, InterviewSession({}, session_id))
+            session.load_state(loaded[0])
+            session.version = loaded[1]
+        session.touched = time.time()
+        return session
+
+    def save(self, session: InterviewSession):
+        """Writes the session through to storage (call after every change)."""
+        session.version = storage.save_session(session.id, session.state())
+        session.touched = time.time()
+
+    def drop(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+        storage.delete_sessions([session_id])
+
+    def _evict(self):
+        now = time.time()
+        with self._lock:
+            for sid in [sid for sid, s in self._sessions.items() if now - s.touched > SESSION_TTL]:
+                del self._sessions[sid]
+            # Still full -> forget the least recently used sessions (they stay in storage)
+            while len(self._sessions) >= MAX_SESSIONS:
+                oldest = min(self._sessions.values(), key=lambda s: s.touched)
+                del self._sessions[oldest.id]
+        storage.delete_sessions(idle_before=now - SESSION_TTL)
+
+
+sessions = SessionStore()
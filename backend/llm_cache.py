@@ -0,0 +1,170 @@
+# llm_cache.py
+"""
+In-process cache and request coalescing for deterministic LLM calls.
+
+Responses are keyed on (endpoint, model, whitespace-normalized prompt or
+messages, options, format) and kept for LLM_CACHE_TTL seconds in a
+size-bounded LRU. Identical requests that arrive while the first one is
+still generating wait for it instead of starting their own generation.
+
+Only calls that opt in (or run at temperature 0) go through here; ordinary
+sampled chat turns never do.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import metrics
+
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "3600"))
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "1024"))
+
+
+def _normalize(text):
+    return " ".join(text.split()) if isinstance(text, str) else text
+
+
+def make_key(path, payload):
+    """Stable hash of everything that affects the generated output."""
+    key = {k: v for k, v in payload.items() if k not in ("stream", "keep_alive")}
+    # num_ctx is sized per request (prompt_budget.py); a prompt that fits gets the same output
+    if "num_ctx" in key.get("options", {}):
+        key["options"] = {k: v for k, v in key["options"].items() if k != "num_ctx"}
+    if "prompt" in key:
+        key["prompt"] = _normalize(key["prompt"])
+    if "system" in key:
+        key["system"] = _normalize(key["system"])
+    if "messages" in key:
+        key["messages"] = [{**m, "content": _normalize(m.get("content"))} for m in key["messages"]]
+    raw = json.dumps([path, key], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def should_cache(options, cache=None):
+    """Explicit opt-in/out wins; otherwise only temperature-0 calls are cached."""
+    if cache is not None:
+        return cache
+    return (options or {}).get("temperature") == 0
+
+
+class ResponseCache:
+    def __init__(self, ttl=LLM_CACHE_TTL, max_entries=LLM_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()   # key -> (expires_at, response)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(entry[1])
+
+    def put(self, key, response):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, dict(response))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def record_coalesced(self):
+        with self._lock:
+            self.coalesced += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits,
+                    "misses": self.misses, "coalesced": self.coalesced}
+
+
+response_cache = ResponseCache()
+
+metrics.collector("llm_cache_events_total", "LLM response cache hits, misses and coalesced requests.", "counter",
+                  lambda: [({"event": k}, v) for k, v in response_cache.stats().items() if k != "entries"])
+metrics.collector("llm_cache_entries", "Responses held in the LLM cache.", "gauge",
+                  lambda: [({}, response_cache.stats()["entries"])])
+
+_inflight = {}                  # key -> [loop, task, waiters]
+_inflight_sync = {}             # key -> Future
+_inflight_sync_lock = threading.Lock()
+
+
+async def cached_call(key, fetch):
+    """
+    Cached/coalesced `await fetch()`. The shared generation is only
+    cancelled once every waiting caller has gone away.
+    """
+    hit = response_cache.get(key)
+    if hit is not None:
+        return hit
+
+    loop = asyncio.get_running_loop()
+    entry = _inflight.get(key)
+    if entry is None or entry[0] is not loop:
+        async def run():
+            response = await fetch()
+            response_cache.put(key, response)
+            return response
+
+        entry = [loop, asyncio.ensure_future(run()), 0]
+        _inflight[key] = entry
+        entry[1].add_done_callback(lambda _, entry=entry: _inflight.pop(key, None) if _inflight.get(key) is entry else None)
+    else:
+        response_cache.record_coalesced()
+
+    entry[2] += 1
+    try:
+        return dict(await asyncio.shield(entry[1]))
+    finally:
+        entry[2] -= 1
+        if entry[2] == 0 and not entry[1].done():
+            entry[1].cancel()
+
+
+def cached_call_sync(key, fetch):
+    """Thread-safe cached/coalesced `fetch()`."""
+    hit = response_cache.get(key)
+    if hit is not None:
+        return hit
+
+    with _inflight_sync_lock:
+        future = _inflight_sync.get(key)
+        leader = future is None
+        if leader:
+            future = Future()
+            _inflight_sync[key] = future
+        else:
+            response_cache.record_coalesced()
+
+    if not leader:
+        return dict(future.result())
+
+    try:
+        response = fetch()
+        response_cache.put(key, response)
+        future.set_result(response)
+        return dict(response)
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _inflight_sync_lock:
+            _inflight_sync.pop(key, None)
@@ -0,0 +1,342 @@
+# llm_client.py
+"""
+Shared Ollama client used by both backends.
+
+- One keep-alive connection pool per process (async for FastAPI,
+  sync for the resume scoring threads).
+- Every call first takes a slot from the admission controller (priority
+  queues, 429 on overload, deadlines; see admission.py).
+- Every attempt is routed by llm_router to the least busy healthy Ollama
+  node, so a retry fails over to another node when one is down.
+- Per-request timeouts.
+- Retry with exponential backoff on transient failures (connection
+  errors, 5xx/429) -- only before any token has been handed to the caller.
+- `cancel_on_disconnect` stops the inference wait when the HTTP client
+  goes away.
+- `cache=True` (or temperature 0) serves repeated non-streaming calls from
+  the response cache and merges identical in-flight requests (llm_cache.py).
+- Queue wait, time to first token, total generation time and tokens/s go
+  to metrics.py; prompt sizes and Ollama's prompt_eval_count calibrate
+  the token estimator (prompt_budget.py).
+- Every request carries `keep_alive`, and finished calls are recorded as
+  traffic so warmup.py keeps busy models loaded.
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+
+import httpx
+
+import metrics
+import prompt_budget
+import warmup
+from llm_cache import cached_call, cached_call_sync, make_key, should_cache
+from llm_router import router
+from admission import controller as admission
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "180"))
+CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+BACKOFF_BASE = float(os.getenv("LLM_BACKOFF", "0.5"))
+POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "100"))
+
+RETRY_STATUS = {429, 502, 503, 504}
+TRANSIENT_ERRORS = (httpx.TransportError,)
+
+
+class LLMError(Exception):
+    """Raised when the LLM server cannot produce a response."""
+
+
+def _limits():
+    return httpx.Limits(max_connections=POOL_SIZE, max_keepalive_connections=POOL_SIZE)
+
+
+def _timeout(timeout):
+    return httpx.Timeout(timeout or DEFAULT_TIMEOUT, connect=CONNECT_TIMEOUT)
+
+
+def _backoff(attempt):
+    return BACKOFF_BASE * (2 ** attempt)
+
+
+def _is_retryable(exc):
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code in RETRY_STATUS
+    return isinstance(exc, TRANSIENT_ERRORS)
+
+
+def _is_node_failure(exc):
+    """Errors that say the node itself is unhealthy (not just a bad request)."""
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code >= 500
+    return isinstance(exc, TRANSIENT_ERRORS)
+
+
+def _report(backend, exc=None):
+    if exc is None:
+        router.mark_ok(backend)
+    elif _is_node_failure(exc):
+        router.mark_failed(backend, str(exc))
+
+
+def _observe(path, payload, data, started):
+    """Generation time and Ollama's decode speed for a finished call."""
+    model = payload.get("model", "")
+    metrics.record("llm_generation", time.monotonic() - started, model=model, endpoint=path)
+    count, duration = data.get("eval_count"), data.get("eval_duration")
+    if count and duration:
+        metrics.observe("llm_tokens_per_second", count / (duration / 1e9), model=model)
+    chars = len(payload.get("prompt") or "") + sum(len(m.get("content") or "") for m in payload.get("messages") or [])
+    prompt_budget.calibrate(model, chars, data.get("prompt_eval_count"))
+    warmup.touch(model)
+
+
+def build_payload(prompt, model, stream, options=None, format=None, **extra):
+    payload = {"model": model, "prompt": prompt, "stream": stream, "keep_alive": warmup.KEEP_ALIVE}
+    if options:
+        payload["options"] = options
+    if format:
+        payload["format"] = format
+    payload.update({k: v for k, v in extra.items() if v is not None})
+    return payload
+
+
+def build_chat_payload(messages, model, stream, options=None, format=None, **extra):
+    payload = {"model": model, "messages": messages, "stream": stream, "keep_alive": warmup.KEEP_ALIVE}
+    if options:
+        payload["options"] = options
+    if format:
+        payload["format"] = format
+    payload.update({k: v for k, v in extra.items() if v is not None})
+    return payload
+
+
+# --------------------------------------------------
+# ASYNC CLIENT (FastAPI)
+# --------------------------------------------------
+_async_client = None
+_async_loop = None
+
+
+def get_async_client():
+    """
+    Process-wide AsyncClient. An httpx AsyncClient is bound to the event loop
+    it was first used on, so a new one is created if the loop changes
+    (e.g. under test clients that spin up a loop per request).
+    """
+    global _async_client, _async_loop
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_loop is not loop or _async_client.is_closed:
+        _async_client = httpx.AsyncClient(limits=_limits(), timeout=_timeout(None))
+        _async_loop = loop
+    return _async_client
+
+
+async def aclose():
+    global _async_client
+    if _async_client is not None and not _async_client.is_closed:
+        await _async_client.aclose()
+    _async_client = None
+
+
+async def post_json(path, payload, timeout=None, retries=None):
+    """POST a non-streaming request and return the decoded JSON body."""
+    async with admission.slot():
+        return await _post_json(path, payload, timeout, retries)
+
+
+async def _post_json(path, payload, timeout, retries):
+    retries = MAX_RETRIES if retries is None else retries
+    client = get_async_client()
+    started = time.monotonic()
+
+    for attempt in range(retries + 1):
+        try:
+            with router.use(payload.get("model")) as backend:
+                try:
+                    res = await client.post(backend.url + path, json=payload, timeout=_timeout(timeout))
+                    res.raise_for_status()
+                except Exception as e:
+                    _report(backend, e)
+                    raise
+                _report(backend)
+                data = res.json()
+                _observe(path, payload, data, started)
+                return data
+        except Exception as e:
+            if attempt < retries and _is_retryable(e):
+                logger.warning(f"LLM request failed ({e}), retrying")
+                await asyncio.sleep(_backoff(attempt))
+                continue
+            raise LLMError(str(e)) from e
+
+
+async def stream_json(path, payload, timeout=None, retries=None):
+    """
+    POST a streaming request and yield each decoded NDJSON chunk.
+    Retries only happen before the first chunk is yielded.
+    """
+    async with admission.slot():
+        async for chunk in _stream_json(path, payload, timeout, retries):
+            yield chunk
+
+
+async def _stream_json(path, payload, timeout, retries):
+    retries = MAX_RETRIES if retries is None else retries
+    client = get_async_client()
+    began = time.monotonic()
+
+    for attempt in range(retries + 1):
+        started = False
+        try:
+            with router.use(payload.get("model")) as backend:
+                try:
+                    async with client.stream("POST", backend.url + path, json=payload, timeout=_timeout(timeout)) as res:
+                        res.raise_for_status()
+                        async for line in res.aiter_lines():
+                            if not line:
+                                continue
+                            chunk = json.loads(line)
+                            if chunk.get("error"):
+                                raise LLMError(chunk["error"])
+                            if not started:
+                                started = True
+                                _report(backend)
+                                metrics.record("llm_ttft", time.monotonic() - began, model=payload.get("model", ""))
+                            if chunk.get("done"):
+                                _observe(path, payload, chunk, began)
+                            yield chunk
+                            if chunk.get("done"):
+                                return
+                    return
+                except (LLMError, GeneratorExit, asyncio.CancelledError):
+                    raise
+                except Exception as e:
+                    _report(backend, e)
+                    raise
+        except LLMError:
+            raise
+        except Exception as e:
+            if not started and attempt < retries and _is_retryable(e):
+                logger.warning(f"LLM stream failed ({e}), retrying")
+                await asyncio.sleep(_backoff(attempt))
+                continue
+            raise LLMError(str(e)) from e
+
+
+async def _post_maybe_cached(path, payload, options, timeout, cache):
+    if not should_cache(options, cache):
+        return await post_json(path, payload, timeout=timeout)
+    return await cached_call(make_key(path, payload), lambda: post_json(path, payload, timeout=timeout))
+
+
+async def generate(prompt, model, options=None, format=None, timeout=None, cache=None, **extra):
+    """Full completion from /api/generate. Returns Ollama's response dict."""
+    payload = build_payload(prompt, model, False, options, format, **extra)
+    return await _post_maybe_cached("/api/generate", payload, options, timeout, cache)
+
+
+async def stream_generate(prompt, model, options=None, format=None, timeout=None, **extra):
+    """Yields Ollama /api/generate chunks as they are produced."""
+    payload = build_payload(prompt, model, True, options, format, **extra)
+    async for chunk in stream_json("/api/generate", payload, timeout=timeout):
+        yield chunk
+
+
+async def chat(messages, model, options=None, format=None, timeout=None, cache=None, **extra):
+    """Full reply from /api/chat. Returns Ollama's response dict."""
+    payload = build_chat_payload(messages, model, False, options, format, **extra)
+    return await _post_maybe_cached("/api/chat", payload, options, timeout, cache)
+
+
+async def stream_chat(messages, model, options=None, format=None, timeout=None, **extra):
+    """Yields Ollama /api/chat chunks as they are produced."""
+    payload = build_chat_payload(messages, model, True, options, format, **extra)
+    async for chunk in stream_json("/api/chat", payload, timeout=timeout):
+        yield chunk
+
+
+async def cancel_on_disconnect(request, coro, poll_interval=0.5):
+    """
+    Await `coro`, but cancel it as soon as the HTTP client disconnects.
+    Cancelling closes the upstream connection, so Ollama stops generating.
+    """
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                raise asyncio.CancelledError("client disconnected")
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+# --------------------------------------------------
+# SYNC CLIENT (resume scoring threads)
+# --------------------------------------------------
+_sync_client = None
+_sync_lock = threading.Lock()
+
+
+def get_sync_client():
+    global _sync_client
+    with _sync_lock:
+        if _sync_client is None:
+            _sync_client = httpx.Client(limits=_limits(), timeout=_timeout(None))
+    return _sync_client
+
+
+def post_json_sync(path, payload, timeout=None, retries=None):
+    with admission.slot_sync():
+        return _post_json_sync(path, payload, timeout, retries)
+
+
+def _post_json_sync(path, payload, timeout, retries):
+    retries = MAX_RETRIES if retries is None else retries
+    client = get_sync_client()
+    started = time.monotonic()
+
+    for attempt in range(retries + 1):
+        try:
+            with router.use(payload.get("model")) as backend:
+                try:
+                    res = client.post(backend.url + path, json=payload, timeout=_timeout(timeout))
+                    res.raise_for_status()
+                except Exception as e:
+                    _report(backend, e)
+                    raise
+                _report(backend)
+                data = res.json()
+                _observe(path, payload, data, started)
+                return data
+        except Exception as e:
+            if attempt < retries and _is_retryable(e):
+                logger.warning(f"LLM request failed ({e}), retrying")
+                time.sleep(_backoff(attempt))
+                continue
+            raise LLMError(str(e)) from e
+
+
+def generate_sync(prompt, model, options=None, format=None, timeout=None, cache=None, **extra):
+    payload = build_payload(prompt, model, False, options, format, **extra)
+    if not should_cache(options, cache):
+        return post_json_sync("/api/generate", payload, timeout=timeout)
+    return cached_call_sync(make_key("/api/generate", payload),
+                            lambda: post_json_sync("/api/generate", payload, timeout=timeout))
+
+
+def embeddings_sync(prompt, model, timeout=None):
+    """Embedding vector for `prompt` from /api/embeddings."""
+    payload = {"model": model, "prompt": prompt, "keep_alive": warmup.KEEP_ALIVE}
+    data = post_json_sync("/api/embeddings", payload, timeout=timeout)
+    return data.get("embedding") or []
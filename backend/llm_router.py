@@ -0,0 +1,175 @@
+# llm_router.py
+"""
+Routes LLM requests across a pool of Ollama instances.
+
+- OLLAMA_URLS (comma separated) lists the inference nodes; OLLAMA_URL is
+  used when it is not set, so a single local instance needs no config.
+- Each request goes to the healthy node with the fewest requests in flight
+  (ties rotate), preferring nodes that report the requested model.
+- A node is ejected for LLM_EJECT_SECONDS after LLM_EJECT_AFTER consecutive
+  failures (requests or health checks). A background thread polls
+  /api/tags every LLM_HEALTH_INTERVAL seconds to re-admit nodes and learn
+  which models they serve. If every node is ejected, requests still go to
+  the one that has been out the longest rather than failing outright.
+- Each route picks its model from LLM_MODEL_<ROUTE>, e.g. a small fast model
+  for chat turns and a larger one for reports.
+
+Capacity scales by adding nodes to OLLAMA_URLS.
+"""
+import itertools
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import httpx
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+OLLAMA_URLS = [u.strip().rstrip("/") for u in os.getenv("OLLAMA_URLS", os.getenv("OLLAMA_URL", "http://127.0.0.1:11434")).split(",") if u.strip()]
+HEALTH_INTERVAL = float(os.getenv("LLM_HEALTH_INTERVAL", "10"))
+HEALTH_TIMEOUT = float(os.getenv("LLM_HEALTH_TIMEOUT", "2"))
+EJECT_AFTER = int(os.getenv("LLM_EJECT_AFTER", "3"))
+EJECT_SECONDS = float(os.getenv("LLM_EJECT_SECONDS", "30"))
+
+# Model per route; defaults keep the models each service used before
+ROUTE_MODELS = {
+    "chat": os.getenv("LLM_MODEL_CHAT", "mistral"),
+    "code_analysis": os.getenv("LLM_MODEL_CODE", os.getenv("LLM_MODEL_CHAT", "mistral")),
+    "report": os.getenv("LLM_MODEL_REPORT", "mistral"),
+    "summary": os.getenv("LLM_MODEL_SUMMARY", os.getenv("LLM_MODEL_CHAT", "mistral")),
+    "resume": os.getenv("LLM_MODEL_RESUME", "llama3"),
+    "embed": os.getenv("LLM_MODEL_EMBED", "nomic-embed-text"),
+}
+
+
+def model_for(route: str) -> str:
+    return ROUTE_MODELS.get(route, ROUTE_MODELS["chat"])
+
+
+def _model_names(name):
+    """'llama3' and 'llama3:latest' name the same model."""
+    return {name, name[:-len(":latest")]} if name.endswith(":latest") else {name, f"{name}:latest"}
+
+
+class Backend:
+    def __init__(self, url: str):
+        self.url = url
+        self.outstanding = 0
+        self.failures = 0
+        self.ejected_until = 0.0
+        self.models = None          # None = not known yet (serves anything)
+        self.served = 0
+
+    @property
+    def healthy(self) -> bool:
+        return self.ejected_until <= time.monotonic()
+
+    def serves(self, model) -> bool:
+        return model is None or self.models is None or model in self.models
+
+    def snapshot(self) -> dict:
+        return {"url": self.url, "healthy": self.healthy, "outstanding": self.outstanding,
+                "failures": self.failures, "served": self.served,
+                "models": sorted(self.models) if self.models is not None else None}
+
+
+class Router:
+    def __init__(self, urls):
+        self.backends = [Backend(u) for u in urls]
+        self._lock = threading.Lock()
+        self._rotation = itertools.count()
+        self._monitor = None
+
+    # ---------- selection ----------
+    def pick(self, model=None) -> Backend:
+        self._ensure_monitor()
+        with self._lock:
+            candidates = [b for b in self.backends if b.healthy] or \
+                [min(self.backends, key=lambda b: b.ejected_until)]
+            with_model = [b for b in candidates if b.serves(model)]
+            candidates = with_model or candidates
+            least = min(b.outstanding for b in candidates)
+            tied = [b for b in candidates if b.outstanding == least]
+            backend = tied[next(self._rotation) % len(tied)]
+            backend.outstanding += 1
+            backend.served += 1
+            return backend
+
+    def release(self, backend: Backend):
+        with self._lock:
+            backend.outstanding -= 1
+
+    @contextmanager
+    def use(self, model=None):
+        """Picks a node and keeps it counted as busy for the duration."""
+        backend = self.pick(model)
+        try:
+            yield backend
+        finally:
+            self.release(backend)
+
+    # ---------- health ----------
+    def mark_ok(self, backend: Backend):
+        with self._lock:
+            backend.failures = 0
+            backend.ejected_until = 0.0
+
+    def mark_failed(self, backend: Backend, reason=""):
+        with self._lock:
+            backend.failures += 1
+            if backend.failures >= EJECT_AFTER and backend.healthy:
+                backend.ejected_until = time.monotonic() + EJECT_SECONDS
+                logger.warning(f"Ejecting LLM node {backend.url} for {EJECT_SECONDS:g}s: {reason}")
+
+    def check(self, backend: Backend):
+        """Active health check: GET /api/tags (also learns the node's models)."""
+        try:
+            res = httpx.get(f"{backend.url}/api/tags", timeout=HEALTH_TIMEOUT)
+            res.raise_for_status()
+            names = set()
+            for m in res.json().get("models", []):
+                names |= _model_names(m.get("name", ""))
+            backend.models = names
+            if not backend.healthy:
+                logger.info(f"LLM node {backend.url} is healthy again")
+            self.mark_ok(backend)
+        except Exception as e:
+            self.mark_failed(backend, f"health check failed ({e})")
+
+    def check_all(self):
+        for backend in self.backends:
+            self.check(backend)
+
+    def _run_monitor(self):
+        while True:
+            self.check_all()
+            time.sleep(HEALTH_INTERVAL)
+
+    def _ensure_monitor(self):
+        # Routing decisions only matter with more than one node
+        if self._monitor is not None or len(self.backends) < 2 or HEALTH_INTERVAL <= 0:
+            return
+        with self._lock:
+            if self._monitor is None:
+                self._monitor = threading.Thread(target=self._run_monitor, name="llm-health", daemon=True)
+                self._monitor.start()
+
+    def status(self) -> list:
+        with self._lock:
+            return [b.snapshot() for b in self.backends]
+
+
+router = Router(OLLAMA_URLS)
+
+
+def _node_values(field):
+    return lambda: [({"node": b["url"]}, int(b[field])) for b in router.status()]
+
+
+metrics.collector("llm_node_healthy", "1 if the Ollama node is in rotation.", "gauge", _node_values("healthy"))
+metrics.collector("llm_node_outstanding", "Requests in flight per Ollama node.", "gauge", _node_values("outstanding"))
+metrics.collector("llm_node_served_total", "Requests routed to each Ollama node.", "counter", _node_values("served"))
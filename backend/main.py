@@ -1,13 +1,32 @@
 import json
-import os
-import re
+import time
+import asyncio
 import logging
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from contextlib import aclosing, asynccontextmanager
+from typing import Optional
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
 from fastapi.middleware.cors import CORSMiddleware
 
-from ollama_client import ask_ollama
-from prompt_router import build_prompt
+import admission
+import batch_jobs
+import llm_client
+import metrics
+import static_files
+import storage
+import warmup
+from admission import DeadlineExceeded, Overloaded
+from llm_client import cancel_on_disconnect
+from digests import condense_async
+from ollama_client import NUM_CTX, ask_ollama, stream_ollama, summarize_ollama
+from llm_router import model_for
+from structured_output import REPORT_SCHEMA, JsonObjectScanner, parse_or_repair
+from interview_sessions import sessions, format_turns
+from resume_api import HISTORY_FILE, router as resume_router
+from prompt_router import build_messages, system_prompt
+from speculation import SPECULATE_ENABLED, speculator
 
 # --------------------------------------------------
 # LOGGING
@@ -15,10 +34,34 @@ from prompt_router import build_prompt
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# --------------------------------------------------
+# FILES
+# --------------------------------------------------
+STATS_FILE = "interview_stats.json"
+
+# --------------------------------------------------
+# STARTUP / SHUTDOWN
+# --------------------------------------------------
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One-time import of the legacy JSON stats and resume history into SQLite
+    await run_in_threadpool(storage.migrate_interview_stats, STATS_FILE)
+    await run_in_threadpool(storage.migrate_resume_history, HISTORY_FILE)
+    # Heartbeats running jobs and resumes ones left unfinished by a restart
+    batch_jobs.start_background()
+    # Built by build_assets.py (serve.py runs it); read once so assets are served from memory
+    await run_in_threadpool(static_files.load)
+    # Loads the configured models in the background; /health is 503 until they are resident
+    warmup.start()
+    yield
+    await warmup.stop()
+    await llm_client.aclose()
+
 # --------------------------------------------------
 # FASTAPI APP (🚨 NO root_path HERE 🚨)
 # --------------------------------------------------
 app = FastAPI(
+    lifespan=lifespan,
     title="Mockify API",
     docs_url="/docs",
     openapi_url="/openapi.json",
@@ -34,32 +77,54 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After", "Server-Timing"],
 )
 
 # --------------------------------------------------
-# FILES
+# TIMING (Server-Timing header + /metrics histograms)
 # --------------------------------------------------
-STATS_FILE = "interview_stats.json"
+@app.middleware("http")
+async def server_timing(request: Request, call_next):
+    token = metrics.begin_request()
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+    except BaseException:
+        metrics.end_request(token)
+        raise
+    # Streaming responses: only spans finished before the headers are included
+    total = time.perf_counter() - started
+    route = request.scope.get("route")
+    metrics.observe("http_request", total, method=request.method,
+                    route=route.path if route else "unmatched", status=response.status_code)
+    header = metrics.end_request(token, total)
+    if header:
+        response.headers["Server-Timing"] = header
+    return response
 
 # --------------------------------------------------
-# UTILS
+# ADMISSION CONTROL (429 / 503 + Retry-After)
 # --------------------------------------------------
-def load_stats():
-    if not os.path.exists(STATS_FILE):
-        return {"total_interviews": 0, "average_score": 0, "history": []}
-    try:
-        with open(STATS_FILE, "r") as f:
-            return json.load(f)
-    except Exception as e:
-        logger.error(f"Failed to load stats: {e}")
-        return {"total_interviews": 0, "average_score": 0, "history": []}
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded):
+    return JSONResponse(status_code=429, content={"detail": str(exc), "error": str(exc), "retry_after": exc.retry_after},
+                        headers={"Retry-After": str(exc.retry_after)})
 
-def save_stats(stats):
+@app.exception_handler(DeadlineExceeded)
+async def deadline_handler(request: Request, exc: DeadlineExceeded):
+    return JSONResponse(status_code=503, content={"detail": str(exc), "error": str(exc), "retry_after": exc.retry_after},
+                        headers={"Retry-After": str(exc.retry_after)})
+
+def request_timeout(request: Request, priority: int):
+    """Deadline budget: the client's X-Request-Timeout (seconds), capped by the server default."""
+    default = admission.DEADLINES[priority] or None
     try:
-        with open(STATS_FILE, "w") as f:
-            json.dump(stats, f, indent=2)
-    except Exception as e:
-        logger.error(f"Failed to save stats: {e}")
+        asked = float(request.headers.get("x-request-timeout", ""))
+    except ValueError:
+        return default
+    if asked <= 0:
+        return default
+    return min(asked, default) if default else asked
 
 # --------------------------------------------------
 # MODELS
@@ -67,107 +132,332 @@ def save_stats(stats):
 class InterviewRequest(BaseModel):
     prompt: str
     type: str
-    context: dict
+    context: dict = {}
+    stream: bool = False
+    session_id: Optional[str] = None
 
 class ReportRequest(BaseModel):
-    transcript: str
-    context: dict
+    transcript: str = ""
+    context: dict = {}
+    stream: bool = False
+    session_id: Optional[str] = None
+
+class StartRequest(BaseModel):
+    context: dict = {}
+
+class InterimRequest(BaseModel):
+    session_id: str = Field(min_length=1)
+    prompt: str = ""
+    type: str = "chat"
+
+# --------------------------------------------------
+# STREAMING (NDJSON)
+# --------------------------------------------------
+FALLBACK_REPLY = "I apologize, I missed that. Could you repeat?"
+
+def ndjson(obj) -> str:
+    return json.dumps(obj) + "\n"
+
+async def speculated_tokens(spec, collected: list):
+    """Same lines as stream_tokens, replayed from a speculative reply."""
+    async for token in spec.follow():
+        collected.append(token)
+        yield ndjson({"token": token})
+
+async def stream_tokens(messages: list, collected: list, meta: dict = None, format=None,
+                        scanner: JsonObjectScanner = None, route: str = "chat"):
+    """
+    Yields {"token": ...} lines while Ollama generates and appends every
+    token to `collected` so the caller can post-process the full reply.
+    With a `scanner`, generation is stopped as soon as the JSON object closes.
+    """
+    async with aclosing(stream_ollama(messages, meta, format, route)) as tokens:
+        async for token in tokens:
+            collected.append(token)
+            yield ndjson({"token": token})
+            if scanner is not None and scanner.feed(token):
+                break
+
+# --------------------------------------------------
+# SESSIONS
+# --------------------------------------------------
+async def get_session(session_id: Optional[str]):
+    if not session_id:
+        return None
+    # Storage reads/writes run in the threadpool, off the event loop
+    session = await run_in_threadpool(sessions.get, session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired session")
+    return session
+
+async def roll_session(session):
+    """Fold older turns into the session summary so the context stays small."""
+    try:
+        text = format_turns(session.turns_to_roll())
+        if session.summary:
+            text = f"{session.summary}\n{text}"
+        session.apply_roll(await summarize_ollama(text))
+        logger.info(f"Session {session.id}: rolled older turns into summary")
+    except Exception as e:
+        logger.warning(f"Session summary failed: {e}")
+
+async def prepare_turn(payload: InterviewRequest, session):
+    """Returns the /api/chat messages for this turn."""
+    if session is not None and payload.type == "chat" and session.needs_roll(NUM_CTX):
+        await roll_session(session)
+
+    with metrics.span("prompt_build", route=payload.type):
+        return turn_messages(payload, session)
+
+def turn_messages(payload: InterviewRequest, session):
+    if session is None:
+        return build_messages(payload.prompt, payload.type, payload.context)
+
+    if payload.type != "chat":
+        return build_messages(payload.prompt, payload.type, session.context)
+
+    # Same memoized system prompt every turn, then the history, then the new
+    # utterance -- Ollama only evaluates what follows the cached prefix
+    return ([{"role": "system", "content": system_prompt("chat", session.context)}]
+            + session.history_messages()
+            + [{"role": "user", "content": payload.prompt}])
+
+def claim_speculation(payload: InterviewRequest, session):
+    """The reply already being generated for this turn from the interim transcript, if it matches."""
+    if session is None:
+        return None
+    return speculator.claim(session, payload.type, payload.prompt)
+
+def cacheable(payload: InterviewRequest, session) -> bool:
+    """Openers and code reviews are replayed from the LLM cache; ongoing conversation turns are not."""
+    if payload.type == "code_analysis":
+        return True
+    return payload.type == "chat" and session is not None and not session.turns
+
+async def finish_turn(payload: InterviewRequest, session, reply: str, meta: dict):
+    if session is None or "tokens" not in meta:
+        return
+    session.add_turn("User", payload.prompt)
+    session.add_turn("AI", reply)
+    # Non-chat turns (e.g. code analysis) ran on a separate prompt, so their
+    # token count says nothing about the chat history
+    session.tokens = meta["tokens"] if payload.type == "chat" else None
+    # Written through so any worker can serve the next turn
+    await run_in_threadpool(sessions.save, session)
 
 # --------------------------------------------------
 # ROUTES
 # --------------------------------------------------
+# Resume analyzer: /analyze, /analyze_batch, /history, /clear_history, /jobs
+app.include_router(resume_router)
+# Frontend pages and assets: /app/... (and / -> /app/index.html)
+app.include_router(static_files.router)
+
 @app.get("/stats")
-def get_stats():
-    return load_stats()
+async def get_stats(limit: int = Query(20, ge=1, le=200), offset: int = Query(0, ge=0)):
+    return await run_in_threadpool(storage.get_interview_stats, limit, offset)
 
 @app.post("/interview/ask")
-def ask_interview(payload: InterviewRequest):
+async def ask_interview(payload: InterviewRequest, request: Request):
+    session = await get_session(payload.session_id)
+
+    timeout = request_timeout(request, admission.INTERACTIVE)
+
+    # Streaming mode: pass tokens through as they arrive
+    if payload.stream:
+        # Reject up front while a proper 429 can still be sent
+        admission.controller.check(admission.INTERACTIVE)
+        return StreamingResponse(ask_stream(payload, session, timeout), media_type="application/x-ndjson")
+
     try:
-        # 1. Build the system prompt using your existing router
-        # This injects the "interviewer" persona so Llama knows how to behave
-        final_prompt = build_prompt(payload.prompt, payload.type, payload.context)
-        
-        # 2. Send to Ollama (Llama 3.1)
-        ai_reply = ask_ollama(final_prompt)
+        async with session.lock if session else asyncio.Lock():
+            spec = claim_speculation(payload, session)
+            if spec is not None:
+                # Started while the candidate was still speaking
+                meta = spec.meta
+                ai_reply = await cancel_on_disconnect(request, spec.reply())
+            else:
+                # 1. Build the system prompt using your existing router
+                # This injects the "interviewer" persona so Llama knows how to behave
+                messages = await prepare_turn(payload, session)
+
+                # 2. Send to Ollama (Llama 3.1), ahead of queued batch work
+                meta = {}
+                with admission.using(admission.INTERACTIVE, timeout):
+                    ai_reply = await cancel_on_disconnect(request, ask_ollama(messages, meta, cacheable(payload, session), route=payload.type))
+            await finish_turn(payload, session, ai_reply, meta)
         
         # 3. Return only the AI's response
         return {
             "reply": ai_reply
         }
+    except (Overloaded, DeadlineExceeded):
+        raise
     except Exception as e:
         logger.error(f"Error generating response: {e}")
         return {
-            "reply": "I apologize, I missed that. Could you repeat?"
+            "reply": FALLBACK_REPLY
         }
 
+async def ask_stream(payload: InterviewRequest, session, timeout=None):
+    collected = []
+    async with session.lock if session else asyncio.Lock():
+        try:
+            spec = claim_speculation(payload, session)
+            if spec is not None:
+                meta = spec.meta
+                async for line in speculated_tokens(spec, collected):
+                    yield line
+            else:
+                with admission.using(admission.INTERACTIVE, timeout):
+                    messages = await prepare_turn(payload, session)
+                    meta = {}
+                    async for line in stream_tokens(messages, collected, meta, route=payload.type):
+                        yield line
+            reply = "".join(collected).strip()
+            await finish_turn(payload, session, reply, meta)
+            yield ndjson({"done": True, "reply": reply})
+        except (Overloaded, DeadlineExceeded) as e:
+            logger.warning(f"Interview turn not admitted: {e}")
+            yield ndjson({"done": True, "reply": FALLBACK_REPLY, "error": str(e), "retry_after": e.retry_after})
+        except Exception as e:
+            logger.error(f"Error streaming response: {e}")
+            reply = "".join(collected).strip() or FALLBACK_REPLY
+            yield ndjson({"done": True, "reply": reply, "error": str(e)})
+
+
+@app.post("/interview/interim")
+async def interim_transcript(payload: InterimRequest):
+    """
+    Partial speech transcript of the turn in progress. May start generating
+    the reply ahead of /interview/ask (speculation.py); an empty prompt
+    cancels the running speculation.
+    """
+    session = await get_session(payload.session_id)
+    if not payload.prompt.strip():
+        speculator.discard(session.id)
+        return {"status": "cancelled"}
+    # Not while a turn is running or the history is about to be rolled up:
+    # the session the reply depends on is about to change
+    if not SPECULATE_ENABLED or payload.type != "chat" or session.lock.locked() or session.needs_roll(NUM_CTX):
+        return {"status": "skipped"}
+    # Runs only on a free LLM slot and gives it up when a real turn waits (admission.SPECULATIVE)
+    turn = InterviewRequest(prompt=payload.prompt, type=payload.type, session_id=session.id)
+    status = speculator.offer(session, payload.prompt, payload.type, lambda: turn_messages(turn, session))
+    return {"status": status}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
 
 @app.get("/health")
-def health():
-    return {"status": "ok"}
+async def health():
+    """200 once every pinned model is resident on a healthy Ollama node, 503 before."""
+    state = await warmup.readiness()
+    return JSONResponse(status_code=200 if state["status"] == "ok" else 503, content=state)
 
 @app.post("/interview/start")
-def start_interview():
+async def start_interview(payload: Optional[StartRequest] = None):
+    session = await run_in_threadpool(sessions.create, payload.context if payload else {})
     return {
+        "session_id": session.id,
         "question": "Tell me about yourself."
     }
 
 
 
+async def parse_analysis(analysis_raw: str) -> dict:
+    analysis_data = {
+        "score": 0,
+        "verdict": "Better Luck Next Time",
+        "summary": "Unable to parse AI response.",
+        "strengths": ["None observed"],
+        "weaknesses": ["Parsing failed"],
+        "improvement_plan": ["Retry interview"],
+        "code_feedback": "N/A"
+    }
+
+    # ---------- JSON EXTRACTION (one repair call if malformed) ----------
+    if analysis_raw.startswith("Ollama Error"):
+        logger.warning(analysis_raw)
+        return analysis_data
+    try:
+        analysis_data.update(await parse_or_repair(analysis_raw, REPORT_SCHEMA, model_for("report")))
+    except Exception as e:
+        logger.warning(f"JSON parsing failed: {e}")
+
+    return analysis_data
+
+def record_interview(context: dict, analysis_data: dict):
+    # ---------- UPDATE STATS ----------
+    try:
+        storage.record_interview(
+            context.get("company", "Unknown"),
+            context.get("role", "Unknown"),
+            context.get("round", "General"),
+            analysis_data.get("score", 0),
+            analysis_data.get("verdict", "N/A"),
+        )
+    except Exception as e:
+        logger.error(f"Stats update failed: {e}")
+
 @app.post("/interview/analyze")
-def interview_analyze(req: ReportRequest):
+async def interview_analyze(req: ReportRequest, request: Request):
     try:
         logger.info("Generating analysis report...")
 
-        final_prompt = build_prompt(req.transcript, "report", req.context)
-        analysis_raw = ask_ollama(final_prompt)
-
-        analysis_data = {
-            "score": 0,
-            "verdict": "Better Luck Next Time",
-            "summary": "Unable to parse AI response.",
-            "strengths": ["None observed"],
-            "weaknesses": ["Parsing failed"],
-            "improvement_plan": ["Retry interview"],
-            "code_feedback": "N/A"
-        }
+        # Session interviews can rely on the server-side transcript and context
+        session = await run_in_threadpool(sessions.get, req.session_id) if req.session_id else None
+        context = req.context or (session.context if session else {})
+        transcript = req.transcript or (session.transcript() if session else "")
+        timeout = request_timeout(request, admission.REPORT)
 
-        # ---------- JSON EXTRACTION ----------
-        try:
-            start = analysis_raw.find("{")
-            end = analysis_raw.rfind("}")
-            if start != -1 and end != -1:
-                parsed = json.loads(analysis_raw[start:end+1])
-                analysis_data.update(parsed)
-        except Exception as e:
-            logger.warning(f"JSON parsing failed: {e}")
+        if req.stream:
+            admission.controller.check(admission.REPORT)
+            return StreamingResponse(analyze_stream(transcript, context, timeout), media_type="application/x-ndjson")
 
-        # ---------- UPDATE STATS ----------
-        try:
-            stats = load_stats()
-            stats["total_interviews"] += 1
-
-            new_score = analysis_data.get("score", 0)
-            prev_avg = stats.get("average_score", 0)
-            count = stats["total_interviews"]
-
-            stats["average_score"] = int(((prev_avg * (count - 1)) + new_score) / count)
-
-            stats["history"].append({
-                "company": req.context.get("company", "Unknown"),
-                "role": req.context.get("role", "Unknown"),
-                "round": req.context.get("round", "General"),
-                "score": new_score,
-                "verdict": analysis_data.get("verdict", "N/A"),
-                "date": "Today"
-            })
-
-            stats["history"] = stats["history"][-20:]
-            save_stats(stats)
-        except Exception as e:
-            logger.error(f"Stats update failed: {e}")
+        with admission.using(admission.REPORT, timeout):
+            messages = await report_messages(transcript, context)
+            analysis_raw = await cancel_on_disconnect(request, ask_ollama(messages, format=REPORT_SCHEMA, route="report"))
+            analysis_data = await parse_analysis(analysis_raw)
+        await run_in_threadpool(record_interview, context, analysis_data)
 
         return {"analysis": analysis_data}
 
+    except (Overloaded, DeadlineExceeded):
+        raise
     except Exception as e:
         logger.error(f"/interview/analyze error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+async def report_messages(transcript: str, context: dict) -> list:
+    # Long interviews are condensed chunk by chunk first; chunk notes are
+    # cached, so a later report on the same session only digests new turns
+    transcript = await condense_async(transcript, "transcript")
+    with metrics.span("prompt_build", route="report"):
+        return build_messages(transcript, "report", context)
+
+async def analyze_stream(transcript: str, context: dict, timeout=None):
+    collected = []
+    error = None
+    with admission.using(admission.REPORT, timeout):
+        try:
+            messages = await report_messages(transcript, context)
+            async for line in stream_tokens(messages, collected, format=REPORT_SCHEMA, scanner=JsonObjectScanner(), route="report"):
+                yield line
+        except (Overloaded, DeadlineExceeded) as e:
+            # Not admitted: nothing was generated, so nothing is recorded
+            logger.warning(f"Report not admitted: {e}")
+            yield ndjson({"done": True, "error": str(e), "retry_after": e.retry_after})
+            return
+        except Exception as e:
+            logger.error(f"/interview/analyze stream error: {e}")
+            error = str(e)
+
+        analysis_data = await parse_analysis("".join(collected))
+    await run_in_threadpool(record_interview, context, analysis_data)
+
+    final = {"done": True, "analysis": analysis_data}
+    if error:
+        final["error"] = error
+    yield ndjson(final)
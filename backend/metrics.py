@@ -0,0 +1,189 @@
+# metrics.py
+"""
+Latency instrumentation shared by both backends.
+
+- `span(name, **labels)` times a block into a Prometheus histogram; `record`
+  does the same for a duration measured elsewhere. Inside an instrumented
+  request the time also goes into that response's Server-Timing header.
+- `observe(name, value, **labels)` records a non-latency value (tokens/s).
+- `collector(...)` exposes live state (queues, cache, nodes) computed at
+  scrape time.
+- `render()` is the Prometheus text format served on /metrics.
+
+Everything lives in-process (one set of series per worker); no client
+library is needed. SERVER_TIMING=0 turns the response header off.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+SERVER_TIMING = os.getenv("SERVER_TIMING", "1") != "0"
+
+PREFIX = "mockify_"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+RATE_BUCKETS = (1, 2.5, 5, 10, 15, 20, 30, 50, 75, 100, 200)
+
+_timings = ContextVar("server_timings", default=None)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names, values, extra=""):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = PREFIX + name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}       # label values -> [count per bucket..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((k, list(v)) for k, v in self._series.items())
+        for key, values in series:
+            for bound, count in zip(self.buckets, values):
+                le = 'le="%g"' % bound
+                lines.append(f"{self.name}_bucket{_label_text(self.labels, key, le)} {count}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_label_text(self.labels, key, le)} {values[-1]}")
+            lines.append(f"{self.name}_sum{_label_text(self.labels, key)} {values[-2]!r}")
+            lines.append(f"{self.name}_count{_label_text(self.labels, key)} {values[-1]}")
+        return lines
+
+
+class Collector:
+    """Gauge/counter family read from `collect()` -> [(labels dict, value)] at scrape time."""
+
+    def __init__(self, name, help, type, collect):
+        self.name = PREFIX + name
+        self.help = help
+        self.type = type
+        self.collect = collect
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        for labels, value in self.collect():
+            lines.append(f"{self.name}{_label_text(labels.keys(), labels.values())} {_number(value)}")
+        return lines
+
+
+HISTOGRAMS = {
+    "http_request": Histogram("http_request_seconds", "Time to response headers per route.", ("method", "route", "status")),
+    "prompt_build": Histogram("prompt_build_seconds", "Building the prompt/messages for an LLM call.", ("route",), FAST_BUCKETS),
+    "llm_queue": Histogram("llm_queue_wait_seconds", "Wait for an admission slot before calling the LLM.", ("priority",)),
+    "llm_ttft": Histogram("llm_time_to_first_token_seconds", "Request start to first streamed token.", ("model",)),
+    "llm_generation": Histogram("llm_generation_seconds", "Full LLM call, request to last token.", ("model", "endpoint")),
+    "llm_tokens_per_second": Histogram("llm_tokens_per_second", "Decode speed reported by Ollama (eval_count / eval_duration).", ("model",), RATE_BUCKETS),
+    "speculation": Histogram("speculation_head_start_seconds", "Age of a speculative interview reply when its turn claimed or dropped it.", ("outcome",)),
+    "digest": Histogram("digest_seconds", "Map-reduce condensing of a long resume or transcript.", ("kind",)),
+    "extract": Histogram("document_extract_seconds", "Resume text extraction per engine.", ("engine",)),
+    "json_parse": Histogram("json_parse_seconds", "Parsing/validating structured LLM output.", ("outcome",), FAST_BUCKETS),
+    "json_repair": Histogram("json_repair_seconds", "Repair call for malformed LLM JSON.", ("outcome",)),
+    "db_write": Histogram("db_write_seconds", "SQLite write per operation.", ("op",), FAST_BUCKETS),
+}
+
+_collectors = []
+
+
+def collector(name, help, type, collect):
+    _collectors.append(Collector(name, help, type, collect))
+
+
+def observe(name, value, **labels):
+    HISTOGRAMS[name].observe(value, **labels)
+
+
+def record(name, seconds, **labels):
+    """Observes a duration and adds it to the current request's Server-Timing."""
+    HISTOGRAMS[name].observe(seconds, **labels)
+    timings = _timings.get()
+    if timings is not None:
+        timings.append((name, seconds))
+
+
+@contextmanager
+def span(name, **labels):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - started, **labels)
+
+
+def timed(name, label="op"):
+    """Decorator: span(name) around the function, labelled with its name."""
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name, **{label: fn.__name__}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# --------------------------------------------------
+# PER-REQUEST SERVER-TIMING
+# --------------------------------------------------
+def begin_request():
+    """Starts collecting spans for the current request; returns the reset token."""
+    return _timings.set([])
+
+
+def end_request(token, total=None):
+    """Stops collecting; returns the Server-Timing header value ('' if disabled/empty)."""
+    timings = _timings.get() or []
+    _timings.reset(token)
+    if not SERVER_TIMING:
+        return ""
+    merged = {}
+    for name, seconds in timings:
+        merged[name] = merged.get(name, 0.0) + seconds
+    parts = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in merged.items()]
+    if total is not None:
+        parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+def render() -> str:
+    lines = []
+    for histogram in HISTOGRAMS.values():
+        lines.extend(histogram.render())
+    for family in _collectors:
+        try:
+            lines.extend(family.render())
+        except Exception:
+            continue
+    return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
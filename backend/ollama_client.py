@@ -1,24 +1,76 @@
-import requests
-
-OLLAMA_URL = "http://127.0.0.1:11434/api/generate"
-MODEL_NAME = "mistral"
-
-def ask_ollama(prompt: str) -> str:
-    payload = {
-        "model": MODEL_NAME,
-        "prompt": prompt,
-        "stream": False,
-        "options": {
-            "temperature": 0.7,
-            "num_ctx": 4096
-        }
-    }
+import prompt_budget
+from llm_client import chat, generate, stream_chat
+from llm_router import model_for
+from admission import DeadlineExceeded, Overloaded
 
+# Default (chat) model; each call picks its route's model via llm_router
+MODEL_NAME = model_for("chat")
+# Session context target: older turns are rolled into a summary past
+# SESSION_ROLL_RATIO of it. Each request's own num_ctx is sized by prompt_budget.
+NUM_CTX = 4096
+OPTIONS = {
+    "temperature": 0.7,
+}
+
+SUMMARY_PROMPT = """Summarize the interview below in at most 8 short bullet points.
+Keep the questions already asked, the candidate's key answers, any tech stack
+they mentioned and whether they are a fresher or experienced.
+
+{text}
+"""
+
+
+def sized_request(messages: list, route: str):
+    """(messages trimmed to the token budget, options with a fitted num_ctx)."""
+    model = model_for(route)
+    messages, num_ctx = prompt_budget.fit_messages(messages, model, prompt_budget.REPLY_TOKENS.get(route, 512))
+    return model, messages, {**OPTIONS, "num_ctx": num_ctx}
+
+
+def context_used(data: dict) -> int:
+    """Tokens the conversation occupies in the model's context after this reply."""
+    return (data.get("prompt_eval_count") or 0) + (data.get("eval_count") or 0)
+
+
+async def ask_ollama(messages: list, meta: dict = None, cache: bool = None, format=None, route: str = "chat") -> str:
+    """
+    `messages` are /api/chat messages starting with the (stable) system prompt,
+    so Ollama can reuse the cached prefix. Token usage is written to `meta`.
+    `cache=True` serves repeats from the LLM response cache; `format` is a
+    JSON schema (or "json") for structured replies. `route` selects the
+    model (chat, code_analysis, report).
+    """
     try:
-        res = requests.post(OLLAMA_URL, json=payload, timeout=180)
-        res.raise_for_status()
-        data = res.json()
-        return data.get("response", "").strip()
+        model, messages, options = sized_request(messages, route)
+        data = await chat(messages, model, options=options, format=format, timeout=180, cache=cache)
+        if meta is not None:
+            meta["tokens"] = context_used(data)
+        return data.get("message", {}).get("content", "").strip()
 
+    except (Overloaded, DeadlineExceeded):
+        # Not an LLM failure -- let the route answer 429/503
+        raise
     except Exception as e:
         return f"Ollama Error: {str(e)}"
+
+
+async def stream_ollama(messages: list, meta: dict = None, format=None, route: str = "chat"):
+    """
+    Yields response tokens as Ollama generates them.
+    Raises on connection/HTTP errors so the caller can report them.
+    """
+    model, messages, options = sized_request(messages, route)
+    async for chunk in stream_chat(messages, model, options=options, format=format, timeout=180):
+        token = chunk.get("message", {}).get("content", "")
+        if token:
+            yield token
+        if chunk.get("done") and meta is not None:
+            meta["tokens"] = context_used(chunk)
+
+
+async def summarize_ollama(text: str) -> str:
+    model = model_for("summary")
+    reply = prompt_budget.REPLY_TOKENS["summary"]
+    prompt = SUMMARY_PROMPT.format(text=prompt_budget.fit_text(SUMMARY_PROMPT, text, model, reply))
+    data = await generate(prompt, model, options=prompt_budget.options_for(model, prompt, reply, {"temperature": 0.2}), timeout=180)
+    return data.get("response", "").strip()
@@ -0,0 +1,172 @@
+# prefilter.py
+"""
+Deterministic first stage for batch ranking.
+
+Builds a small keyword index from each resume's text and checks it against
+the HR filters (role, main_language, candidate_type, exp_years) using the
+same hard rules the LLM prompt encodes:
+
+- wrong role            -> rejected (score 0), never sent to the LLM; a
+                           resume needs ROLE_MIN_HITS distinct role keywords
+                           (whole terms) or the role's own name
+- missing main language -> capped at 40
+
+The remaining resumes are ranked by a local relevance score and only the
+top `k` plus a margin go to the LLM.
+"""
+import math
+import os
+import re
+
+PREFILTER_MARGIN_RATIO = float(os.getenv("PREFILTER_MARGIN_RATIO", "0.5"))
+PREFILTER_MIN_MARGIN = int(os.getenv("PREFILTER_MIN_MARGIN", "5"))
+ROLE_MIN_HITS = int(os.getenv("PREFILTER_ROLE_MIN_HITS", "2"))
+LANGUAGE_CAP = 40
+
+# Specific skills and phrases only: generic words (model, lead, client,
+# product) and one- or two-letter tokens (r, go, ai, ml) match almost any
+# resume and would keep the wrong-role reject from ever firing
+ROLE_KEYWORDS = {
+    "Software Engineer": [
+        "software engineer", "software developer", "programming", "algorithms", "data structures",
+        "git", "api", "backend", "frontend", "java", "python", "c++", "javascript", "sql",
+        "unit testing", "debugging", "oop", "microservices",
+    ],
+    "Backend Engineer": [
+        "backend", "back-end", "api", "rest", "microservices", "database", "sql", "postgresql",
+        "mysql", "mongodb", "redis", "spring", "django", "flask", "node.js", "express",
+        "docker", "kubernetes", "java", "golang", "python",
+    ],
+    "Data Scientist": [
+        "data science", "data scientist", "statistics", "machine learning", "pandas", "numpy",
+        "scikit-learn", "regression", "classification", "sql", "tableau", "power bi",
+        "data visualization", "python", "rstudio", "analytics", "hypothesis testing",
+    ],
+    "AI/ML Engineer": [
+        "machine learning", "deep learning", "artificial intelligence", "neural networks",
+        "tensorflow", "pytorch", "keras", "nlp", "computer vision", "llm", "transformers",
+        "model training", "scikit-learn", "python", "data-science", "mlops",
+    ],
+    "Product Manager": [
+        "product manager", "product management", "roadmap", "stakeholder management",
+        "requirements gathering", "user research", "agile", "scrum", "jira", "kpi",
+        "product launch", "go-to-market", "prioritization", "product strategy",
+    ],
+    "Frontend Developer": [
+        "frontend", "front-end", "html", "css", "javascript", "typescript", "react", "angular",
+        "vue", "next.js", "tailwind", "ui/ux", "responsive design", "webpack", "redux",
+    ],
+    "Sales Associate": [
+        "sales", "crm", "sales targets", "quota", "negotiation", "lead generation", "retail",
+        "client relationship", "account management", "business development", "cold calling",
+    ],
+}
+
+PROJECT_KEYWORDS = ["project", "projects", "hackathon", "internship", "intern", "capstone", "github"]
+TECH_TERMS = sorted({k for words in ROLE_KEYWORDS.values() for k in words})
+
+_YEARS_RE = re.compile(r"(\d{1,2}(?:\.\d)?)\s*\+?\s*(?:years|yrs|year)")
+
+
+def normalize(text):
+    return " " + re.sub(r"\s+", " ", (text or "").lower()) + " "
+
+
+def has_term(norm_text, term):
+    """Whole-term match that also works for terms like c++, c#, node.js."""
+    pattern = r"(?<![a-z0-9+#])" + re.escape(term.lower()) + r"(?![a-z0-9+#])"
+    return re.search(pattern, norm_text) is not None
+
+
+def count_terms(norm_text, terms):
+    return sum(1 for t in terms if has_term(norm_text, t))
+
+
+def parse_years(value):
+    """'4-5' -> 4.0, '3+' -> 3.0, '' -> 0.0"""
+    match = re.search(r"\d+(?:\.\d+)?", str(value or ""))
+    return float(match.group()) if match else 0.0
+
+
+def role_keywords(role):
+    if role in ROLE_KEYWORDS:
+        return ROLE_KEYWORDS[role]
+    # Unknown role -> use its own words
+    return [w for w in re.split(r"[\s/,-]+", (role or "").lower()) if len(w) > 1]
+
+
+def language_given(main_lang):
+    return bool(main_lang) and main_lang.strip() != '' and main_lang.lower() != 'none'
+
+
+def assess(text, role, main_lang, candidate_type, prefers_projects, exp_years):
+    """
+    Returns {"score": 0-100 estimate, "reject": bool, "cap": int or None, "reasons": [...]}.
+    """
+    norm = normalize(text)
+    reasons = []
+    score = 0.0
+    cap = None
+
+    # 1. Role (0-40). Fewer than ROLE_MIN_HITS role keywords -> wrong role.
+    if role and role != 'Any':
+        keywords = role_keywords(role)
+        hits = count_terms(norm, keywords)
+        if hits < min(ROLE_MIN_HITS, len(keywords)) and not has_term(norm, role):
+            return {"score": 0, "reject": True, "cap": 0,
+                    "reasons": [f"{hits} {role} keywords found (wrong role)"]}
+        score += 40 * min(hits, 8) / 8
+        reasons.append(f"{hits} {role} keywords")
+    else:
+        score += 20
+
+    # 2. Main language (0-30). Missing -> capped like the LLM rule.
+    if language_given(main_lang):
+        langs = [l.strip() for l in re.split(r"[,/]", main_lang) if l.strip()]
+        if any(has_term(norm, l) for l in langs):
+            score += 30
+            reasons.append(f"mentions {main_lang}")
+        else:
+            cap = LANGUAGE_CAP
+            reasons.append(f"{main_lang} not found")
+    else:
+        score += 15
+
+    # 3. Candidate type (0-20)
+    if candidate_type == 'fresher':
+        projects = count_terms(norm, PROJECT_KEYWORDS)
+        score += 5 * min(projects, 4)
+        if prefers_projects == 'yes' and projects == 0:
+            reasons.append("no projects listed")
+    elif candidate_type == 'professional':
+        required = parse_years(exp_years)
+        found = max((float(y) for y in _YEARS_RE.findall(norm)), default=0.0)
+        if required <= 0 or found >= required:
+            score += 20
+        elif found > 0:
+            score += 20 * found / required
+            reasons.append(f"~{found:g} of {required:g} years")
+        else:
+            score += 5
+            reasons.append("experience not stated")
+    else:
+        score += 10
+
+    # 4. General technical depth (0-10)
+    score += min(count_terms(norm, TECH_TERMS), 10)
+
+    score = int(round(score))
+    if cap is not None:
+        score = min(score, cap)
+    return {"score": score, "reject": False, "cap": cap, "reasons": reasons}
+
+
+def shortlist(assessments, k):
+    """
+    Indices of the assessments that go to the LLM: the best `k` plus a margin,
+    ranked by (not capped, local score). Rejected entries never qualify.
+    """
+    margin = max(PREFILTER_MIN_MARGIN, math.ceil(k * PREFILTER_MARGIN_RATIO))
+    candidates = [i for i, a in enumerate(assessments) if a and not a["reject"]]
+    candidates.sort(key=lambda i: (assessments[i]["cap"] is None, assessments[i]["score"]), reverse=True)
+    return set(candidates[:k + margin])
@@ -0,0 +1,184 @@
+# prompt_budget.py
+"""
+Token budgets for LLM prompts.
+
+- Token counts come from a per-model calibrated estimator. Every Ollama
+  reply reports `prompt_eval_count`; llm_client feeds it back with the
+  prompt's length (`calibrate`), and the estimate uses a low percentile of
+  the recent characters-per-token ratios. Replies that reused a cached
+  prefix evaluate fewer tokens than the prompt holds, so their ratios are
+  implausibly high and either fall outside the accepted range or land
+  above the percentile that is used.
+- `fit_messages` / `fit_text` trim the lowest-priority content until the
+  prompt plus the reply reservation fits MAX_NUM_CTX. Trimming is
+  deterministic: oldest turns first, then the rolled-up summary, then the
+  tail of the final message (resume tail, pasted code). The system prompt
+  is never trimmed.
+- `options_for` sizes `num_ctx` per request to the smallest step in
+  NUM_CTX_STEPS that holds prompt + reply. Ollama reloads a model when
+  its num_ctx changes, so a model keeps its current size while it is warm
+  (used within NUM_CTX_STICKY_SECONDS) and only grows; it shrinks again
+  after it has been idle.
+"""
+import math
+import os
+import threading
+import time
+from collections import deque
+
+import metrics
+
+DEFAULT_CHARS_PER_TOKEN = float(os.getenv("CHARS_PER_TOKEN", "3.5"))
+MIN_CHARS_PER_TOKEN, MAX_CHARS_PER_TOKEN = 2.0, 6.0
+CALIBRATION_SAMPLES = 64
+CALIBRATION_MIN_SAMPLES = 5
+CALIBRATION_PERCENTILE = 0.25
+CALIBRATION_MIN_CHARS = 200
+MESSAGE_OVERHEAD = 4                 # role/template tokens per chat message
+
+NUM_CTX_STEPS = tuple(sorted(int(s) for s in os.getenv("NUM_CTX_STEPS", "2048,4096,8192").split(",") if s.strip()))
+MAX_NUM_CTX = int(os.getenv("MAX_NUM_CTX", str(NUM_CTX_STEPS[-1])))
+STICKY_SECONDS = float(os.getenv("NUM_CTX_STICKY_SECONDS", "1800"))  # OLLAMA_KEEP_ALIVE (warmup.py)
+
+# Tokens kept free for the reply, per route
+REPLY_TOKENS = {
+    "chat": 512,
+    "code_analysis": 1024,
+    "report": 1024,
+    "summary": 400,
+    "resume": 512,
+}
+
+TRUNCATED = "\n[... truncated]"
+
+
+class Estimator:
+    def __init__(self):
+        self._ratios = {}            # model -> recent chars/token samples
+        self._lock = threading.Lock()
+
+    def calibrate(self, model, chars, tokens):
+        if not tokens or chars < CALIBRATION_MIN_CHARS:
+            return
+        ratio = chars / tokens
+        if not MIN_CHARS_PER_TOKEN <= ratio <= MAX_CHARS_PER_TOKEN:
+            return
+        with self._lock:
+            self._ratios.setdefault(model, deque(maxlen=CALIBRATION_SAMPLES)).append(ratio)
+
+    def chars_per_token(self, model):
+        with self._lock:
+            ratios = sorted(self._ratios.get(model, ()))
+        if len(ratios) < CALIBRATION_MIN_SAMPLES:
+            return DEFAULT_CHARS_PER_TOKEN
+        return ratios[int(len(ratios) * CALIBRATION_PERCENTILE)]
+
+    def snapshot(self):
+        with self._lock:
+            models = list(self._ratios)
+        return [({"model": m}, round(self.chars_per_token(m), 3)) for m in models]
+
+
+class ContextSizer:
+    def __init__(self):
+        self._current = {}           # model -> (num_ctx, last used)
+        self._lock = threading.Lock()
+
+    def _step(self, needed):
+        return min(next((s for s in NUM_CTX_STEPS if s >= needed), MAX_NUM_CTX), MAX_NUM_CTX)
+
+    def size(self, model, needed):
+        step = self._step(needed)
+        now = time.monotonic()
+        with self._lock:
+            current, used = self._current.get(model, (0, 0.0))
+            if now - used < STICKY_SECONDS:
+                step = max(step, current)
+            self._current[model] = (step, now)
+        return step
+
+    def peek(self, model):
+        """num_ctx a small request would get now, without renewing the sticky period."""
+        with self._lock:
+            current, used = self._current.get(model, (0, 0.0))
+        step = self._step(0)
+        return max(step, current) if time.monotonic() - used < STICKY_SECONDS else step
+
+    def snapshot(self):
+        with self._lock:
+            return [({"model": m}, ctx) for m, (ctx, _) in self._current.items()]
+
+
+estimator = Estimator()
+sizer = ContextSizer()
+
+metrics.collector("prompt_chars_per_token", "Calibrated characters per token per model.", "gauge", estimator.snapshot)
+metrics.collector("llm_num_ctx", "num_ctx last requested per model.", "gauge", sizer.snapshot)
+
+
+def calibrate(model, chars, tokens):
+    estimator.calibrate(model, chars, tokens)
+
+
+def count(text, model):
+    return math.ceil(len(text or "") / estimator.chars_per_token(model))
+
+
+def chars_for(tokens, model):
+    """Characters of text that make about `tokens` tokens for `model`."""
+    return int(tokens * estimator.chars_per_token(model))
+
+
+def messages_tokens(messages, model):
+    return sum(count(m.get("content"), model) + MESSAGE_OVERHEAD for m in messages)
+
+
+def truncate(text, max_tokens, model):
+    """Head of `text` within `max_tokens`, cut at a line or word boundary."""
+    if count(text, model) <= max_tokens:
+        return text
+    limit = max(0, chars_for(max_tokens, model) - len(TRUNCATED))
+    head = text[:limit]
+    cut = max(head.rfind("\n"), head.rfind(" "))
+    if cut > limit // 2:
+        head = head[:cut]
+    return head + TRUNCATED
+
+
+def fit_messages(messages, model, reply_tokens):
+    """
+    Trims `messages` ([system prompt, ...history..., new message]) until they
+    fit MAX_NUM_CTX with `reply_tokens` to spare. Returns (messages, num_ctx).
+    """
+    budget = MAX_NUM_CTX - reply_tokens
+    messages = list(messages)
+    head = 1 if messages and messages[0]["role"] == "system" else 0
+    # Oldest turns first, the rolled-up summary (a system message) after them
+    middle = range(head, len(messages) - 1)
+    order = [i for i in middle if messages[i]["role"] != "system"] + [i for i in middle if messages[i]["role"] == "system"]
+    dropped = set()
+    used = messages_tokens(messages, model)
+    for i in order:
+        if used <= budget:
+            break
+        used -= count(messages[i]["content"], model) + MESSAGE_OVERHEAD
+        dropped.add(i)
+    messages = [m for i, m in enumerate(messages) if i not in dropped]
+
+    if used > budget and messages:
+        last = messages[-1]
+        room = budget - (used - count(last["content"], model))
+        messages[-1] = {**last, "content": truncate(last["content"], max(room, 0), model)}
+        used = messages_tokens(messages, model)
+    return messages, sizer.size(model, used + reply_tokens)
+
+
+def fit_text(template, text, model, reply_tokens):
+    """`text` trimmed at the tail so template.replace("{text}", text) + reply fits MAX_NUM_CTX."""
+    room = MAX_NUM_CTX - reply_tokens - count(template.replace("{text}", ""), model)
+    return truncate(text, max(room, 0), model)
+
+
+def options_for(model, prompt, reply_tokens, options=None):
+    """`options` plus a num_ctx sized for `prompt` (text) and the reply."""
+    return {**(options or {}), "num_ctx": sizer.size(model, count(prompt, model) + reply_tokens)}
@@ -0,0 +1,300 @@
+# resume_analysis.py
+"""
+Resume scoring shared by the resume endpoints and background batch jobs.
+"""
+import logging
+
+from fastapi.concurrency import run_in_threadpool
+from werkzeug.utils import secure_filename
+
+import admission
+import prompt_budget
+import resume_index
+import storage
+from admission import DeadlineExceeded, Overloaded
+from batch_engine import run_batch, extract_all, score_all
+from digests import condense
+from document_text import UploadTooLarge, allowed_file, extract_document, record_extraction, release
+from llm_client import generate, generate_sync
+from llm_router import model_for
+from prefilter import assess, shortlist
+from resume_cache import text_cache, verdict_cache, sha256, make_key
+from resume_index import query_text
+from structured_output import VERDICT_SCHEMA, parse_or_repair, parse_or_repair_sync
+
+logger = logging.getLogger(__name__)
+
+MODEL_NAME = model_for("resume")
+REPLY_TOKENS = prompt_budget.REPLY_TOKENS["resume"]
+
+# --- Helper Functions ---
+def save_to_history(category, record):
+    try:
+        storage.add_resume_analysis(category, record)
+    except Exception:
+        logger.exception("History write failed")
+
+def query_ollama(prompt, schema=None):
+    """`schema` constrains decoding to that JSON schema (plain JSON mode if None)."""
+    try:
+        # Same text + rules -> same verdict; duplicates in flight share one generation
+        data = generate_sync(prompt, MODEL_NAME, options=prompt_budget.options_for(MODEL_NAME, prompt, REPLY_TOKENS),
+                             format=schema or "json", cache=True)
+        return data.get('response', '')
+    except (Overloaded, DeadlineExceeded): raise
+    except: return None
+
+async def query_ollama_async(prompt, schema=None):
+    try:
+        data = await generate(prompt, MODEL_NAME, options=prompt_budget.options_for(MODEL_NAME, prompt, REPLY_TOKENS),
+                              format=schema or "json", cache=True)
+        return data.get('response', '')
+    except (Overloaded, DeadlineExceeded): raise
+    except Exception: return None
+
+def query_verdict(prompt_template, text, schema):
+    """
+    Cached LLM verdict for `text` under `prompt_template` (which holds a
+    literal {text} placeholder). Keyed by (text hash, model, prompt hash),
+    so only new texts or changed rules reach the LLM. The resume tail is
+    trimmed if the prompt would not fit the context budget. Malformed output
+    gets one repair call; raises if it is still invalid. Failures are never cached.
+    """
+    key = make_key(sha256(text), MODEL_NAME, sha256(prompt_template))
+    data = verdict_cache.get(key)
+    if data is None:
+        text = prompt_budget.fit_text(prompt_template, text, MODEL_NAME, REPLY_TOKENS)
+        data = parse_or_repair_sync(query_ollama(prompt_template.replace("{text}", text), schema), schema, MODEL_NAME)
+        verdict_cache.put(key, data)
+    return data
+
+async def query_verdict_async(prompt_template, text, schema):
+    """query_verdict for the event loop: the LLM call is awaited, cache file I/O runs in the threadpool."""
+    key = make_key(sha256(text), MODEL_NAME, sha256(prompt_template))
+    data = await run_in_threadpool(verdict_cache.get, key)
+    if data is None:
+        text = prompt_budget.fit_text(prompt_template, text, MODEL_NAME, REPLY_TOKENS)
+        raw = await query_ollama_async(prompt_template.replace("{text}", text), schema)
+        data = await parse_or_repair(raw, schema, MODEL_NAME)
+        await run_in_threadpool(verdict_cache.put, key, data)
+    return data
+
+def extraction_info(doc):
+    return {"engine": doc["engine"], "ms": round(doc["seconds"] * 1000, 1)}
+
+def as_score(value):
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return 0
+
+def rank_key(result):
+    """Best first; on equal scores LLM-scored resumes come before prefiltered ones."""
+    return as_score(result['score']), result.get('stage') != 'prefilter'
+
+def read_upload(upload):
+    """
+    Looks up a received upload (uploads.Upload) in the text cache.
+    Returns (content hash, cached text or None, source). Raises UploadTooLarge.
+    """
+    if upload.error:
+        raise UploadTooLarge(upload.error)
+    digest, source = upload.digest, upload.source
+    text = text_cache.get(digest)
+    if text is not None:
+        release(source)
+        source = None
+    return digest, text, source
+
+def cached_doc(text):
+    return {"text": text, "engine": "cache", "seconds": 0.0}
+
+# --- Batch ranking ---
+def batch_options(form):
+    """Batch filters and options from the submitted form."""
+    top_n = int(form.get('top_n', 10))
+    return {
+        "top_n": top_n,
+        # How many candidates HR actually wants ranked by the LLM (two-stage mode)
+        "shortlist_size": int(form.get('shortlist_size', top_n)),
+        "prefilter": form.get('prefilter', 'yes') != 'no',
+        "role": form.get('role', 'Any'),
+        "main_language": form.get('main_language', 'None'),
+        "candidate_type": form.get('candidate_type', 'any'),
+        "prefers_projects": form.get('prefers_projects', 'no'),
+        "exp_years": form.get('exp_years', '0'),
+        # Re-ranking from the index: how many nearest resumes to consider
+        "candidates": int(form.get('candidates', resume_index.INDEX_CANDIDATES)),
+    }
+
+def batch_prompt_template(opts):
+    role = opts["role"]
+    main_lang = opts["main_language"]
+    candidate_type = opts["candidate_type"]
+    prefers_projects = opts["prefers_projects"]
+    exp_years = opts["exp_years"]
+
+    # BRUTAL SCORING RULES (same for every resume in the batch)
+    rules = []
+    rules.append(f"1. TARGET ROLE: {role}. CRITICAL: If resume is for a different role (e.g., Marketing vs Developer), SCORE = 0.")
+
+    if main_lang and main_lang.lower() != 'none' and main_lang.strip() != '':
+        rules.append(f"2. MAIN LANGUAGE: {main_lang}. CRITICAL: Candidate MUST know {main_lang}. If {main_lang} is missing or weak, Max Score = 40.")
+
+    if candidate_type == 'fresher':
+        rules.append("3. TYPE: Fresher. Penalize if no Projects/Hackathons/Internships are listed.")
+        if prefers_projects == 'yes':
+            rules.append("   - HR PREFERENCE: Projects are MANDATORY. High score requires significant project work.")
+    elif candidate_type == 'professional':
+        rules.append(f"3. TYPE: Professional. REQUIREMENT: Approx {exp_years} years experience. Penalize significantly if experience is far below.")
+
+    rule_text = "\n".join(rules)
+
+    return f"""
+        Act as a STRICT & BRUTAL Technical Recruiter. Rate this resume (0-100) based ONLY on these constraints:
+        {rule_text}
+
+        SCORING MATRIX:
+        - 90-100: Perfect Fit (Matches Role + Strong {main_lang} + Exact Experience/Projects).
+        - 75-89: Good Fit (Matches Role + Good {main_lang}, minor experience gap).
+        - 50-74: Average (Matches Role, but weak {main_lang} or lacks sufficient depth).
+        - < 50: Weak (Matches Role but missing key skills like {main_lang}).
+        - 0: WRONG ROLE (Instant Reject).
+
+        Return JSON only: {{ "score": <0-100 int>, "summary": "<reason for score>" }}
+        Resume Text: {{text}}
+        """
+
+def read_batch_uploads(files):
+    """
+    Received uploads (uploads.Upload) are checked against the text cache.
+    Returns (items, preextracted, rejected) where items are
+    ((filename, digest, needs_extraction), source) pairs.
+    """
+    items = []
+    preextracted = {}
+    rejected = []
+    for file in files:
+        if file and allowed_file(file.filename):
+            filename = secure_filename(file.filename)
+            try:
+                digest, text, source = read_upload(file)
+            except UploadTooLarge as e:
+                rejected.append({"filename": filename, "score": 0, "summary": f"Error: {e}"})
+                continue
+            if text is not None:
+                preextracted[len(items)] = cached_doc(text)
+            items.append(((filename, digest, text is None), source))
+    return items, preextracted, rejected
+
+def rank_resumes(items, preextracted, opts, completed=None, on_result=None):
+    """
+    Scores a batch. Files already seen (same content hash) skip extraction;
+    the rest are extracted (process pool) and scored (bounded LLM concurrency).
+
+    completed -> optional {index: result} already scored earlier (job resume)
+    on_result -> optional callback(index, result) after each file is scored
+    Returns results in the same order as `items`.
+    """
+    prompt_template = batch_prompt_template(opts)
+    completed = completed or {}
+
+    def score_resume(key, doc):
+        index, filename, digest, fresh = key
+        if index in completed:
+            return completed[index]
+
+        text = doc["text"] if doc else None
+        if not text:
+            result = {"filename": filename, "score": 0, "summary": "Error: File Corrupted"}
+        else:
+            if fresh:
+                text_cache.put(digest, text)
+            if not opts["prefilter"]:
+                resume_index.schedule([(digest, filename, text)])
+            try:
+                # Runs in a scoring thread; batch work yields to interview turns
+                with admission.using(admission.BATCH):
+                    # Long resumes are scored on a digest of the whole text
+                    data = query_verdict(prompt_template, condense(text, "resume"), VERDICT_SCHEMA)
+                result = {"filename": filename, "score": data.get('score', 0), "summary": data.get('summary', ''), "extraction": extraction_info(doc)}
+            except: result = {"filename": filename, "score": 0, "summary": "Analysis Error"}
+
+        if on_result:
+            on_result(index, result)
+        return result
+
+    indexed = [((i,) + key, source) for i, (key, source) in enumerate(items)]
+    if opts["prefilter"]:
+        return ranked_with_prefilter(indexed, preextracted, score_resume, opts)
+    return run_batch(indexed, extract_document, score_resume, preextracted=preextracted, on_extracted=record_extraction)
+
+def ranked_with_prefilter(items, preextracted, score_resume, opts):
+    """
+    Two-stage ranking: extract everything, reject/cap obvious mismatches with
+    the local prefilter, and send only the plausible top-K (+ margin) to the LLM.
+    """
+    filters = (opts["role"], opts["main_language"], opts["candidate_type"], opts["prefers_projects"], opts["exp_years"])
+    docs = extract_all(items, extract_document, preextracted, on_extracted=record_extraction)
+    # Every readable resume goes into the index, shortlisted or not
+    resume_index.schedule([(items[i][0][2], items[i][0][1], doc["text"]) for i, doc in enumerate(docs) if doc])
+    assessments = [assess(doc["text"], *filters) if doc and doc["text"] else None for doc in docs]
+
+    # Unreadable files still go through score_resume (no LLM call) for their error result
+    chosen = sorted(shortlist(assessments, opts["shortlist_size"]) | {i for i, a in enumerate(assessments) if a is None})
+    scored = score_all([items[i][0] for i in chosen], [docs[i] for i in chosen], score_resume)
+
+    results = [None] * len(items)
+    for i, result in zip(chosen, scored):
+        results[i] = result
+
+    # Candidates left out of the shortlist rank below every LLM-scored one,
+    # including zero scores and errors (e.g. every call failed)
+    llm_scores = [as_score(results[i]['score']) for i in chosen if assessments[i] is not None]
+    ceiling = max(min(llm_scores, default=100) - 1, 0)
+    for i, a in enumerate(assessments):
+        if results[i] is not None:
+            continue
+        filename = items[i][0][1]
+        if a["reject"]:
+            summary = f"Rejected by local prefilter: {'; '.join(a['reasons'])}."
+            score = 0
+        else:
+            summary = f"Not shortlisted by local prefilter (estimated {a['score']}): {'; '.join(a['reasons'])}."
+            score = min(a["score"], ceiling)
+        results[i] = {"filename": filename, "score": score, "summary": summary,
+                      "stage": "prefilter", "extraction": extraction_info(docs[i])}
+
+    logger.info(f"Prefilter: {len(chosen)} of {len(items)} resumes sent to the LLM")
+    return results
+
+def rank_from_index(opts, description=""):
+    """
+    Re-ranks stored resumes against new filters without re-uploading them:
+    one similarity pass over the embedding index picks the `candidates`
+    nearest resumes, the local prefilter rejects hard mismatches and only the
+    best `shortlist_size` (+ margin) are scored by the LLM.
+    Returns results in the /analyze_batch shape, or None if nothing is indexed.
+    """
+    with admission.using(admission.BATCH):
+        matches = resume_index.index.search(query_text(opts, description), opts["candidates"])
+    stored = resume_index.index.resumes([slot for slot, _ in matches])
+    matches = [(slot, similarity) for slot, similarity in matches if slot in stored]
+    if not matches:
+        return None
+
+    items = [((stored[slot]["filename"], stored[slot]["digest"], False), None) for slot, _ in matches]
+    preextracted = {i: cached_doc(stored[slot]["text"]) for i, (slot, _) in enumerate(matches)}
+    results = rank_resumes(items, preextracted, {**opts, "prefilter": True})
+    for result, (_, similarity) in zip(results, matches):
+        result["similarity"] = round(similarity, 3)
+    return results
+
+def finish_batch(results, files_processed, opts, kind="fast"):
+    """Sorts results best first and saves the top N to history."""
+    results.sort(key=rank_key, reverse=True)
+
+    # Save top N to history
+    final_results = results[:opts["top_n"]]
+    save_to_history('batch', {"type": kind, "files_processed": files_processed, "top_n_requested": opts["top_n"], "results": final_results})
+    return results
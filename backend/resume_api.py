@@ -0,0 +1,215 @@
+# resume_api.py
+"""
+Resume analyzer endpoints, served by the main FastAPI app (they used to be
+a separate Flask service on port 5000).
+
+Uploads are parsed while they stream in (uploads.py). Text extraction runs
+in the batch extraction process pool, the single-resume LLM call is
+awaited, and the blocking batch pipeline and storage calls run in the
+threadpool, so none of them hold up the event loop serving interview turns.
+"""
+import asyncio
+import json
+import logging
+
+from fastapi import APIRouter, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from werkzeug.utils import secure_filename
+
+import admission
+import batch_jobs
+import resume_index
+import storage
+from admission import DeadlineExceeded, Overloaded
+from batch_engine import extract_async
+from digests import condense_async
+from document_text import UploadTooLarge, allowed_file, extract_document, record_extraction, release
+from resume_analysis import (save_to_history, query_verdict_async, extraction_info, read_upload, cached_doc,
+                             batch_options, read_batch_uploads, rank_resumes, finish_batch, rank_from_index)
+from resume_cache import text_cache
+from structured_output import ATS_SCHEMA
+from uploads import read_form
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# Legacy JSON history, imported into SQLite once at startup (main.lifespan)
+HISTORY_FILE = 'resume_analysis_history.json'
+
+ATS_PROMPT = """
+    You are an expert ATS. Analyze this resume.
+    Return raw JSON: { "ats_score": <0-100>, "skills": [], "summary": "", "improvements": [] }
+    Resume: {text}
+    """
+
+
+def error(message: str, status_code: int):
+    # Same {"error": ...} body the resume page has always checked
+    return JSONResponse(status_code=status_code, content={"error": message})
+
+
+def release_all(uploads):
+    for upload in uploads:
+        release(upload.source)
+
+
+# --------------------------------------------------
+# HISTORY
+# --------------------------------------------------
+@router.get("/history")
+async def get_history(limit: int = Query(50, ge=1, le=500), offset: int = Query(0, ge=0)):
+    return await run_in_threadpool(storage.get_resume_history, limit, offset)
+
+@router.post("/clear_history")
+async def clear_history():
+    """Clears the analysis history."""
+    await run_in_threadpool(storage.clear_resume_history)
+    return {"status": "success"}
+
+# --------------------------------------------------
+# SINGLE RESUME (ATS analysis)
+# --------------------------------------------------
+@router.post("/analyze")
+async def analyze_resume(request: Request):
+    _, uploads = await read_form(request, ("resume",))
+    try:
+        if not uploads:
+            return error("No file", 400)
+        upload = uploads[0]
+        if not allowed_file(upload.filename):
+            return error("Invalid file", 400)
+
+        filename = secure_filename(upload.filename)
+        try:
+            digest, text, source = await run_in_threadpool(read_upload, upload)
+        except UploadTooLarge as e:
+            return error(str(e), 413)
+
+        doc = cached_doc(text)
+        if text is None:
+            try:
+                doc = await extract_async(extract_document, source)
+            finally:
+                release(source)
+            record_extraction(doc)
+            text = doc["text"]
+            logger.info(f"Extracted {filename} with {doc['engine']} in {doc['seconds'] * 1000:.0f} ms")
+            if not text:
+                return error("Corrupted file", 500)
+            await run_in_threadpool(text_cache.put, digest, text)
+        resume_index.schedule([(digest, filename, text)])
+
+        try:
+            with admission.using(admission.REPORT):
+                condensed = await condense_async(text, "resume")
+                data = await query_verdict_async(ATS_PROMPT, condensed, ATS_SCHEMA)
+        except (Overloaded, DeadlineExceeded):
+            raise
+        except Exception as e:
+            logger.error(f"/analyze error: {e}")
+            return error("AI Error", 500)
+        await run_in_threadpool(save_to_history, 'single', {"filename": filename, "analysis": data})
+        return {**data, "extraction": extraction_info(doc)}
+    finally:
+        release_all(uploads)
+
+# --------------------------------------------------
+# BATCH RANKING
+# --------------------------------------------------
+@router.post("/analyze_batch")
+async def analyze_batch(request: Request):
+    # Refuse before reading a large upload we could not score anyway
+    admission.controller.check(admission.BATCH)
+    form, uploads = await read_form(request, ("resumes",))
+    # Use top_n from form for history only, we return all data to frontend
+    opts = batch_options(form)
+
+    def run():
+        items, preextracted, rejected = read_batch_uploads(uploads)
+        try:
+            results = rank_resumes(items, preextracted, opts)
+        finally:
+            for _, source in items:
+                release(source)
+        results.extend(rejected)
+        return finish_batch(results, len(uploads), opts)
+
+    try:
+        # Return ALL results so frontend can split Top vs Good vs Rejected
+        return await run_in_threadpool(run)
+    finally:
+        release_all(uploads)
+
+# --------------------------------------------------
+# RESUME INDEX (re-rank stored resumes)
+# --------------------------------------------------
+@router.post("/index/rank")
+async def rank_indexed(request: Request):
+    """Same filters as /analyze_batch (plus optional job_description), no files."""
+    admission.controller.check(admission.BATCH)
+    form, _ = await read_form(request, ())
+    opts = batch_options(form)
+    try:
+        results = await run_in_threadpool(rank_from_index, opts, form.get("job_description", ""))
+    except (Overloaded, DeadlineExceeded):
+        raise
+    except Exception as e:
+        logger.error(f"/index/rank error: {e}")
+        return error("Index search failed", 500)
+    if results is None:
+        return error("No resumes indexed yet. Upload a batch first.", 404)
+    return await run_in_threadpool(finish_batch, results, len(results), opts, "index")
+
+@router.get("/index")
+async def index_status():
+    rows, dim = await run_in_threadpool(resume_index.index.size)
+    return {"model": resume_index.index.model, "resumes": rows, "dim": dim, "enabled": resume_index.INDEX_ENABLED}
+
+@router.post("/index/clear")
+async def clear_index():
+    await run_in_threadpool(resume_index.index.clear)
+    return {"status": "success"}
+
+# --------------------------------------------------
+# BACKGROUND BATCH JOBS
+# --------------------------------------------------
+@router.post("/jobs", status_code=202)
+async def submit_batch_job(request: Request):
+    """Same form as /analyze_batch; returns a job id immediately."""
+    admission.controller.check(admission.BATCH)
+    form, uploads = await read_form(request, ("resumes",))
+    try:
+        job_id = await run_in_threadpool(batch_jobs.submit_job, uploads, form)
+    finally:
+        release_all(uploads)
+    return {"job_id": job_id}
+
+@router.get("/jobs/{job_id}")
+async def get_batch_job(job_id: str):
+    job = await run_in_threadpool(batch_jobs.job_status, job_id)
+    if job is None:
+        return error("Unknown job", 404)
+    return job
+
+@router.get("/jobs/{job_id}/events")
+async def batch_job_events(job_id: str):
+    """NDJSON stream of job snapshots, one line per progress change, until the job ends."""
+    job = await run_in_threadpool(batch_jobs.job_status, job_id)
+    if job is None:
+        return error("Unknown job", 404)
+
+    async def events(job):
+        last = None
+        while True:
+            progress = (job["status"], job["completed"])
+            if progress != last:
+                yield json.dumps(job) + "\n"
+                last = progress
+            if job["status"] in batch_jobs.FINISHED:
+                return
+            await asyncio.sleep(1)
+            job = await run_in_threadpool(batch_jobs.job_status, job_id)
+
+    return StreamingResponse(events(job), media_type="application/x-ndjson")
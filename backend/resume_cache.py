@@ -0,0 +1,150 @@
+# resume_cache.py
+"""
+Content-addressed on-disk cache for the resume service.
+
+- text_cache:    file content hash          -> extracted resume text
+- verdict_cache: (text hash, model, prompt) -> parsed LLM verdict
+- digest_cache:  (chunk hash, model, prompt) -> condensed chunk notes
+                 (digests.py; resumes and interview transcripts)
+
+Entries are small JSON files. Each cache keeps an in-memory LRU index
+(rebuilt from file mtimes on start-up) and evicts the least recently used
+entries once its configured size limit is exceeded.
+
+Several worker processes share the directory. A key missing from a
+worker's index is still looked up on disk (another worker may have written
+it), and the index is rebuilt from the directory every CACHE_RESCAN_SECONDS
+on write, so the size limit holds for the directory as a whole. Reads touch
+the file's mtime, so recency is shared too.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+CACHE_DIR = os.getenv("RESUME_CACHE_DIR", "cache")
+TEXT_CACHE_MAX_MB = float(os.getenv("TEXT_CACHE_MAX_MB", "200"))
+VERDICT_CACHE_MAX_MB = float(os.getenv("VERDICT_CACHE_MAX_MB", "50"))
+DIGEST_CACHE_MAX_MB = float(os.getenv("DIGEST_CACHE_MAX_MB", "100"))
+CACHE_RESCAN_SECONDS = float(os.getenv("CACHE_RESCAN_SECONDS", "60"))
+
+
+def sha256(data) -> str:
+    if isinstance(data, str):
+        data = data.encode("utf-8", errors="ignore")
+    return hashlib.sha256(data).hexdigest()
+
+
+def make_key(*parts) -> str:
+    return sha256("\x1f".join(str(p) for p in parts))
+
+
+class DiskCache:
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = int(max_bytes)
+        self._index = OrderedDict()   # key -> size in bytes, oldest first
+        self._size = 0
+        self._scanned = 0.0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".json")
+
+    def _load_index(self):
+        """Rebuilds the index from the files on disk (all workers' entries)."""
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, name[:-5], st.st_size))
+        index = OrderedDict((key, size) for _, key, size in sorted(entries))
+        with self._lock:
+            self._index = index
+            self._size = sum(index.values())
+            self._scanned = time.monotonic()
+            self._evict()
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            value = json.loads(data)
+            os.utime(path)  # persist recency across restarts and workers
+        except FileNotFoundError:
+            with self._lock:
+                self._size -= self._index.pop(key, 0)
+            return None
+        except (OSError, ValueError):
+            self._discard(key)
+            return None
+        with self._lock:
+            # May have been written by another worker
+            self._size += len(data) - self._index.pop(key, 0)
+            self._index[key] = len(data)
+        return value
+
+    def put(self, key, value):
+        path = self._path(key)
+        data = json.dumps(value).encode("utf-8")
+        if len(data) > self.max_bytes:
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return
+        with self._lock:
+            self._size += len(data) - self._index.pop(key, 0)
+            self._index[key] = len(data)
+            self._evict()
+            rescan = time.monotonic() - self._scanned > CACHE_RESCAN_SECONDS
+        if rescan:
+            self._load_index()
+
+    def clear(self):
+        self._load_index()
+        with self._lock:
+            for key in list(self._index):
+                self._remove_file(key)
+            self._index.clear()
+            self._size = 0
+
+    def _discard(self, key):
+        with self._lock:
+            self._size -= self._index.pop(key, 0)
+            self._remove_file(key)
+
+    def _evict(self):
+        # caller holds the lock
+        while self._size > self.max_bytes and self._index:
+            key, size = self._index.popitem(last=False)
+            self._size -= size
+            self._remove_file(key)
+
+    def _remove_file(self, key):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+
+text_cache = DiskCache(os.path.join(CACHE_DIR, "text"), TEXT_CACHE_MAX_MB * 1024 * 1024)
+verdict_cache = DiskCache(os.path.join(CACHE_DIR, "verdict"), VERDICT_CACHE_MAX_MB * 1024 * 1024)
+digest_cache = DiskCache(os.path.join(CACHE_DIR, "digest"), DIGEST_CACHE_MAX_MB * 1024 * 1024)
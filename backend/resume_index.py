@@ -0,0 +1,188 @@
+# resume_index.py
+"""
+Persistent embedding index of every resume the service has read.
+
+Each extracted resume is embedded once through Ollama /api/embeddings
+(the mean of its chunk vectors, unit length) and stored as one row of a
+float32 matrix memory-mapped from RESUME_INDEX_DIR/<model>.f32. Its
+filename and text live in SQLite (storage.py) under the same slot.
+
+New job filters are turned into a query vector and ranked against every
+stored resume with one matrix-vector product. Only the best matches go on
+to the local prefilter and the LLM (resume_analysis.rank_from_index), so
+nothing is uploaded, extracted or embedded again.
+
+Rows are only appended. Slots are allocated inside an IMMEDIATE
+transaction and the file never shrinks, so several worker processes can
+add and search at the same time. A reader remaps once more rows exist
+than it has mapped.
+
+Resumes are indexed in the background after a batch or single upload
+(`schedule`), at batch priority, so uploads are not slowed down.
+"""
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import admission
+import storage
+from admission import DeadlineExceeded, Overloaded
+from digests import split_chunks
+from llm_client import embeddings_sync
+from llm_router import model_for
+
+logger = logging.getLogger(__name__)
+
+INDEX_ENABLED = os.getenv("RESUME_INDEX", "1") != "0"
+INDEX_DIR = os.getenv("RESUME_INDEX_DIR", os.path.join(os.getenv("RESUME_CACHE_DIR", "cache"), "index"))
+EMBED_CHUNK_TOKENS = int(os.getenv("EMBED_CHUNK_TOKENS", "500"))
+EMBED_MAX_CHUNKS = int(os.getenv("EMBED_MAX_CHUNKS", "8"))
+# Resumes passed from the similarity pass on to the prefilter and the LLM
+INDEX_CANDIDATES = int(os.getenv("INDEX_CANDIDATES", "50"))
+QUERY_CACHE_SIZE = 256
+
+
+def _unit(vector):
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm else vector
+
+
+def embed_text(text, model):
+    """Unit-length mean of the chunk embeddings of `text` (float32)."""
+    chunks = split_chunks(text, model, EMBED_CHUNK_TOKENS)[:EMBED_MAX_CHUNKS] or [text or " "]
+    vectors = [_unit(np.asarray(embeddings_sync(chunk, model), dtype=np.float32)) for chunk in chunks]
+    if any(v.size == 0 for v in vectors):
+        raise ValueError(f"{model} returned an empty embedding")
+    return _unit(np.mean(vectors, axis=0)).astype(np.float32)
+
+
+def query_text(opts, description=""):
+    """Job filters (batch_options) as text in the same register as a resume."""
+    parts = [f"{opts['role']}."]
+    language = opts.get("main_language") or ""
+    if language.strip() and language.lower() != "none":
+        parts.append(f"Strong {language} skills.")
+    if opts.get("candidate_type") == "fresher":
+        parts.append("Fresher, recent graduate.")
+        if opts.get("prefers_projects") == "yes":
+            parts.append("Projects, hackathons and internships.")
+    elif opts.get("candidate_type") == "professional":
+        parts.append(f"Working professional with {opts.get('exp_years', '0')} years of experience.")
+    if description:
+        parts.append(description)
+    return " ".join(parts)
+
+
+class ResumeIndex:
+    def __init__(self, directory, model):
+        self.directory = directory
+        self.model = model
+        self.path = os.path.join(directory, re.sub(r"[^A-Za-z0-9_.-]", "_", model) + ".f32")
+        self._matrix = None          # read-only memmap, rows >= what SQLite reports
+        self._lock = threading.Lock()
+        self._queries = OrderedDict()
+
+    # ---------- writing ----------
+    def _write_vector(self, slot, vector):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.path, "r+b" if os.path.exists(self.path) else "w+b") as f:
+            f.seek(slot * vector.nbytes)
+            f.write(vector.tobytes())
+
+    def add(self, digest, filename, text):
+        """Embeds and stores one resume unless it is already indexed; returns its slot."""
+        if storage.indexed_digests(self.model, [digest]):
+            return None
+        vector = embed_text(text, self.model)
+        return storage.add_indexed_resume(self.model, digest, filename, text, vector.size,
+                                          lambda slot: self._write_vector(slot, vector))
+
+    def add_all(self, entries):
+        """entries -> [(digest, filename, text)]; resumes already indexed are skipped."""
+        entries = [e for e in entries if e[2]]
+        known = storage.indexed_digests(self.model, [digest for digest, _, _ in entries])
+        added = 0
+        for digest, filename, text in entries:
+            if digest in known:
+                continue
+            known.add(digest)
+            try:
+                self.add(digest, filename, text)
+                added += 1
+            except (Overloaded, DeadlineExceeded) as e:
+                logger.warning(f"Resume indexing deferred: {e}")
+                break
+            except Exception as e:
+                logger.warning(f"Indexing {filename} failed: {e}")
+                break
+        return added
+
+    # ---------- searching ----------
+    def size(self):
+        return storage.resume_index_size(self.model)
+
+    def matrix(self):
+        """(rows, dim) view of every stored vector."""
+        rows, dim = self.size()
+        if not rows:
+            return np.empty((0, dim or 0), dtype=np.float32)
+        with self._lock:
+            if self._matrix is None or self._matrix.shape[0] < rows or self._matrix.shape[1] != dim:
+                self._matrix = np.memmap(self.path, dtype=np.float32, mode="r", shape=(rows, dim))
+            return self._matrix[:rows]
+
+    def query_vector(self, text):
+        with self._lock:
+            vector = self._queries.get(text)
+            if vector is not None:
+                self._queries.move_to_end(text)
+                return vector
+        vector = embed_text(text, self.model)
+        with self._lock:
+            self._queries[text] = vector
+            while len(self._queries) > QUERY_CACHE_SIZE:
+                self._queries.popitem(last=False)
+        return vector
+
+    def search(self, text, limit):
+        """Best `limit` resumes for `text`: [(slot, cosine similarity)], best first."""
+        matrix = self.matrix()
+        if not len(matrix) or limit < 1:
+            return []
+        scores = matrix @ self.query_vector(text)
+        k = min(limit, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(slot), float(scores[slot])) for slot in top]
+
+    def resumes(self, slots):
+        return storage.indexed_resumes(self.model, slots)
+
+    def clear(self):
+        storage.clear_resume_index(self.model)
+        with self._lock:
+            self._queries.clear()
+
+
+index = ResumeIndex(INDEX_DIR, model_for("embed"))
+
+_indexer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="resume-index")
+
+
+def _index_in_background(entries):
+    with admission.using(admission.BATCH):
+        added = index.add_all(entries)
+    if added:
+        logger.info(f"Indexed {added} resume(s)")
+
+
+def schedule(entries):
+    """Indexes [(digest, filename, text)] on the background indexer thread."""
+    entries = [e for e in entries if e[0] and e[2]]
+    if INDEX_ENABLED and entries:
+        _indexer.submit(_index_in_background, entries)
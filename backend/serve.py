@@ -0,0 +1,53 @@
+# serve.py
+"""
+Production launcher: one uvicorn process group serving both the interview
+and the resume endpoints (main.py), plus the frontend build (build_assets.py).
+
+    python serve.py
+    WEB_CONCURRENCY=4 PORT=8000 HOST=0.0.0.0 python serve.py
+
+Workers share everything that must be shared through SQLite (interview
+sessions, stats, resume history, batch jobs). Per-process budgets are split
+between workers unless set explicitly, so the group as a whole stays within
+what the machine and the Ollama nodes can take:
+
+- LLM_MAX_INFLIGHT (admission slots, default OLLAMA_NUM_PARALLEL per node)
+- BATCH_EXTRACT_WORKERS (extraction processes, default one per core)
+"""
+import math
+import os
+
+import uvicorn
+
+import build_assets
+
+HOST = os.getenv("HOST", "127.0.0.1")
+PORT = int(os.getenv("PORT", "8000"))
+WORKERS = max(1, int(os.getenv("WEB_CONCURRENCY", str(min(os.cpu_count() or 1, 4)))))
+KEEP_ALIVE = int(os.getenv("KEEP_ALIVE_SECONDS", "15"))
+
+
+def split_budgets(workers: int):
+    """Sets per-worker limits in the environment the workers inherit."""
+    if workers < 2:
+        return
+    if "LLM_MAX_INFLIGHT" not in os.environ:
+        nodes = len([u for u in os.getenv("OLLAMA_URLS", os.getenv("OLLAMA_URL", "x")).split(",") if u.strip()])
+        total = int(os.getenv("OLLAMA_NUM_PARALLEL", "4")) * nodes
+        os.environ["LLM_MAX_INFLIGHT"] = str(max(1, math.ceil(total / workers)))
+    if "BATCH_EXTRACT_WORKERS" not in os.environ:
+        os.environ["BATCH_EXTRACT_WORKERS"] = str(max(1, (os.cpu_count() or 1) // workers))
+
+
+def main():
+    split_budgets(WORKERS)
+    # Assets are built here, once, instead of in every worker
+    if build_assets.is_stale():
+        build_assets.main()
+    print(f"Starting Mockify API on {HOST}:{PORT} with {WORKERS} worker(s)")
+    uvicorn.run("main:app", host=HOST, port=PORT, workers=WORKERS,
+                timeout_keep_alive=KEEP_ALIVE, proxy_headers=True, log_level="info")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+# speculation.py
+"""
+Speculative interview replies.
+
+While the candidate is still speaking, the interview page posts the interim
+speech transcript to /interview/interim. Once it holds SPECULATE_MIN_WORDS
+words, the interviewer's reply to it is generated in the background and
+its tokens are buffered. When the final utterance arrives (/interview/ask)
+on the same session state and its words match the speculated text closely
+(similarity >= SPECULATE_MATCH), the turn replays the buffered tokens and
+follows the rest of that generation instead of starting a new one. Most of
+the generation time has then passed while the candidate finished talking.
+Otherwise the speculation is cancelled, which closes its Ollama stream,
+and the turn runs as usual.
+
+Speculations run at admission.SPECULATIVE priority: they never queue, so
+one only starts while a non-reserved LLM slot is free, and every running
+speculation that no turn has claimed yet is cancelled as soon as a real
+interview turn or report has to wait for a slot.
+
+One speculation per session. An interim that no longer matches restarts
+it, at most once per SPECULATE_INTERVAL. Speculations live in the worker
+that received the interim; a final turn served by another worker misses,
+and the orphan is dropped after SPECULATE_TTL.
+"""
+import asyncio
+import difflib
+import logging
+import os
+import re
+import time
+from contextlib import aclosing
+
+import admission
+import metrics
+from ollama_client import stream_ollama
+
+logger = logging.getLogger(__name__)
+
+SPECULATE_ENABLED = os.getenv("SPECULATE", "1") != "0"
+MIN_WORDS = int(os.getenv("SPECULATE_MIN_WORDS", "4"))
+MATCH_RATIO = float(os.getenv("SPECULATE_MATCH", "0.9"))
+RESTART_INTERVAL = float(os.getenv("SPECULATE_INTERVAL", "0.75"))
+SPECULATION_TTL = float(os.getenv("SPECULATE_TTL", "30"))
+
+
+def words(text):
+    return re.findall(r"[a-z0-9']+", (text or "").lower())
+
+
+def similarity(a, b):
+    """Word-level similarity of two word lists, 0..1."""
+    if a == b:
+        return 1.0
+    return difflib.SequenceMatcher(None, a, b, autojunk=False).ratio()
+
+
+class SpeculationCancelled(Exception):
+    """The speculation was dropped (mismatch, preempted, or the turn went away)."""
+
+
+def session_state(session):
+    """What a reply depends on besides the new utterance."""
+    return len(session.turns), session.summarized_upto, session.summary
+
+
+class Speculation:
+    def __init__(self, text, state, route, messages):
+        self.words = words(text)
+        self.state = state
+        self.route = route
+        self.started = time.monotonic()
+        self.tokens = []
+        self.meta = {}
+        self.error = None
+        self.done = False
+        self.cancelled = False
+        self.claimed = False
+        self._changed = asyncio.Event()
+        self.task = asyncio.get_running_loop().create_task(self._run(messages))
+
+    @property
+    def alive(self):
+        return not self.cancelled and not (self.done and self.error is not None)
+
+    async def _run(self, messages):
+        try:
+            with admission.using(admission.SPECULATIVE):
+                async with aclosing(stream_ollama(messages, self.meta, route=self.route)) as tokens:
+                    async for token in tokens:
+                        self.tokens.append(token)
+                        self._notify()
+        except asyncio.CancelledError:
+            self.error = SpeculationCancelled()
+            raise
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+            self._notify()
+
+    def _notify(self):
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def cancel(self):
+        self.cancelled = True
+        if not self.task.done():
+            self.task.cancel()
+
+    async def follow(self):
+        """Yields the reply's tokens: those generated so far, then the rest as they arrive."""
+        sent = 0
+        try:
+            while True:
+                changed = self._changed
+                while sent < len(self.tokens):
+                    yield self.tokens[sent]
+                    sent += 1
+                if self.done:
+                    if self.error is not None:
+                        raise self.error
+                    return
+                await changed.wait()
+        finally:
+            # The turn went away (client disconnect) -> stop generating
+            if not self.done:
+                self.cancel()
+
+    async def reply(self):
+        return "".join([token async for token in self.follow()]).strip()
+
+
+class Speculator:
+    def __init__(self):
+        self._sessions = {}          # session id -> Speculation; only touched on the event loop
+        self._loop = None
+        admission.controller.on_contention(self._contended)
+
+    def _drop(self, session_id, outcome):
+        spec = self._sessions.pop(session_id, None)
+        if spec is not None:
+            spec.cancel()
+            metrics.observe("speculation", time.monotonic() - spec.started, outcome=outcome)
+
+    def _expire(self):
+        now = time.monotonic()
+        for session_id, spec in list(self._sessions.items()):
+            if now - spec.started > SPECULATION_TTL:
+                self._drop(session_id, "expired")
+
+    def offer(self, session, text, route, build_messages):
+        """
+        Interim transcript of the turn in progress. Starts a speculation, keeps
+        the running one, or replaces it; returns what happened.
+        """
+        self._loop = asyncio.get_running_loop()
+        self._expire()
+        key = words(text)
+        if len(key) < MIN_WORDS:
+            return "short"
+        state = session_state(session)
+        current = self._sessions.get(session.id)
+        if current is not None:
+            if not current.alive:
+                self._drop(session.id, "preempted" if current.cancelled else "failed")
+            elif current.state == state and current.route == route and similarity(current.words, key) >= MATCH_RATIO:
+                return "running"
+            elif time.monotonic() - current.started < RESTART_INTERVAL:
+                return "throttled"
+            else:
+                self._drop(session.id, "replaced")
+        self._sessions[session.id] = Speculation(text, state, route, build_messages())
+        return "started"
+
+    def discard(self, session_id):
+        self._drop(session_id, "cancelled")
+
+    def claim(self, session, route, text):
+        """The speculation for this exact turn, or None (a mismatch is cancelled)."""
+        spec = self._sessions.pop(session.id, None)
+        if spec is None:
+            return None
+        usable = (spec.alive and spec.state == session_state(session) and spec.route == route
+                  and similarity(spec.words, words(text)) >= MATCH_RATIO)
+        metrics.observe("speculation", time.monotonic() - spec.started, outcome="hit" if usable else "miss")
+        if not usable:
+            spec.cancel()
+            return None
+        spec.claimed = True
+        logger.info(f"Session {session.id}: reply speculated {time.monotonic() - spec.started:.1f}s ahead")
+        return spec
+
+    def _contended(self):
+        """Admission hook; runs on whatever thread had to queue (sync calls run in the threadpool)."""
+        loop = self._loop
+        if loop is None:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self.preempt()
+        elif not loop.is_closed():
+            loop.call_soon_threadsafe(self.preempt)
+
+    def preempt(self):
+        """Gives the LLM slots of unclaimed speculations back to real requests (event loop only)."""
+        for spec in list(self._sessions.values()):
+            if not spec.claimed and not spec.done and not spec.cancelled:
+                spec.cancel()
+
+    def status(self):
+        return len(self._sessions)
+
+
+speculator = Speculator()
+
+metrics.collector("speculations_running", "Speculative interview replies held in this worker.", "gauge",
+                  lambda: [({}, speculator.status())])
@@ -0,0 +1,142 @@
+# static_files.py
+"""
+Serves the frontend build (build_assets.py) under /app.
+
+- /app/static/<name>.<hash>.<ext> never changes content and is cached for
+  a year (immutable). Pages reference their scripts and images this way.
+- Pages and original file names (/app/index.html, /app/logo.png; scripts
+  still build some image paths at runtime) are revalidated on every use:
+  no-cache plus an ETag, answered with 304 while it still matches.
+- The precompressed .br / .gz copy is picked from Accept-Encoding and the
+  WebP copy of an image from Accept, so nothing is compressed or converted
+  per request.
+- The manifest and every file up to STATIC_INLINE_KB are loaded once per
+  worker at startup (`load`), so serving them does no disk I/O. Larger
+  files go out as FileResponse, which hands the path to the server (ASGI
+  pathsend) where the server supports it instead of reading it in Python.
+"""
+import json
+import logging
+import os
+import stat
+
+from fastapi import APIRouter, Request
+from fastapi.responses import FileResponse, JSONResponse, RedirectResponse, Response
+
+from build_assets import BUILD_DIR, MANIFEST
+
+logger = logging.getLogger(__name__)
+
+STATIC_INLINE_KB = int(os.getenv("STATIC_INLINE_KB", "512"))
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+router = APIRouter(include_in_schema=False)
+
+
+def _accepts(header, token):
+    """True if an Accept / Accept-Encoding header lists `token` with q > 0."""
+    for part in (header or "").split(","):
+        name, _, params = part.strip().partition(";")
+        if name.strip().lower() == token:
+            q = params.strip()
+            return not (q.startswith("q=") and float(q[2:] or 0) == 0)
+    return False
+
+
+def _matches(header, etag):
+    """If-None-Match check (weak comparison)."""
+    if not header:
+        return False
+    tags = [t.strip().removeprefix("W/") for t in header.split(",")]
+    return "*" in tags or etag in tags
+
+
+class StaticBuild:
+    def __init__(self, directory):
+        self.directory = os.path.join(directory, "files")
+        with open(os.path.join(directory, MANIFEST), encoding="utf-8") as f:
+            manifest = json.load(f)
+        self.files = manifest["files"]
+        self.urls = manifest["urls"]
+        self.built = manifest["built"]
+        self._memory = {}
+        for entry_name, entry in self.files.items():
+            copies = [(entry_name, entry["size"])] + [(v["file"], v["size"]) for v in entry["encodings"].values()]
+            if entry["webp"]:
+                copies.append((entry["webp"]["file"], entry["webp"]["size"]))
+            for name, size in copies:
+                if size <= STATIC_INLINE_KB * 1024:
+                    with open(os.path.join(self.directory, name), "rb") as f:
+                        self._memory[name] = f.read()
+
+    def lookup(self, path):
+        """(manifest entry, stored name, immutable) for a URL path, or None."""
+        if path.startswith("static/"):
+            name = path[len("static/"):]
+            immutable = True
+        else:
+            name = self.urls.get(path or "index.html")
+            immutable = False
+        entry = self.files.get(name)
+        return (entry, name, immutable) if entry else None
+
+    def response(self, name, size, status, headers, media_type):
+        body = self._memory.get(name)
+        if body is not None:
+            return Response(body, status_code=status, headers=headers, media_type=media_type)
+        # Known size and time: FileResponse does not stat the file again
+        stat_result = os.stat_result((stat.S_IFREG | 0o644, 0, 0, 1, 0, 0, size, self.built, self.built, self.built))
+        return FileResponse(os.path.join(self.directory, name), status_code=status, headers=headers,
+                            media_type=media_type, stat_result=stat_result)
+
+
+_build = None
+
+
+def load(directory=BUILD_DIR):
+    """Reads the build once per worker (startup); without one the frontend is not served."""
+    global _build
+    try:
+        _build = StaticBuild(directory)
+    except FileNotFoundError:
+        logger.warning(f"No frontend build in {directory}; run: python build_assets.py")
+        return
+    logger.info(f"Serving {len(_build.urls)} frontend assets from {directory}")
+
+
+@router.get("/")
+async def frontend_root():
+    return RedirectResponse("/app/index.html")
+
+
+@router.api_route("/app/{path:path}", methods=["GET", "HEAD"])
+async def frontend_asset(path: str, request: Request):
+    found = _build.lookup(path) if _build is not None else None
+    if found is None:
+        return JSONResponse(status_code=404, content={"error": "Not found"})
+    entry, name, immutable = found
+
+    size, etag, vary, encoding = entry["size"], entry["etag"], [], None
+    if entry["webp"]:
+        vary.append("Accept")
+        if _accepts(request.headers.get("accept"), "image/webp"):
+            name, size, etag = entry["webp"]["file"], entry["webp"]["size"], etag + ".webp"
+    if entry["encodings"]:
+        vary.append("Accept-Encoding")
+        accept_encoding = request.headers.get("accept-encoding")
+        for candidate in ("br", "gzip"):
+            copy = entry["encodings"].get(candidate)
+            if copy and _accepts(accept_encoding, candidate):
+                name, size, etag, encoding = copy["file"], copy["size"], f"{etag}.{candidate}", candidate
+                break
+
+    headers = {"ETag": f'"{etag}"', "Cache-Control": IMMUTABLE if immutable else REVALIDATE}
+    if vary:
+        headers["Vary"] = ", ".join(vary)
+    if _matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    media_type = "image/webp" if name.endswith(".webp") else entry["type"]
+    return _build.response(name, size, 200, headers, media_type)
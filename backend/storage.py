@@ -0,0 +1,462 @@
+# storage.py
+"""
+SQLite storage shared by both backends (WAL mode, one connection per thread).
+
+Replaces the read-modify-write JSON files:
+- interview_stats.json          -> `interviews` table + `interview_counters` row
+- resume_analysis_history.json  -> `resume_analyses` table
+
+It also keeps the text and slot of every resume in the embedding index
+(the vectors themselves live in resume_index.py's matrix file).
+
+Every write is a single INSERT/UPDATE, so it stays O(1) and is safe with
+concurrent requests and multiple worker processes. The JSON files are
+imported once on first start.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+DB_PATH = os.getenv("MOCKIFY_DB", "mockify.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS interview_counters (
+    id               INTEGER PRIMARY KEY CHECK (id = 1),
+    total_interviews INTEGER NOT NULL DEFAULT 0,
+    score_sum        INTEGER NOT NULL DEFAULT 0
+);
+INSERT OR IGNORE INTO interview_counters (id) VALUES (1);
+CREATE TABLE IF NOT EXISTS interviews (
+    id         INTEGER PRIMARY KEY AUTOINCREMENT,
+    company    TEXT,
+    role       TEXT,
+    round      TEXT,
+    score      INTEGER,
+    verdict    TEXT,
+    date       TEXT,
+    created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS resume_analyses (
+    id         INTEGER PRIMARY KEY AUTOINCREMENT,
+    category   TEXT NOT NULL,
+    record     TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_resume_category ON resume_analyses (category, id);
+CREATE TABLE IF NOT EXISTS batch_jobs (
+    id         TEXT PRIMARY KEY,
+    status     TEXT NOT NULL,
+    options    TEXT NOT NULL,
+    total      INTEGER NOT NULL,
+    rejected   TEXT NOT NULL,
+    owner      TEXT,
+    heartbeat  REAL,
+    error      TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_batch_jobs_status ON batch_jobs (status);
+CREATE TABLE IF NOT EXISTS batch_job_files (
+    job_id   TEXT NOT NULL,
+    idx      INTEGER NOT NULL,
+    filename TEXT NOT NULL,
+    digest   TEXT NOT NULL,
+    path     TEXT,
+    result   TEXT,
+    PRIMARY KEY (job_id, idx)
+);
+CREATE TABLE IF NOT EXISTS interview_sessions (
+    id      TEXT PRIMARY KEY,
+    state   TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    touched REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_touched ON interview_sessions (touched);
+CREATE TABLE IF NOT EXISTS resume_index (
+    model    TEXT NOT NULL,
+    slot     INTEGER NOT NULL,
+    digest   TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    text     TEXT NOT NULL,
+    added_at TEXT NOT NULL,
+    PRIMARY KEY (model, slot),
+    UNIQUE (model, digest)
+);
+"""
+
+_local = threading.local()
+_init_lock = threading.Lock()
+_initialized = set()
+
+
+def now():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def get_conn():
+    """Per-thread connection; the schema is created once per database file."""
+    conn = getattr(_local, "conn", None)
+    if conn is None or getattr(_local, "path", None) != DB_PATH:
+        conn = sqlite3.connect(DB_PATH, timeout=30, isolation_level=None, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=30000")
+        with _init_lock:
+            if DB_PATH not in _initialized:
+                conn.executescript(SCHEMA)
+                _initialized.add(DB_PATH)
+        _local.conn = conn
+        _local.path = DB_PATH
+    return conn
+
+
+@contextmanager
+def transaction():
+    """BEGIN IMMEDIATE ... COMMIT/ROLLBACK on the thread's connection."""
+    conn = get_conn()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+def _to_int(value):
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return 0
+
+
+# --------------------------------------------------
+# INTERVIEWS
+# --------------------------------------------------
+@metrics.timed("db_write")
+def record_interview(company, role, round_, score, verdict):
+    score = _to_int(score)
+    with transaction() as conn:
+        conn.execute(
+            "INSERT INTO interviews (company, role, round, score, verdict, date, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (company, role, round_, score, verdict, datetime.now().strftime("%Y-%m-%d"), now()),
+        )
+        conn.execute(
+            "UPDATE interview_counters SET total_interviews = total_interviews + 1, score_sum = score_sum + ? WHERE id = 1",
+            (score,),
+        )
+
+
+def get_interview_stats(limit=20, offset=0):
+    """
+    Same shape as the old interview_stats.json. `history` holds one page of
+    the most recent interviews (skipping `offset` newest), oldest first.
+    """
+    conn = get_conn()
+    counters = conn.execute("SELECT total_interviews, score_sum FROM interview_counters WHERE id = 1").fetchone()
+    total = counters["total_interviews"] if counters else 0
+    rows = conn.execute(
+        "SELECT company, role, round, score, verdict, date FROM interviews ORDER BY id DESC LIMIT ? OFFSET ?",
+        (limit, offset),
+    ).fetchall()
+    return {
+        "total_interviews": total,
+        "average_score": int(counters["score_sum"] / total) if total else 0,
+        "history": [dict(r) for r in reversed(rows)],
+    }
+
+
+def migrate_interview_stats(stats_file):
+    """One-time import of interview_stats.json."""
+    def load(conn):
+        with open(stats_file, "r") as f:
+            stats = json.load(f)
+        for h in stats.get("history", []):
+            conn.execute(
+                "INSERT INTO interviews (company, role, round, score, verdict, date, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (h.get("company"), h.get("role"), h.get("round"), _to_int(h.get("score")),
+                 h.get("verdict"), h.get("date"), now()),
+            )
+        total = _to_int(stats.get("total_interviews"))
+        conn.execute(
+            "UPDATE interview_counters SET total_interviews = ?, score_sum = ? WHERE id = 1",
+            (total, total * _to_int(stats.get("average_score"))),
+        )
+    _migrate_once("interview_stats", stats_file, load)
+
+
+# --------------------------------------------------
+# RESUME ANALYSES
+# --------------------------------------------------
+@metrics.timed("db_write")
+def add_resume_analysis(category, record):
+    record["timestamp"] = now()
+    get_conn().execute(
+        "INSERT INTO resume_analyses (category, record, created_at) VALUES (?, ?, ?)",
+        (category, json.dumps(record), record["timestamp"]),
+    )
+
+
+def get_resume_history(limit=50, offset=0):
+    """Same shape as resume_analysis_history.json, newest first, paginated per category."""
+    conn = get_conn()
+    data = {"single": [], "batch": []}
+    categories = [r["category"] for r in conn.execute("SELECT DISTINCT category FROM resume_analyses")]
+    for category in categories:
+        rows = conn.execute(
+            "SELECT record FROM resume_analyses WHERE category = ? ORDER BY id DESC LIMIT ? OFFSET ?",
+            (category, limit, offset),
+        ).fetchall()
+        data[category] = [json.loads(r["record"]) for r in rows]
+    return data
+
+
+@metrics.timed("db_write")
+def clear_resume_history():
+    get_conn().execute("DELETE FROM resume_analyses")
+
+
+def migrate_resume_history(history_file):
+    """One-time import of resume_analysis_history.json (stored newest first)."""
+    def load(conn):
+        with open(history_file, "r") as f:
+            history = json.load(f)
+        for category, records in history.items():
+            for record in reversed(records):
+                conn.execute(
+                    "INSERT INTO resume_analyses (category, record, created_at) VALUES (?, ?, ?)",
+                    (category, json.dumps(record), record.get("timestamp") or now()),
+                )
+    _migrate_once("resume_history", history_file, load)
+
+
+# --------------------------------------------------
+# INTERVIEW SESSIONS (shared by all worker processes)
+# --------------------------------------------------
+@metrics.timed("db_write")
+def save_session(session_id, state):
+    """Upserts the session state; returns its new version."""
+    with transaction() as conn:
+        conn.execute(
+            "INSERT INTO interview_sessions (id, state, version, touched) VALUES (?, ?, 1, ?) "
+            "ON CONFLICT(id) DO UPDATE SET state = excluded.state, version = version + 1, touched = excluded.touched",
+            (session_id, json.dumps(state), time.time()),
+        )
+        return conn.execute("SELECT version FROM interview_sessions WHERE id = ?", (session_id,)).fetchone()["version"]
+
+
+def session_version(session_id):
+    """(version, last write time) or None if the session is unknown."""
+    row = get_conn().execute("SELECT version, touched FROM interview_sessions WHERE id = ?", (session_id,)).fetchone()
+    return (row["version"], row["touched"]) if row else None
+
+
+def load_session(session_id):
+    """(state dict, version) or None."""
+    row = get_conn().execute("SELECT state, version FROM interview_sessions WHERE id = ?", (session_id,)).fetchone()
+    return (json.loads(row["state"]), row["version"]) if row else None
+
+
+@metrics.timed("db_write")
+def delete_sessions(session_ids=(), idle_before=None):
+    conn = get_conn()
+    conn.executemany("DELETE FROM interview_sessions WHERE id = ?", [(sid,) for sid in session_ids])
+    if idle_before is not None:
+        conn.execute("DELETE FROM interview_sessions WHERE touched < ?", (idle_before,))
+
+
+# --------------------------------------------------
+# RESUME INDEX
+# --------------------------------------------------
+@metrics.timed("db_write")
+def add_indexed_resume(model, digest, filename, text, dim, write_vector):
+    """
+    Gives `digest` the next free slot and calls write_vector(slot) inside the
+    transaction, so no reader sees a slot before its vector is on disk.
+    Returns the slot (the existing one if the resume is already indexed).
+    """
+    with transaction() as conn:
+        row = conn.execute("SELECT slot FROM resume_index WHERE model = ? AND digest = ?", (model, digest)).fetchone()
+        if row:
+            return row["slot"]
+        key = f"resume_index_dim:{model}"
+        known = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        if known is None:
+            conn.execute("INSERT INTO meta (key, value) VALUES (?, ?)", (key, str(dim)))
+        elif int(known["value"]) != dim:
+            raise ValueError(f"{model} returned {dim}-dim vectors, index holds {known['value']}")
+        slot = conn.execute("SELECT COALESCE(MAX(slot) + 1, 0) AS slot FROM resume_index WHERE model = ?",
+                            (model,)).fetchone()["slot"]
+        write_vector(slot)
+        conn.execute(
+            "INSERT INTO resume_index (model, slot, digest, filename, text, added_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (model, slot, digest, filename, text, now()),
+        )
+        return slot
+
+
+def resume_index_size(model):
+    """(rows, vector dim); dim is None until the first resume is indexed."""
+    conn = get_conn()
+    rows = conn.execute("SELECT COALESCE(MAX(slot) + 1, 0) AS n FROM resume_index WHERE model = ?", (model,)).fetchone()["n"]
+    dim = conn.execute("SELECT value FROM meta WHERE key = ?", (f"resume_index_dim:{model}",)).fetchone()
+    return rows, int(dim["value"]) if dim else None
+
+
+def indexed_digests(model, digests):
+    """The subset of `digests` already in the index."""
+    conn = get_conn()
+    found = set()
+    digests = list(digests)
+    for i in range(0, len(digests), 500):
+        part = digests[i:i + 500]
+        rows = conn.execute(
+            f"SELECT digest FROM resume_index WHERE model = ? AND digest IN ({','.join('?' * len(part))})",
+            [model, *part],
+        )
+        found.update(r["digest"] for r in rows)
+    return found
+
+
+def indexed_resumes(model, slots):
+    """{slot: {"digest", "filename", "text"}} for the given slots."""
+    conn = get_conn()
+    found = {}
+    slots = [int(s) for s in slots]
+    for i in range(0, len(slots), 500):
+        part = slots[i:i + 500]
+        rows = conn.execute(
+            f"SELECT slot, digest, filename, text FROM resume_index WHERE model = ? AND slot IN ({','.join('?' * len(part))})",
+            [model, *part],
+        )
+        found.update({r["slot"]: {"digest": r["digest"], "filename": r["filename"], "text": r["text"]} for r in rows})
+    return found
+
+
+@metrics.timed("db_write")
+def clear_resume_index(model):
+    # The matrix file is kept; new resumes overwrite it from slot 0
+    get_conn().execute("DELETE FROM resume_index WHERE model = ?", (model,))
+
+
+# --------------------------------------------------
+# BATCH JOBS
+# --------------------------------------------------
+@metrics.timed("db_write")
+def create_job(job_id, options, files, rejected):
+    """files -> list of (filename, digest, path) in upload order."""
+    with transaction() as conn:
+        conn.execute(
+            "INSERT INTO batch_jobs (id, status, options, total, rejected, created_at, updated_at) VALUES (?, 'queued', ?, ?, ?, ?, ?)",
+            (job_id, json.dumps(options), len(files), json.dumps(rejected), now(), now()),
+        )
+        conn.executemany(
+            "INSERT INTO batch_job_files (job_id, idx, filename, digest, path) VALUES (?, ?, ?, ?, ?)",
+            [(job_id, i, filename, digest, path) for i, (filename, digest, path) in enumerate(files)],
+        )
+
+
+@metrics.timed("db_write")
+def claim_job(job_id, owner, stale_after, dead_owner=None):
+    """
+    Takes ownership of a queued/running job unless a live worker holds it.
+    `dead_owner` lets a caller that knows the holder exited take over early.
+    """
+    cur = get_conn().execute(
+        "UPDATE batch_jobs SET owner = ?, heartbeat = ?, status = 'running', updated_at = ? "
+        "WHERE id = ? AND status IN ('queued', 'running') "
+        "AND (owner IS NULL OR owner = ? OR owner = ? OR heartbeat < ?)",
+        (owner, time.time(), now(), job_id, owner, dead_owner, time.time() - stale_after),
+    )
+    return cur.rowcount == 1
+
+
+@metrics.timed("db_write")
+def job_heartbeat(job_id, owner):
+    get_conn().execute("UPDATE batch_jobs SET heartbeat = ? WHERE id = ? AND owner = ?", (time.time(), job_id, owner))
+
+
+def stale_jobs(stale_after):
+    """Unfinished jobs with no live owner (never claimed or owner stopped heartbeating)."""
+    rows = get_conn().execute(
+        "SELECT id FROM batch_jobs WHERE status IN ('queued', 'running') AND (owner IS NULL OR heartbeat < ?) ORDER BY created_at",
+        (time.time() - stale_after,),
+    ).fetchall()
+    return [r["id"] for r in rows]
+
+
+def unfinished_jobs():
+    """(id, owner) of every queued/running job, oldest first."""
+    rows = get_conn().execute(
+        "SELECT id, owner FROM batch_jobs WHERE status IN ('queued', 'running') ORDER BY created_at"
+    ).fetchall()
+    return [(r["id"], r["owner"]) for r in rows]
+
+
+@metrics.timed("db_write")
+def save_job_result(job_id, idx, result):
+    get_conn().execute(
+        "UPDATE batch_job_files SET result = ? WHERE job_id = ? AND idx = ?",
+        (json.dumps(result), job_id, idx),
+    )
+
+
+@metrics.timed("db_write")
+def finish_job(job_id, status, error=None):
+    get_conn().execute(
+        "UPDATE batch_jobs SET status = ?, error = ?, owner = NULL, updated_at = ? WHERE id = ?",
+        (status, error, now(), job_id),
+    )
+
+
+def get_job(job_id):
+    conn = get_conn()
+    job = conn.execute("SELECT * FROM batch_jobs WHERE id = ?", (job_id,)).fetchone()
+    if job is None:
+        return None
+    files = conn.execute(
+        "SELECT idx, filename, digest, path, result FROM batch_job_files WHERE job_id = ? ORDER BY idx", (job_id,)
+    ).fetchall()
+    return {
+        "id": job["id"],
+        "status": job["status"],
+        "options": json.loads(job["options"]),
+        "total": job["total"],
+        "rejected": json.loads(job["rejected"]),
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+        "files": [
+            {"idx": f["idx"], "filename": f["filename"], "digest": f["digest"], "path": f["path"],
+             "result": json.loads(f["result"]) if f["result"] else None}
+            for f in files
+        ],
+    }
+
+
+def _migrate_once(name, path, load):
+    key = f"migrated:{name}"
+    try:
+        with transaction() as conn:
+            if conn.execute("SELECT 1 FROM meta WHERE key = ?", (key,)).fetchone():
+                return
+            if os.path.exists(path):
+                load(conn)
+                logger.info(f"Migrated {path} into {DB_PATH}")
+            conn.execute("INSERT INTO meta (key, value) VALUES (?, ?)", (key, now()))
+    except Exception as e:
+        logger.error(f"Migration of {path} failed: {e}")
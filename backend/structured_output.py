@@ -0,0 +1,223 @@
+# structured_output.py
+"""
+Structured (JSON) output from the LLM.
+
+- JSON schemas for the interview report, the ATS analysis and the batch
+  verdict, passed as Ollama's `format` so decoding is constrained to them.
+- `JsonObjectScanner` follows a streamed reply and reports the moment the
+  top-level object closes, so the caller can stop generation right there.
+- `parse_or_repair*` validate the reply and, if it is malformed, make ONE
+  short repair call (the broken text + schema at temperature 0) instead of
+  re-running the whole prompt.
+"""
+import json
+import logging
+import time
+
+import metrics
+from llm_client import generate, generate_sync
+
+logger = logging.getLogger(__name__)
+
+REPAIR_MAX_CHARS = 4000
+
+_STRINGS = {"type": "array", "items": {"type": "string"}}
+
+REPORT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "score": {"type": "integer"},
+        "verdict": {"type": "string"},
+        "summary": {"type": "string"},
+        "strengths": _STRINGS,
+        "weaknesses": _STRINGS,
+        "improvement_plan": _STRINGS,
+        "code_feedback": {"type": "string"},
+    },
+    "required": ["score", "verdict", "summary", "strengths", "weaknesses", "improvement_plan", "code_feedback"],
+}
+
+ATS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "ats_score": {"type": "integer"},
+        "skills": _STRINGS,
+        "summary": {"type": "string"},
+        "improvements": _STRINGS,
+    },
+    "required": ["ats_score", "skills", "summary", "improvements"],
+}
+
+VERDICT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "score": {"type": "integer"},
+        "summary": {"type": "string"},
+    },
+    "required": ["score", "summary"],
+}
+
+REPAIR_PROMPT = """The text below was supposed to be one JSON object matching this JSON schema, but it is invalid: {error}.
+Return ONLY the corrected JSON object. Keep every value that is already there and fill in missing required fields.
+
+JSON schema:
+{schema}
+
+Text:
+{raw}
+"""
+
+_TYPES = {
+    "integer": (int, float),
+    "number": (int, float),
+    "string": str,
+    "array": list,
+    "object": dict,
+    "boolean": bool,
+}
+
+
+class StructuredOutputError(ValueError):
+    """The reply is not a JSON object matching the schema (even after repair)."""
+
+
+class JsonObjectScanner:
+    """
+    Incremental scanner for the first top-level JSON object in streamed text.
+    Tracks brace depth outside of string literals; `feed` returns True once
+    the object has closed.
+    """
+
+    def __init__(self):
+        self._parts = []
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self.start = None
+        self.end = None
+
+    @property
+    def complete(self) -> bool:
+        return self.end is not None
+
+    def feed(self, text: str) -> bool:
+        self._parts.append(text)
+        for ch in text:
+            if self.end is not None:
+                break
+            index = self._pos
+            self._pos += 1
+            if self.start is None:
+                if ch == "{":
+                    self.start, self._depth = index, 1
+                continue
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    self.end = index + 1
+        return self.complete
+
+    def raw(self) -> str:
+        return "".join(self._parts)
+
+    def object_text(self) -> str:
+        if self.start is None:
+            return ""
+        return self.raw()[self.start:self.end]
+
+
+def problems(data, schema) -> list:
+    """Top-level schema violations (empty list = valid enough to use)."""
+    if not isinstance(data, dict):
+        return ["not a JSON object"]
+    found = [f"missing '{key}'" for key in schema.get("required", []) if key not in data]
+    for key, spec in schema.get("properties", {}).items():
+        expected = _TYPES.get(spec.get("type"))
+        if key in data and expected and not isinstance(data[key], expected):
+            found.append(f"'{key}' should be {spec['type']}")
+    return found
+
+
+def parse(raw: str, schema: dict) -> dict:
+    """First JSON object in `raw`, validated against `schema`. Raises StructuredOutputError."""
+    started = time.perf_counter()
+    try:
+        data = _parse(raw, schema)
+    except StructuredOutputError:
+        metrics.record("json_parse", time.perf_counter() - started, outcome="invalid")
+        raise
+    metrics.record("json_parse", time.perf_counter() - started, outcome="ok")
+    return data
+
+
+def _parse(raw, schema):
+    scanner = JsonObjectScanner()
+    scanner.feed(raw or "")
+    if not scanner.complete:
+        raise StructuredOutputError("no complete JSON object" if scanner.start is None else "JSON object is cut off")
+    try:
+        data = json.loads(scanner.object_text())
+    except json.JSONDecodeError as e:
+        raise StructuredOutputError(f"invalid JSON ({e.msg})") from e
+    issues = problems(data, schema)
+    if issues:
+        raise StructuredOutputError(", ".join(issues))
+    return data
+
+
+def _repair_request(raw: str, schema: dict, error: Exception):
+    prompt = REPAIR_PROMPT.format(error=error, schema=json.dumps(schema), raw=raw[:REPAIR_MAX_CHARS])
+    return prompt, {"temperature": 0}
+
+
+def _record_repair(started, ok):
+    metrics.record("json_repair", time.perf_counter() - started, outcome="ok" if ok else "failed")
+
+
+async def parse_or_repair(raw: str, schema: dict, model: str) -> dict:
+    """`parse`, with one targeted repair call if the reply is malformed."""
+    try:
+        return parse(raw, schema)
+    except StructuredOutputError as e:
+        if not raw or not raw.strip():
+            raise
+        logger.warning(f"Repairing malformed LLM JSON: {e}")
+        prompt, options = _repair_request(raw, schema, e)
+        started, ok = time.perf_counter(), False
+        try:
+            data = await generate(prompt, model, options=options, format=schema, timeout=60, cache=True)
+            data = parse(data.get("response", ""), schema)
+            ok = True
+            return data
+        finally:
+            _record_repair(started, ok)
+
+
+def parse_or_repair_sync(raw: str, schema: dict, model: str) -> dict:
+    try:
+        return parse(raw, schema)
+    except StructuredOutputError as e:
+        if not raw or not raw.strip():
+            raise
+        logger.warning(f"Repairing malformed LLM JSON: {e}")
+        prompt, options = _repair_request(raw, schema, e)
+        started, ok = time.perf_counter(), False
+        try:
+            data = generate_sync(prompt, model, options=options, format=schema, timeout=60, cache=True)
+            data = parse(data.get("response", ""), schema)
+            ok = True
+            return data
+        finally:
+            _record_repair(started, ok)
@@ -0,0 +1,21 @@
+# tests/conftest.py
+"""
+Shared setup for the backend tests (run from backend/: python -m pytest tests).
+
+The backend modules are flat and read their settings at import time, so the
+storage locations point at a temp directory before any of them is imported.
+No test talks to Ollama; LLM calls are replaced per test.
+"""
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+_tmp = tempfile.mkdtemp(prefix="mockify-tests-")
+os.environ.setdefault("MOCKIFY_DB", os.path.join(_tmp, "mockify.db"))
+os.environ.setdefault("RESUME_CACHE_DIR", os.path.join(_tmp, "cache"))
+os.environ.setdefault("BATCH_JOB_DIR", os.path.join(_tmp, "jobs"))
+os.environ.setdefault("STATIC_BUILD_DIR", os.path.join(_tmp, "static_build"))
+os.environ.setdefault("WARMUP", "0")
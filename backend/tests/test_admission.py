@@ -0,0 +1,151 @@
+# tests/test_admission.py
+import asyncio
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import admission
+from admission import (BATCH, INTERACTIVE, QUEUE_LIMITS, REPORT, SPECULATIVE, AdmissionController,
+                       DeadlineExceeded, Overloaded)
+
+
+def controller(max_inflight=2, reserved=1, **limits):
+    queue_limits = dict(QUEUE_LIMITS)
+    queue_limits.update({getattr(admission, name.upper()): limit for name, limit in limits.items()})
+    return AdmissionController(max_inflight=max_inflight, queue_limits=queue_limits, reserved=reserved)
+
+
+async def settle():
+    # Waiters are woken through call_soon_threadsafe
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_queued_requests_are_granted_highest_priority_first():
+    async def scenario():
+        c = controller(max_inflight=2, reserved=1)
+        await c.acquire(INTERACTIVE)
+        await c.acquire(INTERACTIVE)
+        order = []
+
+        async def wait(priority, name):
+            await c.acquire(priority)
+            order.append(name)
+
+        tasks = [asyncio.create_task(wait(p, n)) for p, n in
+                 ((BATCH, "batch"), (REPORT, "report"), (INTERACTIVE, "interactive"))]
+        await settle()
+        assert c.status()["queued"] == {"interactive": 1, "report": 1, "batch": 1, "speculative": 0}
+
+        c.release()
+        await settle()
+        assert order == ["interactive"]
+        c.release()
+        await settle()
+        assert order == ["interactive", "report"]
+        # One slot is reserved for interactive work: batch needs two free
+        c.release()
+        await settle()
+        assert order == ["interactive", "report"]
+        c.release()
+        await settle()
+        assert order == ["interactive", "report", "batch"]
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+
+
+def test_full_queue_raises_overloaded_with_retry_after():
+    async def scenario():
+        c = controller(max_inflight=1, reserved=0, interactive=1)
+        await c.acquire(INTERACTIVE)
+        queued = asyncio.create_task(c.acquire(INTERACTIVE))
+        await settle()
+        with pytest.raises(Overloaded) as raised:
+            await c.acquire(INTERACTIVE)
+        assert raised.value.retry_after >= 1
+        with pytest.raises(Overloaded):
+            c.check(INTERACTIVE)
+        assert c.rejected[INTERACTIVE] == 2
+        c.release()
+        await queued
+
+    asyncio.run(scenario())
+
+
+def test_deadline_passes_while_queued():
+    async def scenario():
+        c = controller(max_inflight=1, reserved=0)
+        await c.acquire(INTERACTIVE)
+        with pytest.raises(DeadlineExceeded):
+            await c.acquire(INTERACTIVE, deadline=time.monotonic() + 0.05)
+        assert c.status()["queued"]["interactive"] == 0
+        c.release()
+        assert c.inflight == 0
+
+    asyncio.run(scenario())
+
+
+def test_speculative_work_never_queues_and_is_told_about_contention():
+    async def scenario():
+        c = controller(max_inflight=2, reserved=1)
+        contended = []
+        c.on_contention(lambda: contended.append(True))
+
+        await c.acquire(SPECULATIVE)
+        # The remaining slot is reserved for interactive work
+        with pytest.raises(Overloaded):
+            await c.acquire(SPECULATIVE)
+        await c.acquire(INTERACTIVE)
+
+        batch = asyncio.create_task(c.acquire(BATCH))
+        await settle()
+        assert contended == []
+        turn = asyncio.create_task(c.acquire(INTERACTIVE))
+        await settle()
+        assert contended == [True]
+
+        c.release()                  # the speculation gives its slot back
+        await settle()
+        assert turn.done() and not batch.done()
+        c.release()
+        c.release()
+        await settle()
+        assert batch.done()
+
+    asyncio.run(scenario())
+
+
+def test_sync_callers_share_the_same_slots():
+    c = controller(max_inflight=1, reserved=0)
+    c.acquire_sync(REPORT)
+    admitted = threading.Event()
+
+    def worker():
+        c.acquire_sync(REPORT)
+        admitted.set()
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    assert not admitted.wait(0.1)
+    c.release()
+    assert admitted.wait(2)
+    thread.join()
+    c.release()
+    assert c.inflight == 0
+
+
+def test_overloaded_turn_is_answered_with_429(monkeypatch):
+    import main
+
+    c = controller(max_inflight=1, reserved=0, interactive=0)
+    c.inflight = 1
+    monkeypatch.setattr(admission, "controller", c)
+    client = TestClient(main.app)
+
+    res = client.post("/interview/ask", json={"prompt": "Hello", "type": "chat", "stream": True})
+    assert res.status_code == 429
+    assert int(res.headers["Retry-After"]) >= 1
+    assert res.json()["retry_after"] >= 1
@@ -0,0 +1,128 @@
+# tests/test_llm_cache.py
+import asyncio
+import threading
+import time
+
+import pytest
+
+from llm_cache import cached_call, cached_call_sync, response_cache
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    response_cache.clear()
+    yield
+    response_cache.clear()
+
+
+def coalesced():
+    return response_cache.stats()["coalesced"]
+
+
+def test_concurrent_callers_share_one_upstream_call():
+    async def scenario():
+        calls = 0
+        release = asyncio.Event()
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return {"response": "shared"}
+
+        before = coalesced()
+        waiters = [asyncio.create_task(cached_call("same-prompt", fetch)) for _ in range(8)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*waiters)
+
+        assert calls == 1
+        assert coalesced() - before == 7
+        assert all(r == {"response": "shared"} for r in results)
+        # Every caller gets its own copy
+        results[0]["response"] = "changed"
+        assert results[1]["response"] == "shared"
+        # Later callers are served from the cache
+        assert await cached_call("same-prompt", fetch) == {"response": "shared"}
+        assert calls == 1
+
+    asyncio.run(scenario())
+
+
+def test_shared_call_survives_until_the_last_waiter_leaves():
+    async def scenario():
+        started, release = asyncio.Event(), asyncio.Event()
+        cancelled = []
+
+        async def fetch():
+            started.set()
+            try:
+                await release.wait()
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+            return {"response": "done"}
+
+        first = asyncio.create_task(cached_call("p", fetch))
+        second = asyncio.create_task(cached_call("p", fetch))
+        await started.wait()
+        first.cancel()
+        await asyncio.sleep(0)
+        assert not cancelled
+        release.set()
+        assert await second == {"response": "done"}
+
+        release.clear()
+        started.clear()
+        last = asyncio.create_task(cached_call("q", fetch))
+        await started.wait()
+        last.cancel()
+        for _ in range(3):
+            await asyncio.sleep(0)
+        assert cancelled == [True]
+
+    asyncio.run(scenario())
+
+
+def test_sync_callers_share_one_upstream_call():
+    calls = []
+    barrier = threading.Barrier(6)
+    results = []
+
+    def fetch():
+        calls.append(True)
+        time.sleep(0.2)
+        return {"response": "sync"}
+
+    def caller():
+        barrier.wait()
+        results.append(cached_call_sync("sync-prompt", fetch))
+
+    threads = [threading.Thread(target=caller) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert results == [{"response": "sync"}] * 6
+
+
+def test_failed_call_reaches_every_waiter_and_is_not_cached():
+    async def scenario():
+        calls = 0
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            raise RuntimeError("upstream down")
+
+        results = await asyncio.gather(*(cached_call("bad", fetch) for _ in range(3)), return_exceptions=True)
+        assert calls == 1
+        assert all(isinstance(r, RuntimeError) for r in results)
+        with pytest.raises(RuntimeError):
+            await cached_call("bad", fetch)
+        assert calls == 2
+
+    asyncio.run(scenario())
@@ -0,0 +1,92 @@
+# tests/test_structured_output.py
+import asyncio
+import json
+
+import pytest
+
+import structured_output
+from structured_output import (VERDICT_SCHEMA, JsonObjectScanner, StructuredOutputError, parse, parse_or_repair,
+                               parse_or_repair_sync)
+
+VALID = '{"score": 72, "summary": "Solid backend experience"}'
+
+
+def test_scanner_stops_when_the_top_level_object_closes():
+    scanner = JsonObjectScanner()
+    tokens = ['Sure! ', '{"summary": "braces } and { in', ' a \\"quoted\\" string",', ' "nested": {"a": 1}',
+              ', "score": 3', '}', ' trailing text {']
+    closed_at = [scanner.feed(t) for t in tokens]
+    assert closed_at == [False, False, False, False, False, True, True]
+    data = json.loads(scanner.object_text())
+    assert data == {"summary": 'braces } and { in a "quoted" string', "nested": {"a": 1}, "score": 3}
+
+
+def test_scanner_reports_an_object_that_never_closes():
+    scanner = JsonObjectScanner()
+    assert not scanner.feed('{"score": 5, "summary": "cut')
+    assert scanner.start == 0 and not scanner.complete
+
+
+def test_parse_takes_the_first_object_out_of_surrounding_prose():
+    assert parse(f"Here is the JSON:\n{VALID}\nHope this helps", VERDICT_SCHEMA) == json.loads(VALID)
+
+
+@pytest.mark.parametrize("raw, message", [
+    ("no json here", "no complete JSON object"),
+    ('{"score": 5, "summary": "cut', "cut off"),
+    ('{"score": 5, summary: "x"}', "invalid JSON"),
+    ('{"score": 5}', "missing 'summary'"),
+    ('{"score": "high", "summary": "x"}', "'score' should be integer"),
+])
+def test_parse_rejects_malformed_replies(raw, message):
+    with pytest.raises(StructuredOutputError, match=message):
+        parse(raw, VERDICT_SCHEMA)
+
+
+class FakeRepair:
+    """Stands in for the repair LLM call and records its prompts."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.prompts = []
+
+    def __call__(self, prompt, model, **kwargs):
+        self.prompts.append(prompt)
+        return {"response": self.responses.pop(0)}
+
+    async def async_call(self, prompt, model, **kwargs):
+        return self(prompt, model, **kwargs)
+
+
+def test_valid_reply_needs_no_repair_call(monkeypatch):
+    repair = FakeRepair()
+    monkeypatch.setattr(structured_output, "generate", repair.async_call)
+    monkeypatch.setattr(structured_output, "generate_sync", repair)
+    assert asyncio.run(parse_or_repair(VALID, VERDICT_SCHEMA, "model")) == json.loads(VALID)
+    assert parse_or_repair_sync(VALID, VERDICT_SCHEMA, "model") == json.loads(VALID)
+    assert repair.prompts == []
+
+
+def test_malformed_reply_is_fixed_with_one_repair_call(monkeypatch):
+    repair = FakeRepair(VALID)
+    monkeypatch.setattr(structured_output, "generate", repair.async_call)
+    assert asyncio.run(parse_or_repair('{"score": 72}', VERDICT_SCHEMA, "model")) == json.loads(VALID)
+    assert len(repair.prompts) == 1
+    assert "missing 'summary'" in repair.prompts[0]
+    assert '{"score": 72}' in repair.prompts[0]
+
+
+def test_failed_repair_raises_after_a_single_attempt(monkeypatch):
+    repair = FakeRepair("still not json")
+    monkeypatch.setattr(structured_output, "generate_sync", repair)
+    with pytest.raises(StructuredOutputError):
+        parse_or_repair_sync('{"score": ', VERDICT_SCHEMA, "model")
+    assert len(repair.prompts) == 1
+
+
+def test_empty_reply_is_not_sent_for_repair(monkeypatch):
+    repair = FakeRepair()
+    monkeypatch.setattr(structured_output, "generate", repair.async_call)
+    with pytest.raises(StructuredOutputError):
+        asyncio.run(parse_or_repair("   ", VERDICT_SCHEMA, "model"))
+    assert repair.prompts == []
@@ -0,0 +1,113 @@
+# tests/test_uploads.py
+import asyncio
+import hashlib
+import os
+
+import pytest
+from fastapi import HTTPException
+
+import document_text
+import uploads
+from uploads import read_form
+
+BOUNDARY = "testboundary123"
+
+
+class StreamedRequest:
+    """The parts of a Starlette request read_form uses, fed in small chunks."""
+
+    def __init__(self, body, chunk_size=7, content_type=f"multipart/form-data; boundary={BOUNDARY}"):
+        self.headers = {"content-type": content_type}
+        self._body = body
+        self._chunk_size = chunk_size
+
+    async def stream(self):
+        for i in range(0, len(self._body), self._chunk_size):
+            yield self._body[i:i + self._chunk_size]
+
+
+def multipart(*parts):
+    """Body for (field, filename or None, content bytes) parts."""
+    body = b""
+    for field, filename, content in parts:
+        disposition = f'form-data; name="{field}"'
+        if filename is not None:
+            disposition += f'; filename="{filename}"'
+        body += f"--{BOUNDARY}\r\nContent-Disposition: {disposition}\r\n\r\n".encode() + content + b"\r\n"
+    return body + f"--{BOUNDARY}--\r\n".encode()
+
+
+def parse(body, **kwargs):
+    return asyncio.run(read_form(StreamedRequest(body, **kwargs)))
+
+
+def test_fields_and_files_are_parsed_in_request_order():
+    cv = b"Python developer\n" * 20
+    fields, files = parse(multipart(("role", None, b"Backend Engineer"),
+                                    ("resumes", "a.txt", cv),
+                                    ("resumes", "b.txt", b"Second"),
+                                    ("other", "ignored.txt", b"not a resume")))
+    assert fields == {"role": "Backend Engineer"}
+    assert [f.filename for f in files] == ["a.txt", "b.txt"]
+    assert files[0].error is None
+    assert files[0].digest == hashlib.sha256(cv).hexdigest()
+    assert files[0].source == ("txt", cv)
+
+
+def test_unsupported_file_type_is_refused_without_buffering():
+    _, files = parse(multipart(("resume", "cv.exe", b"MZ...")))
+    assert files[0].error == "Invalid file"
+    assert files[0].source is None
+
+
+def test_oversized_file_is_refused_and_the_rest_of_the_batch_survives(monkeypatch):
+    monkeypatch.setattr(document_text, "MAX_UPLOAD_MB", 1 / 1024)          # 1 KB
+    _, files = parse(multipart(("resumes", "big.txt", b"x" * 4096),
+                               ("resumes", "small.txt", b"fits")), chunk_size=512)
+    assert "exceeds" in files[0].error
+    assert files[0].source is None
+    assert files[1].error is None
+    assert files[1].source == ("txt", b"fits")
+
+
+def test_large_file_is_spilled_to_a_temp_file(monkeypatch):
+    monkeypatch.setattr(document_text, "SPILL_THRESHOLD_MB", 1 / 1024)    # 1 KB
+    content = b"y" * 4096
+    _, files = parse(multipart(("resume", "cv.txt", content)), chunk_size=1000)
+    ext, path = files[0].source
+    try:
+        assert ext == "txt" and isinstance(path, str)
+        with open(path, "rb") as f:
+            assert f.read() == content
+    finally:
+        document_text.release(files[0].source)
+    assert not os.path.exists(path)
+
+
+def test_oversized_form_field_is_rejected(monkeypatch):
+    monkeypatch.setattr(uploads, "MAX_FIELD_BYTES", 16)
+    with pytest.raises(HTTPException) as raised:
+        parse(multipart(("job_description", None, b"z" * 100)))
+    assert raised.value.status_code == 400
+    assert "too large" in raised.value.detail
+
+
+def test_too_many_parts_are_rejected(monkeypatch):
+    monkeypatch.setattr(uploads, "MAX_PARTS", 2)
+    with pytest.raises(HTTPException) as raised:
+        parse(multipart(*[("resumes", f"{i}.txt", b"cv") for i in range(3)]))
+    assert raised.value.status_code == 400
+    assert raised.value.detail == "Too many form parts"
+
+
+def test_non_multipart_request_is_rejected():
+    with pytest.raises(HTTPException) as raised:
+        parse(b"{}", content_type="application/json")
+    assert raised.value.status_code == 400
+
+
+def test_malformed_body_is_rejected():
+    with pytest.raises(HTTPException) as raised:
+        parse(b"garbage without a boundary")
+    assert raised.value.status_code == 400
+    assert raised.value.detail.startswith("Malformed upload")
@@ -0,0 +1,149 @@
+# uploads.py
+"""
+Streaming multipart parsing for the resume endpoints.
+
+The request body is pushed chunk by chunk through python-multipart's
+parser and every file part goes straight into a document_text.UploadBuffer:
+hashed on the way in, kept in memory when small, spilled to a temp file
+when large, and no longer buffered once it passes MAX_UPLOAD_MB (the rest
+of the request is still read so the other files in a batch survive).
+Nothing is spooled twice the way Starlette's own form parser would.
+"""
+from fastapi import HTTPException, Request
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+from document_text import UploadBuffer, UploadTooLarge, allowed_file, release
+
+MAX_FIELD_BYTES = 64 * 1024
+MAX_PARTS = 2000
+
+
+class Upload:
+    """One received file: `filename` as sent, plus digest/source or the reason it was refused."""
+
+    def __init__(self, field, filename):
+        self.field = field
+        self.filename = filename
+        self.digest = None
+        self.source = None
+        self.error = None
+        # Unsupported types are never buffered
+        self._buffer = UploadBuffer(filename) if allowed_file(filename) else None
+        if self._buffer is None:
+            self.error = "Invalid file"
+
+    def write(self, chunk):
+        if self.error is not None:
+            return
+        try:
+            self._buffer.write(chunk)
+        except UploadTooLarge as e:
+            self.error = str(e)
+
+    def finish(self):
+        if self.error is None:
+            self.digest, self.source = self._buffer.finish()
+        self._buffer = None
+
+    def discard(self):
+        if self._buffer is not None:
+            self._buffer.discard()
+            self._buffer = None
+
+
+class _FormReader:
+    def __init__(self, file_fields):
+        self.file_fields = set(file_fields)
+        self.fields = {}
+        self.uploads = []
+        self._header_name = b""
+        self._header_value = b""
+        self._disposition = b""
+        self._field = None
+        self._upload = None
+        self._data = bytearray()
+        self._parts = 0
+
+    def on_part_begin(self):
+        self._disposition = b""
+        self._field = None
+        self._upload = None
+        self._data = bytearray()
+        self._parts += 1
+        if self._parts > MAX_PARTS:
+            raise HTTPException(status_code=400, detail="Too many form parts")
+
+    def on_header_field(self, data, start, end):
+        self._header_name += data[start:end]
+
+    def on_header_value(self, data, start, end):
+        self._header_value += data[start:end]
+
+    def on_header_end(self):
+        if self._header_name.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_name = b""
+        self._header_value = b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self._disposition)
+        self._field = options.get(b"name", b"").decode("utf-8", errors="replace")
+        if b"filename" in options:
+            filename = options[b"filename"].decode("utf-8", errors="replace")
+            # Files under other names are ignored, like request.files did
+            if self._field in self.file_fields and filename:
+                self._upload = Upload(self._field, filename)
+                self.uploads.append(self._upload)
+            self._field = None
+
+    def on_part_data(self, data, start, end):
+        if self._upload is not None:
+            self._upload.write(data[start:end])
+        elif self._field is not None:
+            if len(self._data) + (end - start) > MAX_FIELD_BYTES:
+                raise HTTPException(status_code=400, detail=f"Form field '{self._field}' is too large")
+            self._data += data[start:end]
+
+    def on_part_end(self):
+        if self._upload is not None:
+            self._upload.finish()
+        elif self._field is not None:
+            self.fields.setdefault(self._field, self._data.decode("utf-8", errors="replace"))
+
+    def discard(self):
+        for upload in self.uploads:
+            upload.discard()
+            release(upload.source)
+
+
+async def read_form(request: Request, file_fields=("resume", "resumes")):
+    """
+    Parses a multipart request as it streams in.
+    Returns (fields dict, [Upload]) with uploads in request order.
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise HTTPException(status_code=400, detail="Expected multipart/form-data")
+
+    reader = _FormReader(file_fields)
+    parser = MultipartParser(params[b"boundary"], {
+        "on_part_begin": reader.on_part_begin,
+        "on_part_data": reader.on_part_data,
+        "on_part_end": reader.on_part_end,
+        "on_header_field": reader.on_header_field,
+        "on_header_value": reader.on_header_value,
+        "on_header_end": reader.on_header_end,
+        "on_headers_finished": reader.on_headers_finished,
+    })
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+        parser.finalize()
+    except MultipartParseError as e:
+        reader.discard()
+        raise HTTPException(status_code=400, detail=f"Malformed upload: {e}") from e
+    except BaseException:
+        reader.discard()
+        raise
+    return reader.fields, reader.uploads
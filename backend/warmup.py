@@ -0,0 +1,165 @@
+# warmup.py
+"""
+Model warm-up, keep_alive and readiness.
+
+- At startup every model in WARM_MODELS (default: the models of the chat,
+  code, report, summary and resume routes) is loaded on every Ollama node
+  with an empty request carrying `keep_alive`, so the first interview turn
+  does not pay for loading the weights. The load uses the num_ctx the
+  next request will ask for (prompt_budget), otherwise Ollama would
+  reload the model at that request anyway. It only reads that size, so
+  the refresh does not keep a grown num_ctx from shrinking back.
+- Every LLM call carries `keep_alive` too (llm_client) and is recorded
+  with `touch`. A background task re-sends the empty request every
+  KEEP_ALIVE_REFRESH seconds for models that are pinned (WARMUP_PIN, on by
+  default) or were used within WARMUP_TRAFFIC_WINDOW; an unpinned model
+  that goes quiet is left to expire so the node can free its memory.
+- `readiness` reads /api/ps on every healthy node (cached for
+  HEALTH_CACHE_SECONDS) and reports where each model is resident. /health
+  answers 503 while a pinned model is not resident on any healthy node.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+
+import httpx
+
+import prompt_budget
+from llm_router import _model_names, model_for, router
+
+logger = logging.getLogger(__name__)
+
+WARMUP_ENABLED = os.getenv("WARMUP", "1") != "0"
+WARMUP_PIN = os.getenv("WARMUP_PIN", "1") != "0"
+KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+KEEP_ALIVE_REFRESH = float(os.getenv("KEEP_ALIVE_REFRESH", "240"))
+TRAFFIC_WINDOW = float(os.getenv("WARMUP_TRAFFIC_WINDOW", "1800"))
+WARMUP_TIMEOUT = float(os.getenv("WARMUP_TIMEOUT", "300"))
+HEALTH_TIMEOUT = float(os.getenv("LLM_HEALTH_TIMEOUT", "2"))
+HEALTH_CACHE_SECONDS = float(os.getenv("HEALTH_CACHE_SECONDS", "2"))
+
+WARM_ROUTES = ("chat", "code_analysis", "report", "summary", "resume")
+WARM_MODELS = sorted({m.strip() for m in os.getenv("WARM_MODELS", "").split(",") if m.strip()}
+                     or {model_for(route) for route in WARM_ROUTES})
+
+_last_used = {}                      # model -> monotonic time of its last finished call
+_lock = threading.Lock()
+_task = None
+_readiness = (0.0, None)             # (monotonic time, cached readiness)
+
+
+def touch(model):
+    """Records traffic for `model` (llm_client calls it after every call)."""
+    if model:
+        with _lock:
+            _last_used[model] = time.monotonic()
+
+
+def _active_models():
+    """Models whose keep_alive should be refreshed now."""
+    now = time.monotonic()
+    with _lock:
+        recent = {m for m, used in _last_used.items() if now - used < TRAFFIC_WINDOW}
+    return sorted(recent | set(WARM_MODELS)) if WARMUP_PIN else sorted(recent)
+
+
+def _load_request(model):
+    """Empty request that loads `model` (or extends its keep_alive) without generating."""
+    if model == model_for("embed"):
+        return "/api/embeddings", {"model": model, "prompt": "", "keep_alive": KEEP_ALIVE}
+    return "/api/generate", {"model": model, "prompt": "", "stream": False, "keep_alive": KEEP_ALIVE,
+                             "options": {"num_ctx": prompt_budget.sizer.peek(model)}}
+
+
+async def _load(client, backend, model):
+    path, payload = _load_request(model)
+    started = time.monotonic()
+    try:
+        res = await client.post(backend.url + path, json=payload, timeout=WARMUP_TIMEOUT)
+        res.raise_for_status()
+    except Exception as e:
+        logger.warning(f"Warm-up of {model} on {backend.url} failed: {e}")
+        return False
+    logger.info(f"{model} warm on {backend.url} ({time.monotonic() - started:.1f}s)")
+    return True
+
+
+async def warm(models=None):
+    """Loads `models` (default: the ones due a refresh) on every healthy node that serves them."""
+    models = _active_models() if models is None else models
+    async with httpx.AsyncClient() as client:
+        jobs = [_load(client, b, m) for m in models for b in router.backends if b.healthy and b.serves(m)]
+        results = await asyncio.gather(*jobs)
+    return sum(results)
+
+
+async def _refresh_loop():
+    await warm(WARM_MODELS)
+    while True:
+        await asyncio.sleep(KEEP_ALIVE_REFRESH)
+        try:
+            await warm()
+        except Exception as e:
+            logger.warning(f"keep_alive refresh failed: {e}")
+
+
+def start():
+    """Starts the warm-up and the keep_alive refresher on the running loop."""
+    global _task
+    if WARMUP_ENABLED and _task is None:
+        _task = asyncio.get_running_loop().create_task(_refresh_loop())
+
+
+async def stop():
+    global _task
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+    _task = None
+
+
+async def _resident(client, backend):
+    """Names of the models loaded on `backend` (/api/ps), or None if it did not answer."""
+    try:
+        res = await client.get(f"{backend.url}/api/ps", timeout=HEALTH_TIMEOUT)
+        res.raise_for_status()
+    except Exception:
+        return None
+    names = set()
+    for m in res.json().get("models", []):
+        names |= _model_names(m.get("name", ""))
+    return names
+
+
+async def readiness():
+    """
+    {"status": "ok" | "warming" | "unavailable", "models": {model: [node urls]},
+    "nodes": [...]}. Only pinned models decide the status; without pinning a
+    model may be unloaded while idle and is loaded again on demand.
+    """
+    global _readiness
+    checked, cached = _readiness
+    if cached is not None and time.monotonic() - checked < HEALTH_CACHE_SECONDS:
+        return cached
+
+    backends = [b for b in router.backends if b.healthy]
+    async with httpx.AsyncClient() as client:
+        loaded = await asyncio.gather(*(_resident(client, b) for b in backends))
+    answered = [(b, names) for b, names in zip(backends, loaded) if names is not None]
+    models = {m: [b.url for b, names in answered if m in names] for m in _active_models() or WARM_MODELS}
+
+    if not answered:
+        status = "unavailable"
+    elif WARMUP_PIN and not all(models[m] for m in WARM_MODELS):
+        status = "warming"
+    else:
+        status = "ok"
+    result = {"status": status, "models": models, "pinned": WARMUP_PIN,
+              "nodes": [b.snapshot() for b in router.backends]}
+    _readiness = (time.monotonic(), result)
+    return result